@@ -0,0 +1 @@
+"""Offline benchmarks for Dr. Aunty (no provider credits spent)."""
@@ -0,0 +1,672 @@
+"""Record/replay cassettes for provider calls.
+
+The synthetic fakes in benchmarks.fakes are quick to set up, but their
+responses don't match the real shapes and sizes: Gemini's code-fenced
+JSON, Mem0's search payloads, Supabase rows with full lab_data, and the
+real latency spread of each API.
+
+A cassette captures real calls once and serves them back offline:
+
+- Record: proxies wrap the real Groq, Gemini, Mem0 and Supabase clients
+  on HealthAnalyzer, HealthMemoryManager and HealthDatabase. Each call's
+  response and latency are saved (streams chunk by chunk, with timing).
+- Replay: the proxies are replaced by players that return the recorded
+  responses after the recorded latency (optionally scaled). Calls are
+  matched by provider operation (e.g. "supabase.health_reports.select")
+  and served in recorded order, cycling when a cassette runs out.
+
+Redaction: requests are stored only as a shape (model, message count,
+prompt size, table and filter columns), never their content. Responses
+have Telegram IDs and names replaced by stable pseudonyms, and emails,
+phone numbers and NRIC numbers masked. API keys are never seen by the
+proxies.
+
+Usage (from the repository root):
+    # Real credentials from .env; writes rows for a synthetic user to
+    # Supabase, so point it at a test project
+    python -m benchmarks.cassette record report1.jpg report2.jpg --out cassettes/session.json
+
+    # Offline: replay the same scenario and time our classes
+    python -m benchmarks.cassette replay cassettes/session.json --rounds 5
+
+    # Offline load test serving providers from the cassette
+    python -m benchmarks.load_test --cassette cassettes/session.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+CASSETTE_VERSION = 1
+
+# Response fields holding user identities
+_IDENTITY_KEYS = {
+    "telegram_id", "user_id", "patient_telegram_id", "caregiver_telegram_id",
+    "username", "first_name", "caregiver_name", "patient_name",
+}
+
+_SENSITIVE_PATTERNS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "[email]"),
+    (re.compile(r"\b[STFGM]\d{7}[A-Z]\b"), "[nric]"),
+    (re.compile(r"(?:\+65[\s-]?)?\b[689]\d{3}[\s-]?\d{4}\b"), "[phone]"),
+]
+
+
+class ReplayedError(Exception):
+    """A provider error that was recorded, raised again on replay."""
+
+
+class CassetteMiss(KeyError):
+    """No recording exists for a provider operation."""
+
+
+class Cassette:
+    """Recorded provider interactions, grouped by operation."""
+
+    def __init__(self, path: str, identities: Optional[List[Any]] = None):
+        """Initialize the cassette.
+
+        Args:
+            path: JSON file to load from / save to
+            identities: Telegram IDs and names to pseudonymize in responses
+        """
+        self.path = path
+        self.interactions: Dict[str, List[Dict[str, Any]]] = {}
+        self._identities = {str(i): _pseudonym(i) for i in identities or [] if i is not None}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ---------- recording ----------
+
+    def record(
+        self,
+        operation: str,
+        request: Dict[str, Any],
+        latency: float,
+        response: Any = None,
+        error: Optional[BaseException] = None,
+        chunks: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """Save one interaction (redacted).
+
+        Args:
+            operation: Provider operation key
+            request: Request shape (no content)
+            latency: Seconds the call took
+            response: JSON-serializable response
+            error: Exception the call raised, if any
+            chunks: Streamed chunks as {"offset": seconds, ...}
+        """
+        entry: Dict[str, Any] = {"request": request, "latency": round(latency, 4)}
+        if error is not None:
+            entry["error"] = self.redact(f"{type(error).__name__}: {error}")
+        if response is not None:
+            entry["response"] = self.redact(response)
+        if chunks is not None:
+            entry["chunks"] = self.redact(chunks)
+        with self._lock:
+            self.interactions.setdefault(operation, []).append(entry)
+
+    def redact(self, value: Any, key: Optional[str] = None) -> Any:
+        """Pseudonymize identities and mask contact details, recursively."""
+        if isinstance(value, dict):
+            return {k: self.redact(v, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.redact(v) for v in value]
+        if key in _IDENTITY_KEYS and value is not None:
+            return _pseudonym(value) if isinstance(value, str) else int(_pseudonym(value)[1:], 16)
+        if isinstance(value, str):
+            for identity, pseudonym in self._identities.items():
+                value = value.replace(identity, pseudonym)
+            for pattern, replacement in _SENSITIVE_PATTERNS:
+                value = pattern.sub(replacement, value)
+        return value
+
+    def save(self) -> None:
+        """Write the cassette to disk."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            payload = {"version": CASSETTE_VERSION, "recorded_at": time.time(), "interactions": self.interactions}
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=1, default=str)
+
+    # ---------- replay ----------
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        """Load a recorded cassette."""
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version {payload.get('version')} in {path}")
+        cassette = cls(path)
+        cassette.interactions = payload["interactions"]
+        return cassette
+
+    def has(self, operation: str) -> bool:
+        return bool(self.interactions.get(operation))
+
+    def next(self, operation: str) -> Dict[str, Any]:
+        """Next recorded interaction for an operation (cycles when exhausted).
+
+        Raises:
+            CassetteMiss: If the operation was never recorded
+        """
+        with self._lock:
+            entries = self.interactions.get(operation)
+            if not entries:
+                raise CassetteMiss(operation)
+            index = self._cursor.get(operation, 0)
+            self._cursor[operation] = index + 1
+            return entries[index % len(entries)]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count and mean recorded latency per operation."""
+        return {
+            operation: {
+                "count": len(entries),
+                "mean_latency": sum(e["latency"] for e in entries) / len(entries),
+            }
+            for operation, entries in sorted(self.interactions.items())
+        }
+
+
+def _pseudonym(value: Any) -> str:
+    return "u" + hashlib.sha256(str(value).encode()).hexdigest()[:10]
+
+
+class _Obj:
+    """Attribute bag standing in for SDK response objects."""
+
+    def __init__(self, **fields: Any):
+        self.__dict__.update(fields)
+
+
+def _messages_shape(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"messages": len(messages), "prompt_chars": sum(len(str(m.get("content", ""))) for m in messages)}
+
+
+def _groq_operation(kwargs: Dict[str, Any]) -> str:
+    operation = "groq.chat"
+    if (kwargs.get("response_format") or {}).get("type") == "json_object":
+        operation += ".json"
+    if kwargs.get("stream"):
+        operation += ".stream"
+    return operation
+
+
+def _usage_dict(usage: Any, *fields: str) -> Optional[Dict[str, Any]]:
+    if usage is None:
+        return None
+    return {field: getattr(usage, field, None) for field in fields}
+
+
+class _Player:
+    """Serves one recorded interaction: waits the latency, then returns/raises."""
+
+    def __init__(self, cassette: Cassette, speed: float, fallback: Any = None):
+        self.cassette = cassette
+        self.speed = speed
+        self.fallback = fallback
+
+    def missing(self, operation: str) -> bool:
+        """Whether to hand this operation to the fallback client."""
+        return self.fallback is not None and not self.cassette.has(operation)
+
+    def play(self, operation: str) -> Dict[str, Any]:
+        entry = self.cassette.next(operation)
+        if self.speed > 0:
+            time.sleep(entry["latency"] / self.speed)
+        if "error" in entry:
+            raise ReplayedError(entry["error"])
+        return entry
+
+    def sleep_until(self, start: float, offset: float) -> None:
+        if self.speed > 0:
+            delay = start + offset / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+
+# ==================== GROQ ====================
+
+class RecordingGroqClient:
+    """Wraps groq.Groq; records chat completions."""
+
+    def __init__(self, client: Any, cassette: Cassette):
+        self._client = client
+        self._cassette = cassette
+        self.chat = _Obj(completions=_Obj(create=self.create))
+
+    def create(self, **kwargs: Any) -> Any:
+        operation = _groq_operation(kwargs)
+        request = {"model": kwargs.get("model"), "max_tokens": kwargs.get("max_tokens"),
+                   **_messages_shape(kwargs.get("messages", []))}
+        start = time.monotonic()
+        try:
+            result = self._client.chat.completions.create(**kwargs)
+        except Exception as e:
+            self._cassette.record(operation, request, time.monotonic() - start, error=e)
+            raise
+        if kwargs.get("stream"):
+            return self._record_stream(operation, request, start, result)
+
+        self._cassette.record(operation, request, time.monotonic() - start, response={
+            "content": result.choices[0].message.content,
+            "usage": _usage_dict(getattr(result, "usage", None), "prompt_tokens", "completion_tokens"),
+        })
+        return result
+
+    def _record_stream(self, operation: str, request: Dict[str, Any], start: float, stream: Any) -> Iterator[Any]:
+        chunks = []
+        try:
+            for chunk in stream:
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+                chunks.append({
+                    "offset": round(time.monotonic() - start, 4),
+                    "content": content,
+                    "usage": _usage_dict(usage, "prompt_tokens", "completion_tokens"),
+                })
+                yield chunk
+        finally:
+            self._cassette.record(operation, request, time.monotonic() - start, chunks=chunks)
+
+
+class ReplayGroqClient:
+    """Serves recorded Groq completions."""
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0, fallback: Any = None):
+        self._player = _Player(cassette, speed, fallback)
+        self.chat = _Obj(completions=_Obj(create=self.create))
+
+    def create(self, **kwargs: Any) -> Any:
+        operation = _groq_operation(kwargs)
+        if self._player.missing(operation):
+            return self._player.fallback.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._replay_stream(operation)
+        response = self._player.play(operation)["response"]
+        usage = response.get("usage")
+        return _Obj(
+            choices=[_Obj(message=_Obj(content=response["content"]))],
+            usage=_Obj(**usage) if usage else None
+        )
+
+    def _replay_stream(self, operation: str) -> Iterator[Any]:
+        entry = self._player.cassette.next(operation)
+        start = time.monotonic()
+        for chunk in entry.get("chunks", []):
+            self._player.sleep_until(start, chunk["offset"])
+            usage = chunk.get("usage")
+            yield _Obj(
+                choices=[_Obj(delta=_Obj(content=chunk.get("content")))],
+                x_groq=_Obj(usage=_Obj(**usage)) if usage else None
+            )
+        if "error" in entry:
+            raise ReplayedError(entry["error"])
+
+
+# ==================== GEMINI ====================
+
+class RecordingGeminiModel:
+    """Wraps genai.GenerativeModel; records generate_content."""
+
+    def __init__(self, model: Any, cassette: Cassette):
+        self._model = model
+        self._cassette = cassette
+
+    def generate_content(self, contents: List[Any], **kwargs: Any) -> Any:
+        request = {"parts": len(contents), "image_bytes": sum(
+            len(part["data"]) for part in contents if isinstance(part, dict) and "data" in part
+        )}
+        start = time.monotonic()
+        try:
+            response = self._model.generate_content(contents, **kwargs)
+            text = response.text
+        except Exception as e:
+            self._cassette.record("gemini.generate_content", request, time.monotonic() - start, error=e)
+            raise
+        self._cassette.record("gemini.generate_content", request, time.monotonic() - start, response={
+            "text": text,
+            "usage": _usage_dict(
+                getattr(response, "usage_metadata", None), "prompt_token_count", "candidates_token_count"
+            ),
+        })
+        return response
+
+
+class ReplayGeminiModel:
+    """Serves recorded Gemini responses."""
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0, fallback: Any = None):
+        self._player = _Player(cassette, speed, fallback)
+
+    def generate_content(self, contents: List[Any], **kwargs: Any) -> Any:
+        if self._player.missing("gemini.generate_content"):
+            return self._player.fallback.generate_content(contents, **kwargs)
+        response = self._player.play("gemini.generate_content")["response"]
+        usage = response.get("usage")
+        return _Obj(text=response["text"], usage_metadata=_Obj(**usage) if usage else None)
+
+
+# ==================== MEM0 ====================
+
+_MEM0_METHODS = ("add", "search", "get_all")
+
+
+class RecordingMem0Client:
+    """Wraps mem0.MemoryClient; records add/search/get_all."""
+
+    def __init__(self, client: Any, cassette: Cassette):
+        self._client = client
+        self._cassette = cassette
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name not in _MEM0_METHODS:
+            return attr
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            request = {"limit": kwargs.get("limit"), **_messages_shape(kwargs.get("messages", []))}
+            start = time.monotonic()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self._cassette.record(f"mem0.{name}", request, time.monotonic() - start, error=e)
+                raise
+            self._cassette.record(f"mem0.{name}", request, time.monotonic() - start, response=result)
+            return result
+
+        return call
+
+
+class ReplayMem0Client:
+    """Serves recorded Mem0 responses."""
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0, fallback: Any = None):
+        self._player = _Player(cassette, speed, fallback)
+
+    def _play(self, name: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        if self._player.missing(f"mem0.{name}"):
+            return getattr(self._player.fallback, name)(*args, **kwargs)
+        return self._player.play(f"mem0.{name}").get("response")
+
+    def add(self, *args: Any, **kwargs: Any) -> Any:
+        return self._play("add", args, kwargs)
+
+    def search(self, *args: Any, **kwargs: Any) -> Any:
+        return self._play("search", args, kwargs)
+
+    def get_all(self, *args: Any, **kwargs: Any) -> Any:
+        return self._play("get_all", args, kwargs)
+
+
+# ==================== SUPABASE ====================
+
+_SUPABASE_ACTIONS = ("select", "insert", "upsert", "update", "delete")
+
+
+class _QueryShape:
+    """Collects a PostgREST builder chain into an operation key and request shape."""
+
+    def __init__(self, table: str):
+        self.table = table
+        self.action = "select"
+        self.filters: List[str] = []
+        self.rows = 0
+
+    def note(self, method: str, args: tuple) -> None:
+        if method in _SUPABASE_ACTIONS:
+            self.action = method
+            if args and method in ("insert", "upsert"):
+                self.rows = len(args[0]) if isinstance(args[0], list) else 1
+        elif method in ("eq", "neq", "lt", "gt", "order") and args:
+            self.filters.append(f"{method}:{args[0]}")
+        elif method in ("or_", "limit"):
+            self.filters.append(method)
+
+    @property
+    def operation(self) -> str:
+        return f"supabase.{self.table}.{self.action}"
+
+    @property
+    def request(self) -> Dict[str, Any]:
+        return {"filters": self.filters, "rows": self.rows}
+
+
+class _RecordingQuery:
+    def __init__(self, builder: Any, shape: _QueryShape, cassette: Cassette):
+        self._builder = builder
+        self._shape = shape
+        self._cassette = cassette
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self._builder, name)
+
+        def chain(*args: Any, **kwargs: Any) -> Any:
+            if name == "execute":
+                return self._execute(method)
+            self._shape.note(name, args)
+            return _RecordingQuery(method(*args, **kwargs), self._shape, self._cassette)
+
+        return chain
+
+    def _execute(self, execute: Callable[[], Any]) -> Any:
+        start = time.monotonic()
+        try:
+            result = execute()
+        except Exception as e:
+            self._cassette.record(self._shape.operation, self._shape.request, time.monotonic() - start, error=e)
+            raise
+        self._cassette.record(
+            self._shape.operation, self._shape.request, time.monotonic() - start,
+            response={"data": result.data}
+        )
+        return result
+
+
+class RecordingSupabaseClient:
+    """Wraps supabase.Client; records every executed query."""
+
+    def __init__(self, client: Any, cassette: Cassette):
+        self._client = client
+        self._cassette = cassette
+
+    def table(self, name: str) -> _RecordingQuery:
+        return _RecordingQuery(self._client.table(name), _QueryShape(name), self._cassette)
+
+
+class _ReplayQuery:
+    def __init__(self, player: _Player, shape: _QueryShape, fallback: Any = None):
+        self._player = player
+        self._shape = shape
+        self._fallback = fallback
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        def chain(*args: Any, **kwargs: Any) -> Any:
+            if self._fallback is not None:
+                self._fallback = getattr(self._fallback, name)(*args, **kwargs)
+            if name == "execute":
+                return self._execute()
+            self._shape.note(name, args)
+            return self
+
+        return chain
+
+    def _execute(self) -> Any:
+        if not self._player.cassette.has(self._shape.operation) and self._fallback is not None:
+            # Never recorded: the fallback client (e.g. a fake) already executed it
+            return self._fallback
+        return _Obj(data=self._player.play(self._shape.operation)["response"]["data"])
+
+
+class ReplaySupabaseClient:
+    """Serves recorded Supabase query results.
+
+    The fallback client (if any) sees every query, so its state stays
+    consistent; its result is returned for operations the cassette lacks.
+    """
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0, fallback: Any = None):
+        self._player = _Player(cassette, speed, fallback)
+
+    def table(self, name: str) -> _ReplayQuery:
+        fallback = self._player.fallback.table(name) if self._player.fallback is not None else None
+        return _ReplayQuery(self._player, _QueryShape(name), fallback)
+
+
+# ==================== INSTALLATION ====================
+
+def install_recorders(analyzer: Any, memory: Any, database: Any, cassette: Cassette) -> None:
+    """Wrap the real provider clients so every call is recorded."""
+    analyzer.groq_client = RecordingGroqClient(analyzer.groq_client, cassette)
+    analyzer.gemini_model = RecordingGeminiModel(analyzer.gemini_model, cassette)
+    if memory.client is not None:
+        memory.client = RecordingMem0Client(memory.client, cassette)
+    if database.client is not None:
+        database.client = RecordingSupabaseClient(database.client, cassette)
+
+
+def install_players(
+    analyzer: Any, memory: Any, database: Any, cassette: Cassette,
+    speed: float = 1.0, fallback: bool = False
+) -> None:
+    """Replace the provider clients with cassette players.
+
+    Args:
+        analyzer: HealthAnalyzer
+        memory: HealthMemoryManager
+        database: HealthDatabase
+        cassette: Loaded cassette
+        speed: Latency divisor (0 = no waiting)
+        fallback: Send operations the cassette never saw to the clients
+            installed before (e.g. the fakes) instead of raising CassetteMiss
+    """
+    analyzer.groq_client = ReplayGroqClient(cassette, speed, analyzer.groq_client if fallback else None)
+    analyzer.gemini_model = ReplayGeminiModel(cassette, speed, analyzer.gemini_model if fallback else None)
+    memory.client = ReplayMem0Client(cassette, speed, memory.client if fallback else None)
+    database.client = ReplaySupabaseClient(cassette, speed, database.client if fallback else None)
+
+
+# ==================== SCENARIO ====================
+
+_CHAT_QUESTION = "Aunty, how is my cholesterol compared to last time?"
+
+
+def run_scenario(analyzer: Any, memory: Any, database: Any, images: List[bytes], telegram_id: int) -> Dict[str, List[float]]:
+    """Exercise HealthAnalyzer, HealthMemoryManager and HealthDatabase like one user session.
+
+    Args:
+        analyzer: HealthAnalyzer
+        memory: HealthMemoryManager
+        database: HealthDatabase
+        images: Lab report images (JPEG bytes)
+        telegram_id: Synthetic user the session runs as
+
+    Returns:
+        Seconds per operation (our method, including its provider call)
+    """
+    timings: Dict[str, List[float]] = {}
+
+    def timed(name: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.setdefault(name, []).append(time.perf_counter() - start)
+
+    user_id = str(telegram_id)
+    timed("database.add_user", database.add_user, telegram_id, "cassette_user", "Cassette")
+    for image in images:
+        lab_data = timed("analyzer.extract_lab_data", analyzer.extract_lab_data, image)
+        report_id = timed("database.create_health_report", database.create_health_report, telegram_id, lab_data)
+        history = timed("memory.get_health_history", memory.get_health_history, user_id)
+        analysis, response_time = timed("analyzer.analyze_with_aunty", analyzer.analyze_with_aunty, lab_data, history)
+        timed("database.update_health_report", database.update_health_report, report_id, analysis, response_time, telegram_id, lab_data)
+        timed("memory.add_health_record", memory.add_health_record, user_id, lab_data, analysis)
+        timed("database.get_caregiver", database.get_caregiver, telegram_id)
+
+    summary = timed("database.get_health_summary", database.get_health_summary, telegram_id)
+    history = timed("memory.get_health_history", memory.get_health_history, user_id)
+    timed("analyzer.chat_with_aunty", analyzer.chat_with_aunty, _CHAT_QUESTION, history)
+    timed("analyzer.stream_chat", lambda: "".join(analyzer.stream_chat(_CHAT_QUESTION, history)))
+    timed("analyzer.generate_caregiver_video_script", analyzer.generate_caregiver_video_script, summary, "Cassette")
+    timed("database.get_report_page", database.get_report_page, telegram_id)
+    timed("database.get_health_profile", database.get_health_profile, telegram_id)
+    timed("memory.get_all_memories", memory.get_all_memories, user_id)
+    return timings
+
+
+def _print_timings(timings: Dict[str, List[float]]) -> None:
+    print(f"{'operation':<42} {'calls':>6} {'p50':>8} {'p95':>8} {'max':>8}")
+    for name, values in sorted(timings.items()):
+        values = sorted(values)
+        p50 = values[len(values) // 2]
+        p95 = values[min(len(values) - 1, int(0.95 * len(values)))]
+        print(f"{name:<42} {len(values):>6} {p50:>7.3f}s {p95:>7.3f}s {values[-1]:>7.3f}s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Record or replay provider cassettes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Run the scenario against real providers and record it")
+    record.add_argument("images", nargs="+", help="Lab report images to extract")
+    record.add_argument("--out", required=True, help="Cassette file to write")
+    record.add_argument("--telegram-id", type=int, default=900_000_001, help="Synthetic user ID")
+
+    replay = commands.add_parser("replay", help="Replay the scenario offline and time our classes")
+    replay.add_argument("cassette", help="Cassette file")
+    replay.add_argument("--rounds", type=int, default=3, help="Times to run the scenario")
+    replay.add_argument("--speed", type=float, default=1.0, help="Latency divisor (0 = no waiting)")
+    replay.add_argument("--telegram-id", type=int, default=900_000_001, help="Synthetic user ID")
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+        # Never touch the real providers while replaying
+        from benchmarks.load_test import use_placeholder_env
+        use_placeholder_env()
+
+    from health_analyzer import HealthAnalyzer
+    from memory_manager import HealthMemoryManager
+    from database import HealthDatabase
+
+    analyzer, memory, database = HealthAnalyzer(), HealthMemoryManager(), HealthDatabase()
+
+    if args.command == "record":
+        images = []
+        for path in args.images:
+            with open(path, "rb") as f:
+                images.append(f.read())
+        cassette = Cassette(args.out, identities=[args.telegram_id, "cassette_user", "Cassette"])
+        install_recorders(analyzer, memory, database, cassette)
+        timings = run_scenario(analyzer, memory, database, images, args.telegram_id)
+        cassette.save()
+        _print_timings(timings)
+        print(f"\nRecorded {sum(len(v) for v in cassette.interactions.values())} interactions to {args.out}")
+        return 0
+
+    cassette = Cassette.load(args.cassette)
+    install_players(analyzer, memory, database, cassette, speed=args.speed)
+    images_recorded = len(cassette.interactions.get("gemini.generate_content", [])) or 1
+    timings: Dict[str, List[float]] = {}
+    for _ in range(args.rounds):
+        # Image content is never looked at on replay; only the count matters
+        for name, values in run_scenario(
+            analyzer, memory, database, [b""] * images_recorded, args.telegram_id
+        ).items():
+            timings.setdefault(name, []).extend(values)
+    _print_timings(timings)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""Extraction benchmark: image preprocessing settings vs Gemini accuracy.
+
+Downscaling and recompressing photos makes uploads smaller and Gemini
+faster, but too far and digits start to blur ("7.1" read as "7.7"). This
+benchmark runs a dataset from benchmarks.lab_reports through
+preprocess_image() at several settings, then HealthAnalyzer.extract_lab_data(),
+and scores each extraction against the ground truth.
+
+For each setting it reports:
+- Bytes sent to Gemini and the output resolution
+- Preprocessing and extraction latency (p50/p95)
+- Test recall (ground-truth tests found), and extra tests invented
+- Field-level accuracy: value, unit, reference range, status, test date
+
+Value accuracy is the number to watch - a wrong digit is worse than a
+missed test. Pick the smallest setting whose value accuracy matches the
+original image.
+
+This calls the real Gemini API (credentials from .env) once per image per
+setting; --dry-run only measures preprocessing.
+
+Usage (from the repository root):
+    python -m benchmarks.lab_reports --out bench_reports --count 40
+    python -m benchmarks.extraction_bench bench_reports
+    python -m benchmarks.extraction_bench bench_reports --max-edges original,1000,1280,1600 \\
+        --targets 120000,250000 --json extraction.json
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.lab_reports import canonical_name, load_dataset
+from image_preprocessor import preprocess_image
+
+_FIELDS = ("value", "unit", "reference_range", "status")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _numbers(text: Any) -> List[float]:
+    return [float(n) for n in _NUMBER.findall(str(text).replace(",", ""))]
+
+
+def _normalize_unit(unit: Any) -> str:
+    unit = str(unit).lower().replace("µ", "u").replace("μ", "u").replace("⁹", "^9")
+    unit = unit.replace("×", "x").replace("10e9", "10^9").replace("109/l", "10^9/l")
+    return re.sub(r"[\s^*]", "", unit)
+
+
+def _range_key(reference_range: Any) -> Tuple[str, List[float]]:
+    text = str(reference_range)
+    comparator = "<" if "<" in text or "up to" in text.lower() else ">" if ">" in text else ""
+    return comparator, _numbers(text)
+
+
+def _field_correct(field: str, expected: Dict[str, Any], actual: Dict[str, Any]) -> bool:
+    if field == "value":
+        # Same digits, whatever the formatting ("5.20" vs "5.2" is fine, "5.7" is not)
+        return _numbers(actual.get("value"))[:1] == _numbers(expected["value"])[:1]
+    if field == "unit":
+        return _normalize_unit(actual.get("unit", "")) == _normalize_unit(expected["unit"])
+    if field == "reference_range":
+        return _range_key(actual.get("reference_range", "")) == _range_key(expected["reference_range"])
+    return str(actual.get("status", "")).strip().lower() == expected["status"]
+
+
+def _match_tests(expected: List[Dict[str, Any]], actual: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Pair each ground-truth test with the extracted test of the same (or most similar) name."""
+    remaining = list(actual)
+    pairs = []
+    for truth in expected:
+        name = canonical_name(truth["name"])
+        best, best_ratio = None, 0.0
+        for candidate in remaining:
+            candidate_name = canonical_name(str(candidate.get("name", "")))
+            ratio = 1.0 if candidate_name == name else SequenceMatcher(
+                None, candidate_name.lower(), name.lower()
+            ).ratio()
+            if ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+        if best is not None and best_ratio >= 0.8:
+            remaining.remove(best)
+            pairs.append((truth, best))
+        else:
+            pairs.append((truth, None))
+    return pairs
+
+
+def score_extraction(truth: Dict[str, Any], extracted: Dict[str, Any]) -> Dict[str, Any]:
+    """Field-level comparison of one extraction with its ground truth.
+
+    Args:
+        truth: Ground-truth lab_data (from the JSON next to the image)
+        extracted: What extract_lab_data() returned
+
+    Returns:
+        Counts: tests, found, extra, per-field correct, date_correct, error
+    """
+    actual = [t for t in extracted.get("tests", []) if isinstance(t, dict)]
+    pairs = _match_tests(truth["tests"], actual)
+    found = [(t, a) for t, a in pairs if a is not None]
+    result = {
+        "tests": len(truth["tests"]),
+        "found": len(found),
+        "extra": len(actual) - len(found),
+        "date_correct": str(extracted.get("test_date", "")).strip() == truth["test_date"],
+        "error": extracted.get("error"),
+        "wrong_values": [
+            {"name": t["name"], "expected": t["value"], "got": a.get("value")}
+            for t, a in found if not _field_correct("value", t, a)
+        ],
+    }
+    for field in _FIELDS:
+        result[field] = sum(_field_correct(field, t, a) for t, a in found)
+    return result
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def parse_settings(max_edges: str, targets: str) -> List[Tuple[str, Optional[int], Optional[int]]]:
+    """Expand "original,1280,1600" x "150000,250000" into (label, max_long_edge, target_bytes)."""
+    settings = []
+    for edge in max_edges.split(","):
+        edge = edge.strip()
+        if edge == "original":
+            settings.append(("original", None, None))
+            continue
+        for target in targets.split(","):
+            settings.append((f"{edge}px/{int(target) // 1000}KB", int(edge), int(target)))
+    return settings
+
+
+def _prepare(path: str, max_long_edge: Optional[int], target_bytes: Optional[int]) -> Tuple[bytes, Dict[str, Any], float]:
+    start = time.perf_counter()
+    if max_long_edge is None:
+        with open(path, "rb") as f:
+            data = f.read()
+        return data, {"bytes_out": len(data)}, 0.0
+    data, stats = preprocess_image(path, max_long_edge=max_long_edge, target_bytes=target_bytes)
+    return data, stats, time.perf_counter() - start
+
+
+def run_setting(
+    dataset: List[Tuple[str, Dict[str, Any]]],
+    label: str,
+    max_long_edge: Optional[int],
+    target_bytes: Optional[int],
+    analyzer: Any = None,
+    concurrency: int = 4
+) -> Dict[str, Any]:
+    """Preprocess (and extract, if analyzer is given) every image at one setting.
+
+    Args:
+        dataset: (image path, ground truth) pairs
+        label: Setting name for the report
+        max_long_edge: preprocess_image() long edge; None sends the original file
+        target_bytes: preprocess_image() JPEG budget
+        analyzer: HealthAnalyzer, or None for a preprocessing-only run
+        concurrency: Parallel Gemini calls
+
+    Returns:
+        Per-image records plus the aggregate summary
+    """
+    # Preprocess sequentially so the timings aren't skewed by GIL contention
+    prepared = [_prepare(path, max_long_edge, target_bytes) for path, _ in dataset]
+
+    def extract(data: bytes) -> Tuple[Dict[str, Any], float]:
+        start = time.perf_counter()
+        lab_data = analyzer.extract_lab_data(data)
+        return lab_data, time.perf_counter() - start
+
+    extractions: List[Tuple[Dict[str, Any], float]] = []
+    if analyzer is not None:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            extractions = list(executor.map(extract, [data for data, _, _ in prepared]))
+
+    images = []
+    for index, ((path, truth), (data, stats, preprocess_seconds)) in enumerate(zip(dataset, prepared)):
+        record = {
+            "image": path, "bytes": len(data), "size": stats.get("size_out"),
+            "quality": stats.get("quality"), "preprocess_seconds": preprocess_seconds,
+            "render": truth.get("_render", {}),
+        }
+        if extractions:
+            lab_data, extract_seconds = extractions[index]
+            record["extract_seconds"] = extract_seconds
+            record["score"] = score_extraction(truth, lab_data)
+        images.append(record)
+
+    return {"setting": label, "max_long_edge": max_long_edge, "target_bytes": target_bytes,
+            "summary": summarize(images), "images": images}
+
+
+def summarize(images: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate one setting's per-image records."""
+    summary: Dict[str, Any] = {
+        "images": len(images),
+        "mean_bytes": sum(r["bytes"] for r in images) / len(images),
+        "preprocess_p50": _percentile([r["preprocess_seconds"] for r in images], 0.5),
+        "preprocess_p95": _percentile([r["preprocess_seconds"] for r in images], 0.95),
+    }
+    scores = [r["score"] for r in images if "score" in r]
+    if not scores:
+        return summary
+
+    tests = sum(s["tests"] for s in scores)
+    found = sum(s["found"] for s in scores)
+    summary.update({
+        "extract_p50": _percentile([r["extract_seconds"] for r in images], 0.5),
+        "extract_p95": _percentile([r["extract_seconds"] for r in images], 0.95),
+        "recall": found / tests if tests else 0.0,
+        "extra_tests": sum(s["extra"] for s in scores),
+        "errors": sum(1 for s in scores if s["error"]),
+        "date": sum(s["date_correct"] for s in scores) / len(scores),
+    })
+    for field in _FIELDS:
+        # Over all ground-truth tests: a missed test counts as a wrong field
+        summary[field] = sum(s[field] for s in scores) / tests if tests else 0.0
+    return summary
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    """Print one row per setting."""
+    extracted = "recall" in results[0]["summary"]
+    header = f"{'setting':<16} {'bytes':>9} {'prep p50':>9}"
+    if extracted:
+        header += f" {'gemini p50':>10} {'p95':>7} {'recall':>7} {'value':>7} {'unit':>7} {'range':>7} {'status':>7} {'date':>6} {'extra':>6}"
+    print(header)
+    for result in results:
+        s = result["summary"]
+        line = f"{result['setting']:<16} {s['mean_bytes'] / 1000:>7.0f}KB {s['preprocess_p50'] * 1000:>7.0f}ms"
+        if extracted:
+            line += (
+                f" {s['extract_p50']:>9.2f}s {s['extract_p95']:>6.2f}s {s['recall']:>7.1%} {s['value']:>7.1%}"
+                f" {s['unit']:>7.1%} {s['reference_range']:>7.1%} {s['status']:>7.1%} {s['date']:>6.0%} {s['extra_tests']:>6}"
+            )
+        print(line)
+
+    if extracted:
+        print("\nWrong values (first 10 per setting):")
+        for result in results:
+            wrong = [(r["image"], w) for r in result["images"] for w in r["score"]["wrong_values"]]
+            for image, w in wrong[:10]:
+                print(f"  {result['setting']:<16} {image}: {w['name']} expected {w['expected']}, got {w['got']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing settings against extraction accuracy")
+    parser.add_argument("dataset", help="Directory written by benchmarks.lab_reports")
+    parser.add_argument(
+        "--max-edges", default="original,1000,1280,1600",
+        help="Long edges to try; 'original' sends the file unprocessed (default: original,1000,1280,1600)"
+    )
+    parser.add_argument("--targets", default="250000", help="JPEG byte budgets to try (default: 250000)")
+    parser.add_argument("--limit", type=int, help="Only use the first N images")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel Gemini calls (default: 4)")
+    parser.add_argument("--dry-run", action="store_true", help="Only measure preprocessing (no Gemini calls)")
+    parser.add_argument("--json", help="Write per-image results to this JSON file")
+    args = parser.parse_args(argv)
+
+    dataset = load_dataset(args.dataset)[:args.limit]
+    if not dataset:
+        print(f"No report_*.jpg with ground truth found in {args.dataset}")
+        return 1
+
+    analyzer = None
+    if not args.dry_run:
+        from health_analyzer import HealthAnalyzer
+        analyzer = HealthAnalyzer()
+
+    settings = parse_settings(args.max_edges, args.targets)
+    print(f"{len(dataset)} images x {len(settings)} settings\n")
+    results = [
+        run_setting(dataset, label, edge, target, analyzer, args.concurrency)
+        for label, edge, target in settings
+    ]
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"\nWrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,542 @@
+"""Local stand-ins for Telegram and the provider APIs.
+
+The fakes replace the CLIENTS, not our classes: HealthAnalyzer,
+HealthMemoryManager and HealthDatabase keep running their real code
+(prompt building, JSON parsing, error handling, profile bookkeeping)
+against objects that mimic the Groq, Gemini, Mem0 and Supabase SDKs.
+
+Every fake call sleeps for a latency drawn from a LatencyProfile and
+fails with its error rate. Provider SDKs are blocking, so their fakes
+block too (time.sleep in the worker thread); Telegram is async.
+
+- FakeTelegramRequest     Bot API over a telegram.request.BaseRequest
+- FakeGroqClient          chat.completions.create (plain, JSON, streaming)
+- FakeGeminiModel         generate_content
+- FakeMem0Client          add / search / get_all
+- FakeSupabaseClient      in-memory tables behind the PostgREST query builder
+- FakeVideoGenerator      fal.ai / ElevenLabs (writes a small audio file)
+"""
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+
+class InjectedError(Exception):
+    """A failure injected by a latency profile."""
+
+
+class LatencyProfile:
+    """Log-normal latency with a tail, plus an error rate."""
+
+    def __init__(self, median: float, sigma: float = 0.4, error_rate: float = 0.0):
+        """Initialize the profile.
+
+        Args:
+            median: Median latency in seconds
+            sigma: Log-normal shape (0.4 gives p99 around 2.5x the median)
+            error_rate: Fraction of calls that fail (0-1)
+        """
+        self.median = median
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyProfile":
+        """Parse "median[,sigma[,error_rate]]", e.g. "0.4,0.5,0.02"."""
+        parts = [float(p) for p in spec.split(",")]
+        return cls(*parts)
+
+    def sample(self) -> float:
+        """Draw one latency in seconds."""
+        if self.median <= 0:
+            return 0.0
+        return random.lognormvariate(math.log(self.median), self.sigma)
+
+    def should_fail(self) -> bool:
+        """Count a call and decide whether it fails."""
+        failed = random.random() < self.error_rate
+        with self._lock:
+            self.calls += 1
+            if failed:
+                self.errors += 1
+        return failed
+
+    def block(self, name: str) -> None:
+        """Sleep like a blocking SDK call, then maybe raise."""
+        failed = self.should_fail()
+        time.sleep(self.sample())
+        if failed:
+            raise InjectedError(f"{name}: injected failure")
+
+    async def wait(self, name: str) -> None:
+        """Sleep like an async call, then maybe raise."""
+        failed = self.should_fail()
+        await asyncio.sleep(self.sample())
+        if failed:
+            raise InjectedError(f"{name}: injected failure")
+
+    def __repr__(self) -> str:
+        return f"{self.median * 1000:.0f}ms (sigma {self.sigma}, {self.error_rate:.1%} errors)"
+
+
+# Rough production latencies (median seconds, sigma, error rate)
+DEFAULT_PROFILES: Dict[str, LatencyProfile] = {
+    "telegram": LatencyProfile(0.08, 0.3, 0.0),
+    "telegram_file": LatencyProfile(0.25, 0.4, 0.0),
+    "groq": LatencyProfile(0.6, 0.4, 0.005),
+    "groq_first_token": LatencyProfile(0.2, 0.3, 0.0),
+    "gemini": LatencyProfile(4.0, 0.35, 0.01),
+    "mem0": LatencyProfile(0.5, 0.5, 0.01),
+    "supabase": LatencyProfile(0.06, 0.4, 0.002),
+    "tts": LatencyProfile(2.5, 0.4, 0.01),
+    "video": LatencyProfile(0.5, 0.3, 0.0),
+}
+
+
+# ==================== SYNTHETIC CONTENT ====================
+
+_TESTS = [
+    ("Total Cholesterol", "mmol/L", "< 5.2", (4.0, 7.0), 5.2),
+    ("LDL Cholesterol", "mmol/L", "< 3.4", (2.0, 5.0), 3.4),
+    ("HDL Cholesterol", "mmol/L", "> 1.0", (0.8, 2.0), None),
+    ("Fasting Glucose", "mmol/L", "3.9 - 6.0", (4.0, 8.0), 6.0),
+    ("HbA1c", "%", "< 6.0", (5.0, 8.0), 6.0),
+    ("Creatinine", "umol/L", "45 - 90", (50, 120), 90),
+]
+
+
+def fake_lab_data(rng: random.Random = random) -> Dict[str, Any]:
+    """Plausible extraction result, shaped like LAB_EXTRACTION_PROMPT output."""
+    tests = []
+    for name, unit, reference_range, (low, high), limit in rng.sample(_TESTS, k=rng.randint(3, len(_TESTS))):
+        value = round(rng.uniform(low, high), 1)
+        status = "high" if limit is not None and value > limit else "normal"
+        tests.append({
+            "name": name, "value": str(value), "unit": unit,
+            "reference_range": reference_range, "status": status,
+        })
+    return {"test_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", "tests": tests}
+
+
+def fake_reply(chars: int, rng: random.Random = random) -> str:
+    """Filler reply text of roughly the given length."""
+    words = ["Aiyo", "lah", "your", "cholesterol", "a bit", "high", "leh", "must",
+             "eat", "less", "char kway teow", "okay?", "walk", "more", "after", "dinner."]
+    out: List[str] = []
+    length = 0
+    while length < chars:
+        word = rng.choice(words)
+        out.append(word)
+        length += len(word) + 1
+    return " ".join(out)
+
+
+def synthetic_report_jpeg(width: int, height: int) -> bytes:
+    """A plain lab-report-looking JPEG (text rows on white) of the given size."""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    row_height = max(12, height // 40)
+    draw.text((width // 12, row_height), "CLINICAL LABORATORY REPORT", fill="black")
+    for row in range(3, 36):
+        y = row * row_height
+        name, unit, reference_range, (low, high), _ = _TESTS[row % len(_TESTS)]
+        line = f"{name:<22} {random.uniform(low, high):6.1f} {unit:<8} {reference_range}"
+        draw.text((width // 12, y), line, fill="black")
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+# ==================== TELEGRAM ====================
+
+_FILE_PATH_SIZE = re.compile(r"(\d+)x(\d+)")
+
+
+class FakeTelegramRequest(BaseRequest):
+    """Answers Bot API calls locally, with Telegram-like latency.
+
+    File IDs of the form "photo-<w>x<h>-..." download as synthetic report
+    JPEGs of that size. Downloads get random trailing bytes so every upload
+    has a distinct content hash (no accidental extraction cache hits).
+    """
+
+    def __init__(self, api: LatencyProfile, files: LatencyProfile, bot_id: int = 1):
+        self.api = api
+        self.files = files
+        self.bot_id = bot_id
+        self.calls: Dict[str, int] = {}
+        self._message_id = 1000
+        self._jpegs: Dict[Tuple[int, int], bytes] = {}
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _next_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        self._message_id += 1
+        chat_id = params.get("chat_id") or 0
+        return {
+            "message_id": params.get("message_id") or self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"},
+            "from": {"id": self.bot_id, "is_bot": True, "first_name": "Dr. Aunty"},
+            "text": params.get("text") or params.get("caption") or "",
+        }
+
+    def _photo(self, file_path: str) -> bytes:
+        match = _FILE_PATH_SIZE.search(file_path)
+        size = (int(match.group(1)), int(match.group(2))) if match else (1280, 1706)
+        if size not in self._jpegs:
+            self._jpegs[size] = synthetic_report_jpeg(*size)
+        return self._jpegs[size] + os.urandom(16)
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout: Any = None,
+        write_timeout: Any = None,
+        connect_timeout: Any = None,
+        pool_timeout: Any = None,
+    ) -> Tuple[int, bytes]:
+        if "/file/bot" in url:
+            await self.files.wait("telegram file download")
+            return 200, self._photo(url)
+
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        params = request_data.parameters if request_data else {}
+        await self.api.wait(f"telegram {endpoint}")
+
+        if endpoint == "getMe":
+            result: Any = {
+                "id": self.bot_id, "is_bot": True, "first_name": "Dr. Aunty",
+                "username": "dr_aunty_bench_bot",
+            }
+        elif endpoint == "getFile":
+            file_id = str(params.get("file_id"))
+            result = {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_size": 300_000,
+                "file_path": f"photos/{file_id}.jpg",
+            }
+        elif endpoint.startswith(("send", "edit")) and endpoint != "sendChatAction":
+            result = self._next_message(params)
+        else:
+            # answerCallbackQuery, deleteMessage, sendChatAction, ...
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+# ==================== GROQ ====================
+
+class _Obj:
+    """Attribute bag standing in for SDK response objects."""
+
+    def __init__(self, **fields: Any):
+        self.__dict__.update(fields)
+
+
+class FakeGroqClient:
+    """groq.Groq look-alike: client.chat.completions.create(...)."""
+
+    def __init__(self, profile: LatencyProfile, first_token: LatencyProfile, chars_per_second: float = 800):
+        self.profile = profile
+        self.first_token = first_token
+        self.chars_per_second = chars_per_second
+        self.chat = _Obj(completions=_Obj(create=self.create))
+
+    def create(self, messages: List[Dict[str, str]], model: str = "", max_tokens: int = 500,
+               stream: bool = False, response_format: Optional[Dict[str, str]] = None, **kwargs: Any):
+        if response_format and response_format.get("type") == "json_object":
+            content = json.dumps(fake_lab_data())
+        else:
+            content = fake_reply(min(max_tokens * 3, 1200))
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        usage = _Obj(prompt_tokens=prompt_tokens, completion_tokens=len(content) // 4)
+
+        if stream:
+            return self._stream(content, usage)
+
+        self.profile.block("groq")
+        return _Obj(choices=[_Obj(message=_Obj(content=content))], usage=usage)
+
+    def _stream(self, content: str, usage: Any) -> Iterator[Any]:
+        self.first_token.block("groq stream")
+        step = 24
+        for start in range(0, len(content), step):
+            time.sleep(step / self.chars_per_second)
+            delta = _Obj(content=content[start:start + step])
+            last = start + step >= len(content)
+            yield _Obj(choices=[_Obj(delta=delta)], x_groq=_Obj(usage=usage) if last else None)
+
+
+# ==================== GEMINI ====================
+
+class FakeGeminiModel:
+    """genai.GenerativeModel look-alike."""
+
+    def __init__(self, profile: LatencyProfile):
+        self.profile = profile
+
+    def generate_content(self, parts: List[Any], request_options: Optional[Dict[str, Any]] = None):
+        self.profile.block("gemini")
+        text = "```json\n" + json.dumps(fake_lab_data()) + "\n```"
+        usage = _Obj(prompt_token_count=1290, candidates_token_count=len(text) // 4)
+        return _Obj(text=text, usage_metadata=usage)
+
+
+# ==================== MEM0 ====================
+
+class FakeMem0Client:
+    """mem0.MemoryClient look-alike (memories kept in memory)."""
+
+    def __init__(self, profile: LatencyProfile):
+        self.profile = profile
+        self._memories: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, messages: List[Dict[str, str]], user_id: str, **kwargs: Any):
+        self.profile.block("mem0 add")
+        text = " ".join(m["content"] for m in messages)
+        with self._lock:
+            memories = self._memories.setdefault(user_id, [])
+            memories.append({"id": str(len(memories) + 1), "memory": text[:500]})
+        return {"results": [{"event": "ADD"}]}
+
+    def search(self, query: str, user_id: str, limit: int = 5, **kwargs: Any):
+        self.profile.block("mem0 search")
+        with self._lock:
+            return {"results": list(self._memories.get(user_id, []))[-limit:]}
+
+    def get_all(self, user_id: str, **kwargs: Any):
+        self.profile.block("mem0 get_all")
+        with self._lock:
+            return list(self._memories.get(user_id, []))
+
+
+# ==================== SUPABASE ====================
+
+# Conflict columns used by upsert(), per table
+_UPSERT_KEYS = {
+    "users": ("telegram_id",),
+    "health_profiles": ("telegram_id",),
+    "caregivers": ("patient_telegram_id", "caregiver_telegram_id"),
+}
+
+
+class FakeSupabaseClient:
+    """supabase.Client look-alike with in-memory tables.
+
+    Supports the query builder calls HealthDatabase makes: select, insert,
+    upsert, update, delete, eq, neq, or_ (keyset form), order, limit.
+    """
+
+    def __init__(self, profile: LatencyProfile):
+        self.profile = profile
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self._next_id: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def table(self, name: str) -> "_FakeQuery":
+        return _FakeQuery(self, name)
+
+    def _insert_row(self, name: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(row)
+        self._next_id[name] = self._next_id.get(name, 0) + 1
+        row.setdefault("id", self._next_id[name])
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        self.tables.setdefault(name, []).append(row)
+        return row
+
+
+def _parse_value(value: str) -> Any:
+    value = value.strip('"')
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+def _split_top_level(expr: str) -> List[str]:
+    parts, depth, current = [], 0, ""
+    for char in expr:
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    parts.append(current)
+    return parts
+
+
+_OPS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "lt": lambda a, b: a is not None and a < b,
+    "gt": lambda a, b: a is not None and a > b,
+}
+
+
+def _or_filter(expr: str):
+    """Compile a PostgREST or=(...) expression into a row predicate."""
+    terms = []
+    for term in _split_top_level(expr):
+        if term.startswith("and(") and term.endswith(")"):
+            inner = [_or_filter(part) for part in _split_top_level(term[4:-1])]
+            terms.append(lambda row, inner=inner: all(pred(row) for pred in inner))
+        else:
+            column, op, value = term.split(".", 2)
+            terms.append(lambda row, c=column, o=op, v=_parse_value(value): _OPS[o](row.get(c), v))
+    return lambda row: any(pred(row) for pred in terms)
+
+
+class _FakeQuery:
+    """One query builder chain on a fake table."""
+
+    def __init__(self, client: FakeSupabaseClient, table: str):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.payload: Any = None
+        self.columns: Optional[List[str]] = None
+        self.filters: List[Any] = []
+        self.ordering: List[Tuple[str, bool]] = []
+        self.row_limit: Optional[int] = None
+
+    def select(self, columns: str = "*") -> "_FakeQuery":
+        self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, data: Any) -> "_FakeQuery":
+        self.action, self.payload = "insert", data
+        return self
+
+    def upsert(self, data: Any, **kwargs: Any) -> "_FakeQuery":
+        self.action, self.payload = "upsert", data
+        return self
+
+    def update(self, data: Dict[str, Any]) -> "_FakeQuery":
+        self.action, self.payload = "update", data
+        return self
+
+    def delete(self) -> "_FakeQuery":
+        self.action = "delete"
+        return self
+
+    def eq(self, column: str, value: Any) -> "_FakeQuery":
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column: str, value: Any) -> "_FakeQuery":
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def or_(self, expr: str) -> "_FakeQuery":
+        self.filters.append(_or_filter(expr))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "_FakeQuery":
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, count: int) -> "_FakeQuery":
+        self.row_limit = count
+        return self
+
+    def execute(self) -> Any:
+        self.client.profile.block(f"supabase {self.action} {self.table}")
+        with self.client.lock:
+            return _Obj(data=self._run())
+
+    def _run(self) -> List[Dict[str, Any]]:
+        client = self.client
+        rows = client.tables.setdefault(self.table, [])
+
+        if self.action in ("insert", "upsert"):
+            items = self.payload if isinstance(self.payload, list) else [self.payload]
+            keys = _UPSERT_KEYS.get(self.table, ("id",))
+            written = []
+            for item in items:
+                existing = None
+                if self.action == "upsert":
+                    existing = next(
+                        (r for r in rows if all(r.get(k) == item.get(k) for k in keys)), None
+                    )
+                if existing is not None:
+                    existing.update(item)
+                    written.append(dict(existing))
+                else:
+                    written.append(dict(client._insert_row(self.table, item)))
+            return written
+
+        matched = [row for row in rows if all(f(row) for f in self.filters)]
+        if self.action == "update":
+            for row in matched:
+                row.update(self.payload)
+            return [dict(row) for row in matched]
+        if self.action == "delete":
+            client.tables[self.table] = [row for row in rows if row not in matched]
+            return [dict(row) for row in matched]
+
+        for column, desc in reversed(self.ordering):
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if self.row_limit is not None:
+            matched = matched[:self.row_limit]
+        if self.columns:
+            return [{c: row.get(c) for c in self.columns} for row in matched]
+        return [dict(row) for row in matched]
+
+
+# ==================== VIDEO / AUDIO ====================
+
+class FakeVideoGenerator:
+    """VideoGenerator look-alike: no video, small audio files."""
+
+    def __init__(self, tts: LatencyProfile, video: LatencyProfile):
+        self.tts = tts
+        self.video = video
+        self.fal_available = False
+        self.elevenlabs_available = True
+
+    async def generate_single_chunk_async(self, chunk: str, index: int, total_chunks: int):
+        # Like the real generator today: no video, callers fall back to audio
+        await self.video.wait("video")
+        return (index, chunk, None)
+
+    def generate_audio_summary(self, script: str) -> Optional[str]:
+        try:
+            self.tts.block("tts")
+        except InjectedError:
+            return None
+        fd, path = tempfile.mkstemp(suffix=".mp3", prefix="dr_aunty_bench_")
+        with os.fdopen(fd, "wb") as f:
+            # ~1 KB per 10 characters, like a 64 kbps voice track
+            f.write(os.urandom(max(1024, len(script) * 100)))
+        return path
+
+    def generate_health_summary_video(self, script: str, duration: int = 8) -> Optional[str]:
+        return None
@@ -0,0 +1,155 @@
+"""Import-time report: what a cold `import main` costs, module by module.
+
+Every container cold start, CLI and benchmark run pays for importing the
+bot before it does anything. This runs `python -X importtime -c "import
+<module>"` in fresh interpreters and breaks the result down:
+
+- Total import time (best of --runs, so disk cache noise drops out)
+- Per package: self time summed over each top-level package
+  (telegram, httpx, PIL, google, ...) - where third-party time goes
+- Per project module: cumulative time of each of our own modules
+- The slowest individual modules by self time
+
+With --budget-ms it exits non-zero when the total is over budget, so it
+can guard against a heavy SDK creeping back into the import path.
+
+Usage (from the repository root):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time main --runs 5 --budget-ms 600
+    python -m benchmarks.import_time health_analyzer --top 30
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def project_modules() -> List[str]:
+    """Module names of the repository's own top-level .py files."""
+    return sorted(
+        os.path.splitext(os.path.basename(path))[0]
+        for path in glob.glob(os.path.join(_ROOT, "*.py"))
+    )
+
+
+def measure(module: str) -> List[Tuple[str, int, int, int]]:
+    """Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Module to import (e.g. "main")
+
+    Returns:
+        (module, self us, cumulative us, nesting depth) per imported module,
+        in the order Python reports them
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        errors = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))
+        raise RuntimeError(f"import {module} failed:\n{errors}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def breakdown(rows: List[Tuple[str, int, int, int]], target: str, top: int = 15) -> Dict[str, Any]:
+    """Summarize one -X importtime run.
+
+    Args:
+        rows: Output of measure()
+        target: The module that was imported
+        top: How many of the slowest modules to list
+
+    Returns:
+        Total, per-package, per-project-module and slowest-module timings (ms)
+    """
+    ours = set(project_modules())
+    total_us = next((cumulative for name, _, cumulative, _ in rows if name == target), 0)
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        root = name.split(".")[0]
+        packages["(project)" if root in ours else root] += self_us
+
+    project = {}
+    for name, _, cumulative_us, _ in rows:
+        if name in ours:
+            project[name] = cumulative_us / 1000
+
+    slowest = sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+    return {
+        "module": target,
+        "total_ms": total_us / 1000,
+        "modules_imported": len(rows),
+        "packages_ms": {
+            name: us / 1000 for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        },
+        "project_ms": dict(sorted(project.items(), key=lambda item: item[1], reverse=True)),
+        "slowest_ms": [{"module": name, "self": s / 1000, "cumulative": c / 1000} for name, s, c, _ in slowest],
+    }
+
+
+def print_report(report: Dict[str, Any], runs: List[float], top: int) -> None:
+    """Print the breakdown as tables."""
+    print(f"import {report['module']}: {report['total_ms']:.0f} ms "
+          f"(best of {len(runs)}: {', '.join(f'{r:.0f}' for r in runs)} ms), "
+          f"{report['modules_imported']} modules\n")
+
+    print(f"{'package':<32} {'self ms':>9} {'share':>7}")
+    for name, ms in list(report["packages_ms"].items())[:top]:
+        share = ms / report["total_ms"] if report["total_ms"] else 0.0
+        print(f"{name:<32} {ms:>9.1f} {share:>7.1%}")
+
+    print(f"\n{'project module':<32} {'cumulative ms':>14}")
+    for name, ms in report["project_ms"].items():
+        print(f"{name:<32} {ms:>14.1f}")
+
+    print(f"\n{'slowest modules':<48} {'self ms':>9} {'cumul ms':>9}")
+    for row in report["slowest_ms"]:
+        print(f"{row['module']:<48} {row['self']:>9.1f} {row['cumulative']:>9.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Per-module import-time breakdown")
+    parser.add_argument("module", nargs="?", default="main", help="Module to import (default: main)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to try; the fastest is reported (default: 3)")
+    parser.add_argument("--top", type=int, default=15, help="Rows per table (default: 15)")
+    parser.add_argument("--budget-ms", type=float, help="Exit with status 1 if the import takes longer")
+    parser.add_argument("--json", help="Write the breakdown to this JSON file")
+    args = parser.parse_args(argv)
+
+    try:
+        reports = [breakdown(measure(args.module), args.module, args.top) for _ in range(max(1, args.runs))]
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 2
+    best = min(reports, key=lambda report: report["total_ms"])
+    print_report(best, [report["total_ms"] for report in reports], args.top)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(best, f, indent=2)
+
+    if args.budget_ms is not None and best["total_ms"] > args.budget_ms:
+        print(f"\n❌ import {args.module} took {best['total_ms']:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+"""Synthetic lab report images with ground truth, for extraction benchmarks.
+
+Renders report-like pages with PIL, each with a different combination of:
+- Test panels (lipid, diabetes, renal, liver, blood count, thyroid)
+- Units (mmol/L vs mg/dL, umol/L vs mg/dL, g/dL vs g/L)
+- Fonts and sizes (whatever TrueType fonts the machine has)
+- Layout (column order, flag column, test name aliases)
+- Photo artefacts: page skew, blur, uneven lighting, noise, resolution
+  and JPEG quality
+
+Every image is written with a JSON file next to it holding the ground-truth
+lab_data in the shape LAB_EXTRACTION_PROMPT asks Gemini for, plus the
+render settings under "_render" (used to slice benchmark results).
+
+Usage (from the repository root):
+    python -m benchmarks.lab_reports --out bench_reports --count 60
+    python -m benchmarks.lab_reports --out bench_reports --count 20 --skew 0 --blur 0
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# (display names, [(unit, factor from the first unit, decimals)], (low, high) in first unit)
+# A None bound is an open range ("< 5.2", "> 1.0")
+_PANELS: Dict[str, List[Tuple[Sequence[str], Sequence[Tuple[str, float, int]], Tuple[Optional[float], Optional[float]]]]] = {
+    "Lipid Panel": [
+        (("Total Cholesterol", "Cholesterol, Total"), (("mmol/L", 1, 1), ("mg/dL", 38.67, 0)), (None, 5.2)),
+        (("LDL Cholesterol", "LDL-C"), (("mmol/L", 1, 1), ("mg/dL", 38.67, 0)), (None, 3.4)),
+        (("HDL Cholesterol", "HDL-C"), (("mmol/L", 1, 2), ("mg/dL", 38.67, 0)), (1.0, None)),
+        (("Triglycerides", "Triglyceride"), (("mmol/L", 1, 2), ("mg/dL", 88.57, 0)), (None, 1.7)),
+    ],
+    "Diabetes Screen": [
+        (("Fasting Glucose", "Glucose (Fasting)"), (("mmol/L", 1, 1), ("mg/dL", 18.0, 0)), (3.9, 6.0)),
+        (("HbA1c", "Glycated Haemoglobin"), (("%", 1, 1),), (4.0, 5.6)),
+    ],
+    "Renal Function": [
+        (("Creatinine", "Serum Creatinine"), (("umol/L", 1, 0), ("mg/dL", 1 / 88.4, 2)), (60, 110)),
+        (("Urea",), (("mmol/L", 1, 1),), (2.5, 7.1)),
+        (("eGFR",), (("mL/min/1.73m2", 1, 0),), (90, None)),
+        (("Uric Acid",), (("umol/L", 1, 0), ("mg/dL", 1 / 59.48, 1)), (200, 420)),
+    ],
+    "Liver Function": [
+        (("ALT", "Alanine Aminotransferase"), (("U/L", 1, 0),), (10, 40)),
+        (("AST", "Aspartate Aminotransferase"), (("U/L", 1, 0),), (10, 40)),
+        (("ALP", "Alkaline Phosphatase"), (("U/L", 1, 0),), (40, 130)),
+        (("Total Bilirubin", "Bilirubin, Total"), (("umol/L", 1, 0), ("mg/dL", 1 / 17.1, 1)), (3, 21)),
+        (("Albumin",), (("g/L", 1, 0), ("g/dL", 0.1, 1)), (35, 50)),
+    ],
+    "Full Blood Count": [
+        (("Haemoglobin", "Hemoglobin"), (("g/dL", 1, 1), ("g/L", 10, 0)), (13.0, 17.0)),
+        (("White Blood Cells", "WBC"), (("x10^9/L", 1, 1),), (4.0, 11.0)),
+        (("Platelets", "Platelet Count"), (("x10^9/L", 1, 0),), (150, 400)),
+        (("Haematocrit", "Hematocrit"), (("%", 1, 1),), (40.0, 50.0)),
+    ],
+    "Thyroid Function": [
+        (("TSH",), (("mIU/L", 1, 2),), (0.4, 4.0)),
+        (("Free T4", "FT4"), (("pmol/L", 1, 1),), (10.0, 22.0)),
+    ],
+}
+
+_ALIASES = {
+    "".join(ch for ch in alias.lower() if ch.isalnum()): names[0]
+    for tests in _PANELS.values() for names, _, _ in tests for alias in names
+}
+
+_CLINICS = (
+    "Tanjong Pagar Family Clinic", "Bukit Merah Polyclinic Laboratory",
+    "Heartland Medical Centre", "Orchard Diagnostics Pte Ltd", "Jurong Health Lab Services",
+)
+
+# Font families to look for, most report-like first
+_FONT_NAMES = ("DejaVuSans", "DejaVuSansMono", "DejaVuSerif", "LiberationSans", "LiberationMono",
+               "LiberationSerif", "Arial", "Courier", "Times", "Helvetica", "FreeSans", "FreeMono")
+_FONT_DIRS = ("/usr/share/fonts", "/usr/local/share/fonts", "/Library/Fonts",
+              "/System/Library/Fonts", "C:/Windows/Fonts", os.path.expanduser("~/.fonts"))
+
+
+def find_fonts() -> List[str]:
+    """TrueType fonts available on this machine (regular weights of known families)."""
+    fonts = []
+    for directory in _FONT_DIRS:
+        for path in glob.glob(os.path.join(directory, "**", "*.tt[fc]"), recursive=True):
+            stem = os.path.splitext(os.path.basename(path))[0]
+            if stem.split("-")[0] in _FONT_NAMES and "Bold" not in stem and "Oblique" not in stem:
+                fonts.append(path)
+    return sorted(set(fonts))
+
+
+def _load_font(path: Optional[str], size: int) -> ImageFont.ImageFont:
+    if path:
+        return ImageFont.truetype(path, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1: fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def canonical_name(name: str) -> str:
+    """Map a test name or any of its aliases to the panel's primary name.
+
+    Unknown names come back lower-cased with punctuation stripped, so
+    free-form names from an extraction can still be compared.
+    """
+    key = "".join(ch for ch in name.lower() if ch.isalnum())
+    return _ALIASES.get(key, key)
+
+
+def _format_bound(value: float, decimals: int) -> str:
+    return f"{value:.{decimals}f}"
+
+
+def _sample_test(rng: random.Random, test, unit_style: str) -> Dict[str, Any]:
+    """Pick a unit and value for one test; compute its range and status."""
+    names, units, (low, high) = test
+    name = names[0] if rng.random() < 0.7 else rng.choice(names)
+    unit, factor, decimals = units[0] if unit_style == "si" or len(units) == 1 else units[-1]
+
+    # About a third of results are out of range
+    lo = low if low is not None else high * 0.5
+    hi = high if high is not None else low * 2
+    span = hi - lo
+    roll = rng.random()
+    if roll < 0.17 and low is not None:
+        value = rng.uniform(lo - 0.4 * span, lo)
+    elif roll < 0.34 and high is not None:
+        value = rng.uniform(hi, hi + 0.6 * span)
+    else:
+        value = rng.uniform(lo, hi)
+    value = max(value, 0.5 * lo) * factor
+
+    value_text = f"{value:.{decimals}f}"
+    value = float(value_text)
+    low_u = low * factor if low is not None else None
+    high_u = high * factor if high is not None else None
+    if low_u is not None and high_u is not None:
+        reference_range = f"{_format_bound(low_u, decimals)} - {_format_bound(high_u, decimals)}"
+    elif high_u is not None:
+        reference_range = f"< {_format_bound(high_u, decimals)}"
+    else:
+        reference_range = f"> {_format_bound(low_u, decimals)}"
+
+    if low_u is not None and value < float(_format_bound(low_u, decimals)):
+        status = "low"
+    elif high_u is not None and value > float(_format_bound(high_u, decimals)):
+        status = "high"
+    else:
+        status = "normal"
+
+    return {"name": name, "value": value_text, "unit": unit, "reference_range": reference_range, "status": status}
+
+
+def generate_report(rng: random.Random, fonts: Sequence[str], options: Dict[str, Any]) -> Tuple[Image.Image, Dict[str, Any]]:
+    """Render one lab report.
+
+    Args:
+        rng: Random source (seeded for reproducible datasets)
+        fonts: TrueType font paths to pick from (empty = PIL default font)
+        options: Upper bounds for the artefacts (skew, blur, noise, quality)
+
+    Returns:
+        Tuple of (rendered image, ground-truth lab_data with "_render" settings)
+    """
+    panels = rng.sample(list(_PANELS), k=rng.randint(1, 3))
+    unit_style = "si" if rng.random() < 0.7 else "conventional"
+    tests = [_sample_test(rng, test, unit_style) for panel in panels for test in _PANELS[panel]]
+    test_date = (date(2023, 1, 1) + timedelta(days=rng.randrange(1000))).isoformat()
+
+    font_path = rng.choice(fonts) if fonts else None
+    font_size = rng.randint(16, 26)
+    font = _load_font(font_path, font_size)
+    header_font = _load_font(font_path, int(font_size * 1.4))
+    line_height = int(font_size * 1.6)
+
+    # Page: A4 proportions, tall enough for every row
+    rows = len(tests) + 2 * len(panels) + 10
+    width = rng.randint(1400, 1800)
+    height = max(int(width * 1.414), rows * line_height + 200)
+    page = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(page)
+
+    margin = int(width * 0.07)
+    y = margin
+    draw.text((margin, y), rng.choice(_CLINICS), font=header_font, fill=0)
+    y += int(line_height * 1.6)
+    draw.text((margin, y), "LABORATORY REPORT", font=font, fill=0)
+    y += line_height
+    date_style = rng.choice(("%d/%m/%Y", "%d %b %Y", "%Y-%m-%d"))
+    collected = date.fromisoformat(test_date).strftime(date_style)
+    draw.text((margin, y), f"Patient: TAN AH KOW    Collected: {collected}", font=font, fill=0)
+    y += int(line_height * 1.5)
+
+    with_flag = rng.random() < 0.6
+    columns = ["name", "value", "unit", "reference_range"] if rng.random() < 0.75 \
+        else ["name", "reference_range", "value", "unit"]
+    headings = {"name": "Test", "value": "Result", "unit": "Units", "reference_range": "Reference Range"}
+    offsets = {"name": 0.0, "value": 0.40, "unit": 0.55, "reference_range": 0.72}
+    if columns[1] == "reference_range":
+        offsets = {"name": 0.0, "reference_range": 0.40, "value": 0.62, "unit": 0.76}
+    usable = width - 2 * margin
+
+    def row(cells: Dict[str, str], flag: str = "") -> None:
+        for column in columns:
+            draw.text((margin + int(offsets[column] * usable), y), cells[column], font=font, fill=0)
+        if with_flag and flag:
+            draw.text((margin + int(0.93 * usable), y), flag, font=font, fill=0)
+
+    row(headings, "Flag")
+    y += line_height
+    draw.line((margin, y - line_height // 4, width - margin, y - line_height // 4), fill=0, width=2)
+    test_iter = iter(tests)
+    for panel in panels:
+        y += line_height // 2
+        draw.text((margin, y), panel.upper(), font=font, fill=0)
+        y += line_height
+        for _ in _PANELS[panel]:
+            test = next(test_iter)
+            row(test, {"high": "H", "low": "L"}.get(test["status"], ""))
+            y += line_height
+
+    page = page.crop((0, 0, width, min(height, y + margin * 2)))
+    image, render = _photograph(rng, page, options)
+    render.update({
+        "panels": panels, "units": unit_style, "font": os.path.basename(font_path) if font_path else "default",
+        "font_size": font_size, "flag_column": with_flag, "columns": columns,
+    })
+    truth = {"test_date": test_date, "tests": tests, "_render": render}
+    return image, truth
+
+
+def _photograph(rng: random.Random, page: Image.Image, options: Dict[str, Any]) -> Tuple[Image.Image, Dict[str, Any]]:
+    """Make a clean page look like a phone photo of it."""
+    skew = rng.uniform(-options["skew"], options["skew"])
+    blur = rng.uniform(0, options["blur"])
+    noise = rng.uniform(0, options["noise"])
+    scale = rng.uniform(options["min_scale"], 1.0)
+
+    # Warm-tinted paper on a darker desk, with a lighting gradient
+    paper = Image.merge("RGB", [page.point(lambda v, k=k: int(v * k)) for k in (1.0, 0.97, 0.92)])
+    border = int(max(page.size) * 0.08)
+    desk = tuple(rng.randint(40, 110) for _ in range(3))
+    photo = Image.new("RGB", (page.width + 2 * border, page.height + 2 * border), desk)
+    photo.paste(paper, (border, border))
+    photo = photo.rotate(skew, resample=Image.Resampling.BICUBIC, expand=False, fillcolor=desk)
+
+    lighting = rng.uniform(0.1, 0.35)
+    shade = Image.linear_gradient("L").resize(photo.size).point(lambda v: 255 - int(v * lighting))
+    photo = Image.composite(photo, Image.new("RGB", photo.size, (0, 0, 0)), shade)
+    if noise > 0:
+        grain = Image.frombytes("L", photo.size, rng.randbytes(photo.width * photo.height)).convert("RGB")
+        photo = Image.blend(photo, grain, min(0.2, noise * 0.08))
+    if blur > 0:
+        photo = photo.filter(ImageFilter.GaussianBlur(blur))
+    if scale < 1.0:
+        photo = photo.resize((int(photo.width * scale), int(photo.height * scale)), Image.Resampling.BILINEAR)
+
+    quality = rng.randint(options["min_quality"], 95)
+    render = {"skew": round(skew, 2), "blur": round(blur, 2), "noise": round(noise, 2),
+              "scale": round(scale, 2), "jpeg_quality": quality, "size": list(photo.size)}
+    return photo, render
+
+
+def generate_dataset(out_dir: str, count: int, seed: int = 1, **options: Any) -> List[str]:
+    """Write count report images plus ground-truth JSON files.
+
+    Args:
+        out_dir: Output directory (report_000.jpg + report_000.json, ...)
+        count: Number of reports
+        seed: Random seed; the same seed reproduces the same dataset
+        **options: skew, blur, noise, min_scale, min_quality overrides
+
+    Returns:
+        Paths of the written images
+    """
+    settings = {"skew": 4.0, "blur": 1.2, "noise": 1.0, "min_scale": 0.6, "min_quality": 55}
+    settings.update({k: v for k, v in options.items() if v is not None})
+    rng = random.Random(seed)
+    fonts = find_fonts()
+    os.makedirs(out_dir, exist_ok=True)
+
+    paths = []
+    for index in range(count):
+        image, truth = generate_report(rng, fonts, settings)
+        stem = os.path.join(out_dir, f"report_{index:03d}")
+        image.save(f"{stem}.jpg", format="JPEG", quality=truth["_render"]["jpeg_quality"])
+        with open(f"{stem}.json", "w", encoding="utf-8") as f:
+            json.dump(truth, f, indent=2)
+        paths.append(f"{stem}.jpg")
+    return paths
+
+
+def load_dataset(directory: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """Image paths with their ground truth, for every report_*.jpg that has a JSON file."""
+    dataset = []
+    for image_path in sorted(glob.glob(os.path.join(directory, "*.jpg"))):
+        truth_path = os.path.splitext(image_path)[0] + ".json"
+        if os.path.exists(truth_path):
+            with open(truth_path, encoding="utf-8") as f:
+                dataset.append((image_path, json.load(f)))
+    return dataset
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic lab report images with ground truth")
+    parser.add_argument("--out", default="bench_reports", help="Output directory (default: bench_reports)")
+    parser.add_argument("--count", type=int, default=40, help="Number of reports (default: 40)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1)")
+    parser.add_argument("--skew", type=float, help="Max page rotation in degrees (default: 4)")
+    parser.add_argument("--blur", type=float, help="Max Gaussian blur radius (default: 1.2)")
+    parser.add_argument("--noise", type=float, help="Max sensor noise level (default: 1.0)")
+    parser.add_argument("--min-scale", type=float, help="Smallest photo scale vs the page (default: 0.6)")
+    parser.add_argument("--min-quality", type=int, help="Lowest JPEG quality (default: 55)")
+    args = parser.parse_args(argv)
+
+    fonts = find_fonts()
+    print(f"Fonts: {', '.join(os.path.basename(f) for f in fonts) or 'PIL default only'}")
+    paths = generate_dataset(
+        args.out, args.count, args.seed, skew=args.skew, blur=args.blur,
+        noise=args.noise, min_scale=args.min_scale, min_quality=args.min_quality
+    )
+    print(f"Wrote {len(paths)} reports with ground truth to {args.out}/")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+"""Offline load test: the real handlers in main.py against local fakes.
+
+Builds synthetic Telegram updates (text, photo, /history, /stats, /video)
+and feeds them through the same PerUserUpdateProcessor, rate limiter and
+handlers as production. Telegram, Groq, Gemini, Mem0, Supabase and
+ElevenLabs are replaced by the fakes in benchmarks.fakes, so no network
+access or API credits are needed.
+
+For each concurrency level it reports:
+- Throughput (updates/second)
+- p50/p95/p99/max latency per handler
+- Event loop lag (how late a 50 ms timer fires - blocking work on the loop)
+- Per-stage latency from the metrics module, and injected provider errors
+
+Usage (from the repository root):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --concurrency 1,8,32,64 --updates 300
+    python -m benchmarks.load_test --mix text=5,photo=3,history=1,stats=1,video=1
+    python -m benchmarks.load_test --latency gemini=6,0.5,0.05 --latency groq=0.3
+    python -m benchmarks.load_test --json results.json
+    python -m benchmarks.load_test --cassette cassettes/session.json
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.cassette import Cassette, install_players
+from benchmarks.fakes import (
+    DEFAULT_PROFILES,
+    FakeGeminiModel,
+    FakeGroqClient,
+    FakeMem0Client,
+    FakeSupabaseClient,
+    FakeTelegramRequest,
+    FakeVideoGenerator,
+    LatencyProfile,
+)
+
+# Placeholder credentials: set BEFORE config is imported so a developer's
+# .env can never send benchmark traffic to the real providers
+_FAKE_ENV = {
+    "TELEGRAM_BOT_TOKEN": "123456:BENCHMARK-TOKEN",
+    "GROQ_API_KEY": "benchmark",
+    "GEMINI_API_KEY": "benchmark",
+    "MEM0_API_KEY": "benchmark",
+    "SUPABASE_URL": "https://benchmark.supabase.co",
+    "SUPABASE_KEY": "benchmark.benchmark.benchmark",
+    "ELEVENLABS_API_KEY": "",
+    "FAL_KEY": "",
+    "FAL_API_KEY": "",
+    "METRICS_PORT": "0",
+    "TRACE_FILE": "",
+}
+
+# Photo sizes Telegram offers for one upload (choose_photo_size picks one)
+_PHOTO_SIZES = ((90, 120), (320, 427), (800, 1067), (1280, 1706))
+
+_QUESTIONS = [
+    "Aunty, is my cholesterol okay?",
+    "What should I eat for breakfast?",
+    "Can I still eat char kway teow?",
+    "My glucose a bit high, how?",
+    "How much exercise should I do every week?",
+]
+
+_COMMANDS = {"history": "/history", "stats": "/stats", "video": "/video"}
+
+DEFAULT_MIX = {"text": 5, "photo": 2, "history": 1, "stats": 1, "video": 1}
+
+# Update IDs stay unique across concurrency levels
+_update_ids = itertools.count(1)
+
+
+def use_placeholder_env() -> None:
+    """Point every provider credential at a placeholder (before config is imported)."""
+    os.environ.update(_FAKE_ENV)
+
+
+def load_bot(trace_file: str = ""):
+    """Import main.py with placeholder credentials.
+
+    Args:
+        trace_file: Optional span output file (tracing stays off if empty)
+
+    Returns:
+        The imported main module
+    """
+    use_placeholder_env()
+    os.environ["TRACE_FILE"] = trace_file
+    return importlib.import_module("main")
+
+
+def install_fakes(bot, profiles: Dict[str, LatencyProfile], extraction_cache: bool = False) -> None:
+    """Swap every provider client in main.py's components for a fake.
+
+    Args:
+        bot: The main module
+        profiles: Latency profiles by provider name
+        extraction_cache: Keep perceptual cache matching (off by default,
+            since every synthetic report looks alike)
+    """
+    from extraction_cache import ExtractionCache
+
+    bot.health_analyzer.groq_client = FakeGroqClient(profiles["groq"], profiles["groq_first_token"])
+    bot.health_analyzer.gemini_model = FakeGeminiModel(profiles["gemini"])
+    bot.memory_manager.client = FakeMem0Client(profiles["mem0"])
+    bot.database.client = FakeSupabaseClient(profiles["supabase"])
+    bot.video_generator = FakeVideoGenerator(profiles["tts"], profiles["video"])
+    if not extraction_cache:
+        bot.extraction_cache = ExtractionCache(max_distance=0)
+
+
+def build_update(bot_instance, kind: str, update_id: int, user_id: int):
+    """Build a synthetic Telegram update.
+
+    Args:
+        bot_instance: telegram.Bot the update is bound to (for replies)
+        kind: "text", "photo", "history", "stats" or "video"
+        update_id: Update ID (also used as message ID)
+        user_id: Sender's Telegram ID
+
+    Returns:
+        telegram.Update
+    """
+    from telegram import Update
+
+    user = {"id": user_id, "is_bot": False, "first_name": f"Bench{user_id}"}
+    message: Dict[str, Any] = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+        "from": user,
+    }
+    if kind == "text":
+        message["text"] = random.choice(_QUESTIONS)
+    elif kind == "photo":
+        message["photo"] = [
+            {
+                "file_id": f"photo-{w}x{h}-{update_id}",
+                "file_unique_id": f"u{update_id}-{w}",
+                "width": w,
+                "height": h,
+                "file_size": w * h // 5,
+            }
+            for w, h in _PHOTO_SIZES
+        ]
+    elif kind in _COMMANDS:
+        command = _COMMANDS[kind]
+        message["text"] = command
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    else:
+        raise ValueError(f"Unknown update kind: {kind}")
+    return Update.de_json({"update_id": update_id, "message": message}, bot_instance)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Count, p50/p95/p99 and max of a list of seconds."""
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+async def _monitor_loop_lag(samples: List[float], interval: float = 0.05) -> None:
+    """Record how late a short sleep wakes up (time the loop was blocked)."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+async def run_level(
+    bot,
+    application,
+    concurrency: int,
+    total_updates: int,
+    mix: Dict[str, int],
+    users: int,
+    drain_timeout: float = 120.0
+) -> Dict[str, Any]:
+    """Send total_updates through the handlers with `concurrency` senders.
+
+    Each sender waits for its update to be handled before sending the next
+    one (closed loop). Updates from the same user still run one at a time,
+    as in production.
+
+    Returns:
+        Throughput, per-handler latency, loop lag and stage breakdown
+    """
+    from metrics import reset, stage_summary
+
+    reset()
+    kinds = random.choices(list(mix), weights=list(mix.values()), k=total_updates)
+    user_ids = [100_000 + i for i in range(max(users, concurrency))]
+    latencies: Dict[str, List[float]] = {kind: [] for kind in mix}
+    next_index = 0
+    lag: List[float] = []
+
+    async def sender() -> None:
+        nonlocal next_index
+        while next_index < total_updates:
+            index = next_index
+            next_index += 1
+            update = build_update(
+                application.bot, kinds[index], update_id=next(_update_ids),
+                user_id=random.choice(user_ids)
+            )
+            start = time.perf_counter()
+            await bot.update_processor.process_update(update, application.process_update(update))
+            latencies[kinds[index]].append(time.perf_counter() - start)
+
+    monitor = asyncio.create_task(_monitor_loop_lag(lag))
+    start = time.perf_counter()
+    await asyncio.gather(*(sender() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    # Background work started by handlers (memory writes, audio) finishes too
+    deadline = time.monotonic() + drain_timeout
+    while bot.lifecycle.in_flight() and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    monitor.cancel()
+
+    return {
+        "concurrency": concurrency,
+        "updates": total_updates,
+        "seconds": elapsed,
+        "throughput": total_updates / elapsed if elapsed else 0.0,
+        "handlers": {kind: summarize(values) for kind, values in latencies.items() if values},
+        "loop_lag": summarize(lag),
+        "stages": stage_summary(),
+        "background_left": len(bot.lifecycle.in_flight()),
+    }
+
+
+def print_level(result: Dict[str, Any]) -> None:
+    """Print one concurrency level's results."""
+    print(
+        f"\n=== concurrency {result['concurrency']}: {result['updates']} updates in "
+        f"{result['seconds']:.1f}s -> {result['throughput']:.2f} updates/s ==="
+    )
+    print(f"{'handler':<10} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for kind, s in sorted(result["handlers"].items()):
+        print(
+            f"{kind:<10} {s['count']:>6} {s['p50']:>7.2f}s {s['p95']:>7.2f}s "
+            f"{s['p99']:>7.2f}s {s['max']:>7.2f}s"
+        )
+
+    lag = result["loop_lag"]
+    print(
+        f"loop lag: p50 {lag['p50'] * 1000:.1f}ms, p99 {lag['p99'] * 1000:.1f}ms, "
+        f"max {lag['max'] * 1000:.1f}ms"
+    )
+
+    print(f"{'stage':<28} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for stage, s in sorted(result["stages"].items(), key=lambda item: -item[1]["p95"]):
+        print(
+            f"{stage:<28} {s['count']:>6} {s['p50']:>7.3f}s {s['p95']:>7.3f}s "
+            f"{s['p99']:>7.3f}s {s['errors']:>7}"
+        )
+    if result["background_left"]:
+        print(f"⚠️ {result['background_left']} background tasks still running after the drain timeout")
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """Parse "text=5,photo=2,..." into weights."""
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown update kind '{kind}' (use {', '.join(DEFAULT_MIX)})")
+        mix[kind] = int(weight or 1)
+    return mix
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Set up the bot with fakes and run every concurrency level."""
+    random.seed(args.seed)
+    profiles = dict(DEFAULT_PROFILES)
+    for spec in args.latency:
+        name, _, values = spec.partition("=")
+        if name not in profiles:
+            raise SystemExit(f"Unknown provider '{name}' (use {', '.join(profiles)})")
+        profiles[name] = LatencyProfile.parse(values)
+
+    bot = load_bot(args.trace_file)
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    install_fakes(bot, profiles, extraction_cache=args.extraction_cache)
+    if args.cassette:
+        cassette = Cassette.load(args.cassette)
+        install_players(
+            bot.health_analyzer, bot.memory_manager, bot.database, cassette,
+            speed=args.cassette_speed, fallback=True
+        )
+        print(f"Replaying {args.cassette} (unrecorded operations use the fakes):")
+        for operation, stats in cassette.summary().items():
+            print(f"  {operation:<40} {stats['count']:>4} recorded, mean {stats['mean_latency']:.3f}s")
+
+    from telegram.ext import Application
+    from rate_limiter import TelegramRateLimiter
+    import config
+
+    builder = Application.builder()\
+        .token(config.TELEGRAM_BOT_TOKEN)\
+        .request(FakeTelegramRequest(profiles["telegram"], profiles["telegram_file"]))\
+        .get_updates_request(FakeTelegramRequest(profiles["telegram"], profiles["telegram_file"]))\
+        .concurrent_updates(bot.update_processor)
+    if not args.no_rate_limit:
+        builder = builder.rate_limiter(TelegramRateLimiter(
+            global_rate=config.TELEGRAM_GLOBAL_RATE,
+            chat_rate=config.TELEGRAM_CHAT_RATE,
+            chat_burst=config.TELEGRAM_CHAT_BURST,
+            bulk_share=config.TELEGRAM_BULK_SHARE,
+        ))
+    application = builder.build()
+    bot.register_handlers(application)
+
+    handler_errors: List[str] = []
+
+    async def on_error(update: object, context) -> None:
+        handler_errors.append(repr(context.error))
+
+    application.add_error_handler(on_error)
+
+    print("Provider latency profiles:")
+    for name, profile in profiles.items():
+        print(f"  {name:<18} {profile!r}")
+
+    results = []
+    await application.initialize()
+    try:
+        for concurrency in args.concurrency:
+            result = await run_level(
+                bot, application, concurrency, args.updates, args.mix, args.users
+            )
+            result["handler_errors"] = len(handler_errors)
+            handler_errors.clear()
+            print_level(result)
+            results.append(result)
+    finally:
+        await application.shutdown()
+        await bot.extraction_pool.shutdown()
+        bot.image_preprocessor.shutdown()
+
+    print("\nInjected provider errors:")
+    for name, profile in profiles.items():
+        if profile.calls:
+            print(f"  {name:<18} {profile.errors}/{profile.calls} calls failed")
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline load test with fake providers")
+    parser.add_argument(
+        "--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 8, 32],
+        help="Comma-separated concurrency levels (default: 1,8,32)"
+    )
+    parser.add_argument("--updates", type=int, default=100, help="Updates per level (default: 100)")
+    parser.add_argument("--users", type=int, default=50, help="Distinct synthetic users (default: 50)")
+    parser.add_argument(
+        "--mix", type=parse_mix, default=DEFAULT_MIX,
+        help="Update mix as kind=weight (default: text=5,photo=2,history=1,stats=1,video=1)"
+    )
+    parser.add_argument(
+        "--latency", action="append", default=[], metavar="PROVIDER=MEDIAN[,SIGMA[,ERROR_RATE]]",
+        help=f"Override a latency profile ({', '.join(DEFAULT_PROFILES)}); repeatable"
+    )
+    parser.add_argument("--no-rate-limit", action="store_true", help="Skip the outbound Telegram rate limiter")
+    parser.add_argument(
+        "--extraction-cache", action="store_true",
+        help="Keep perceptual extraction cache hits (synthetic reports all look alike)"
+    )
+    parser.add_argument(
+        "--cassette", help="Serve Groq/Gemini/Mem0/Supabase from a recorded cassette (see benchmarks.cassette)"
+    )
+    parser.add_argument(
+        "--cassette-speed", type=float, default=1.0, help="Divide recorded latencies by this (0 = no waiting)"
+    )
+    parser.add_argument("--trace-file", default="", help="Also write spans to this JSONL file")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's INFO logs")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,7 @@ Optional APIs:
     - ElevenLabs: Audio generation fallback
 """
 import os
+from typing import List
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -66,6 +67,154 @@ GROQ_MODEL = "llama-3.3-70b-versatile"
 # Gemini Model: 2.0 Flash Exp (optimized for speed)
 GEMINI_MODEL = "gemini-2.0-flash-exp"
 
+# ==================== PERFORMANCE CONFIGURATION ====================
+
+# Gemini Vision extraction pool: concurrent extractions and max queued jobs
+# Size these for peak upload bursts (e.g. morning lab report uploads)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "4"))
+EXTRACTION_QUEUE_SIZE = int(os.getenv("EXTRACTION_QUEUE_SIZE", "50"))
+
+# Photos up to this size are downloaded and decoded purely in memory;
+# larger files spill to a temporary file on disk
+PHOTO_MEMORY_LIMIT_BYTES = int(os.getenv("PHOTO_MEMORY_LIMIT_BYTES", str(10 * 1024 * 1024)))
+
+# Image preprocessing before Gemini (grayscale, crop, downscale, re-encode)
+PREPROCESS_IMAGES = os.getenv("PREPROCESS_IMAGES", "true").lower() == "true"
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "2"))
+# Smallest long edge (px) that keeps lab text legible: picks the Telegram photo
+# size, and preprocessing never shrinks below it to hit the byte budget
+PREPROCESS_MIN_LONG_EDGE = int(os.getenv("PREPROCESS_MIN_LONG_EDGE", "1280"))
+PREPROCESS_MAX_LONG_EDGE = int(os.getenv("PREPROCESS_MAX_LONG_EDGE", "1600"))
+# JPEG byte budget per image sent to Gemini
+PREPROCESS_TARGET_BYTES = int(os.getenv("PREPROCESS_TARGET_BYTES", "250000"))
+
+# Extraction cache: repeat uploads of the same report skip Gemini Vision
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "1000"))
+# Max perceptual-hash distance (of 256 bits) for recompressed forwards; 0 = exact only
+EXTRACTION_CACHE_MAX_DISTANCE = int(os.getenv("EXTRACTION_CACHE_MAX_DISTANCE", "6"))
+# Optional JSON file so the cache survives restarts (empty = memory only)
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", "")
+
+# Multi-page reports (Telegram albums): seconds without a new page before
+# the album counts as complete, and how many pages extract at the same time
+MEDIA_GROUP_WAIT_SECONDS = float(os.getenv("MEDIA_GROUP_WAIT_SECONDS", "1.5"))
+PAGE_EXTRACTION_CONCURRENCY = int(os.getenv("PAGE_EXTRACTION_CONCURRENCY", "3"))
+
+# Lab reports sent as documents (PDFs and uncompressed images)
+DOCUMENT_MAX_BYTES = int(os.getenv("DOCUMENT_MAX_BYTES", str(20 * 1024 * 1024)))
+DOCUMENT_MAX_PAGES = int(os.getenv("DOCUMENT_MAX_PAGES", "30"))
+# PDF pages rendered/extracted at the same time per document (bounds memory)
+DOCUMENT_PAGE_CONCURRENCY = int(os.getenv("DOCUMENT_PAGE_CONCURRENCY", "3"))
+PDF_RENDER_DPI = int(os.getenv("PDF_RENDER_DPI", "150"))
+# PDFs with at least this much text on every page skip vision extraction
+PDF_MIN_TEXT_CHARS = int(os.getenv("PDF_MIN_TEXT_CHARS", "200"))
+PDF_TEXT_CHUNK_CHARS = int(os.getenv("PDF_TEXT_CHUNK_CHARS", "12000"))
+
+# Reports per /history page (older/newer buttons page through the rest)
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "5"))
+
+# Stream Groq replies into progressively edited messages (faster first text)
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+# Minimum seconds between edits of a streaming message (Telegram ~1 msg/s per chat)
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+
+# Update processing: how many Telegram updates are handled at the same time
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "32"))
+
+# Updates from one user run in order; extra updates beyond this are dropped
+MAX_QUEUED_UPDATES_PER_USER = int(os.getenv("MAX_QUEUED_UPDATES_PER_USER", "5"))
+
+# Outbound Telegram rate limits (stay under flood limits: ~30 msg/s, ~1 msg/s per chat)
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+# Fraction of the global rate bulk sends (caregiver fan-out) may use
+TELEGRAM_BULK_SHARE = float(os.getenv("TELEGRAM_BULK_SHARE", "0.5"))
+
+# On SIGTERM/SIGINT: seconds to let in-flight uploads finish before exiting
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "30"))
+
+# Prometheus metrics endpoint (GET /metrics); 0 disables it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+# Keep on localhost unless a Prometheus server scrapes it remotely
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Per-update traces (span trees) as JSON lines, e.g. traces/spans.jsonl; empty disables the file
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))  # 10MB
+TRACE_BACKUP_COUNT = int(os.getenv("TRACE_BACKUP_COUNT", "5"))
+# Users appear in traces as salted hashes of their Telegram ID. Set a long
+# random secret to match users across restarts; empty = random per process
+TRACE_USER_SALT = os.getenv("TRACE_USER_SALT", "")
+
+# ==================== HTTP CONNECTION POOLING ====================
+
+# Connections per provider pool and keepalive behaviour
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+# TLS certificate verification for provider APIs (Groq, Gemini, Mem0, Supabase...)
+HTTP_VERIFY_SSL = os.getenv("HTTP_VERIFY_SSL", "true").lower() == "true"
+# Telegram only: set to false for local development behind an intercepting proxy
+TELEGRAM_VERIFY_SSL = os.getenv("TELEGRAM_VERIFY_SSL", "true").lower() == "true"
+
+# Seconds to connect / to wait for a free pooled connection
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+
+# Telegram pool is larger: caregiver fan-out and media uploads overlap
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "64"))
+
+# Per-provider request timeouts (seconds)
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", "10"))
+TELEGRAM_MEDIA_TIMEOUT = float(os.getenv("TELEGRAM_MEDIA_TIMEOUT", "60"))
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+MEM0_TIMEOUT = float(os.getenv("MEM0_TIMEOUT", "20"))
+
+# ==================== CONNECTION WARM-UP ====================
+
+# Ping every provider concurrently at startup so the first user doesn't pay
+# for DNS/TLS/auth handshakes; the bot reports ready once critical ones answer
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_CRITICAL = [
+    name.strip() for name in os.getenv("WARMUP_CRITICAL", "telegram,groq,gemini,supabase").split(",")
+    if name.strip()
+]
+# Seconds per ping, and how long startup waits for critical providers
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "10"))
+WARMUP_READY_TIMEOUT = float(os.getenv("WARMUP_READY_TIMEOUT", "60"))
+# Keepalive pings; keep this below HTTP_KEEPALIVE_EXPIRY (0 = off)
+KEEPALIVE_INTERVAL = float(os.getenv("KEEPALIVE_INTERVAL", "45"))
+
+# ==================== BOT MODE (POLLING / WEBHOOK) ====================
+
+# "polling" (default, good for local development) or "webhook" (production)
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+
+# Public HTTPS URL Telegram should POST updates to, e.g. https://bot.example.com
+# When running behind a TLS-terminating proxy (nginx, Cloud Run, Fly.io...),
+# this is the proxy's public URL and the bot itself listens on plain HTTP.
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+
+# Local address/port the webhook server binds to
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+
+# URL path for the webhook endpoint (appended to WEBHOOK_URL)
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+
+# Secret token Telegram sends in X-Telegram-Bot-Api-Secret-Token
+# Requests without the matching header are rejected
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN")
+
+# Only needed when the bot terminates TLS itself (no proxy in front)
+WEBHOOK_CERT = os.getenv("WEBHOOK_CERT")
+WEBHOOK_KEY = os.getenv("WEBHOOK_KEY")
+
 # ==================== VALIDATION ====================
 
 # Required environment variables (bot won't work without these)
@@ -85,24 +234,41 @@ OPTIONAL_VARS = [
     "ELEVENLABS_API_KEY",
 ]
 
-# Check for missing required variables
-missing_vars = [var for var in REQUIRED_VARS if not os.getenv(var)]
-if missing_vars:
-    print("\n" + "="*60)
-    print("⚠️  CONFIGURATION ERROR")
-    print("="*60)
-    print(f"Missing required environment variables:")
-    for var in missing_vars:
-        print(f"  ❌ {var}")
-    print("\n📝 TO FIX:")
-    print("1. Copy env_template.txt to .env")
-    print("2. Fill in all required API keys")
-    print("3. Restart the bot")
-    print("="*60 + "\n")
-
-# Check for optional variables
-missing_optional = [var for var in OPTIONAL_VARS if not os.getenv(var)]
-if missing_optional:
-    print(f"💡 Optional features disabled (missing: {', '.join(missing_optional)})")
-    print("   Video/audio generation may not work without these keys.")
 
+def validate() -> List[str]:
+    """Print configuration problems (called from main(), not at import time).
+
+    Importing config stays silent so CLIs, benchmarks and tests that only
+    need a few settings don't print banners about keys they never use.
+
+    Returns:
+        Names of missing required environment variables
+    """
+    # Check for missing required variables
+    missing_vars = [var for var in REQUIRED_VARS if not os.getenv(var)]
+    if missing_vars:
+        print("\n" + "="*60)
+        print("⚠️  CONFIGURATION ERROR")
+        print("="*60)
+        print(f"Missing required environment variables:")
+        for var in missing_vars:
+            print(f"  ❌ {var}")
+        print("\n📝 TO FIX:")
+        print("1. Copy env_template.txt to .env")
+        print("2. Fill in all required API keys")
+        print("3. Restart the bot")
+        print("="*60 + "\n")
+
+    # Check webhook configuration
+    if BOT_MODE == "webhook" and not WEBHOOK_URL:
+        print("⚠️  BOT_MODE=webhook but WEBHOOK_URL is not set - set it to your public HTTPS URL")
+    if BOT_MODE == "webhook" and not WEBHOOK_SECRET_TOKEN:
+        print("⚠️  WEBHOOK_SECRET_TOKEN not set - anyone who finds the webhook URL can post updates")
+
+    # Check for optional variables
+    missing_optional = [var for var in OPTIONAL_VARS if not os.getenv(var)]
+    if missing_optional:
+        print(f"💡 Optional features disabled (missing: {', '.join(missing_optional)})")
+        print("   Video/audio generation may not work without these keys.")
+
+    return missing_vars
@@ -0,0 +1,299 @@
+"""Shared, tunable HTTP connection pooling for all providers.
+
+Every provider used to manage its own connections: Telegram got a fixed
+pool of 8 with hard-coded 5s timeouts, and Groq/Mem0 used whatever their
+SDK defaults were. Once caregiver fan-out and media uploads overlap, 8
+connections is nowhere near enough and requests queue inside httpx.
+
+This module builds every HTTP client from one place:
+- Pool size, keepalive connections/expiry and HTTP/2 from config
+- Per-provider timeouts (Telegram, Telegram media, Groq, Gemini, Supabase, Mem0)
+- Saturation metrics per pool: requests in flight, peak, and how often a
+  request found the pool already full (i.e. had to wait for a connection)
+
+Gemini (gRPC/REST via google-generativeai) and Supabase (postgrest) own
+their transports, so only their timeouts are configured here.
+"""
+import importlib.util
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Tracks how busy one connection pool is."""
+
+    def __init__(self, name: str, max_connections: int):
+        self.name = name
+        self.max_connections = max_connections
+        self.in_flight = 0
+        self.peak = 0
+        self.total = 0
+        self.saturated = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self.in_flight >= self.max_connections:
+                self.saturated += 1
+            self.in_flight += 1
+            self.total += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get current pool statistics."""
+        return {
+            "max_connections": self.max_connections,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak,
+            "utilization": self.in_flight / self.max_connections,
+            "requests": self.total,
+            "saturated_requests": self.saturated,
+        }
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body stream that releases the pool slot when closed."""
+
+    def __init__(self, stream: httpx.SyncByteStream, metrics: PoolMetrics):
+        self._stream = stream
+        self._metrics = metrics
+        self._released = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._metrics.release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    """Async response body stream that releases the pool slot when closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, metrics: PoolMetrics):
+        self._stream = stream
+        self._metrics = metrics
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._metrics.release()
+
+
+class _MeteredTransport(httpx.BaseTransport):
+    """Wraps a transport to record pool usage."""
+
+    def __init__(self, transport: httpx.BaseTransport, metrics: PoolMetrics):
+        self._transport = transport
+        self._metrics = metrics
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._metrics.acquire()
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self._metrics.release()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, self._metrics),
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class _AsyncMeteredTransport(httpx.AsyncBaseTransport):
+    """Wraps an async transport to record pool usage."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, metrics: PoolMetrics):
+        self._transport = transport
+        self._metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._metrics.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._metrics.release()
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_AsyncReleasingStream(response.stream, self._metrics),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+_pools: Dict[str, PoolMetrics] = {}
+
+
+def http2_enabled() -> bool:
+    """True if HTTP/2 is requested and the h2 package is installed."""
+    if not config.HTTP2_ENABLED:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("⚠️ HTTP2_ENABLED but 'h2' not installed (pip install 'httpx[http2]'), using HTTP/1.1")
+        return False
+    return True
+
+
+def build_limits(pool_size: Optional[int] = None) -> httpx.Limits:
+    """Connection limits shared by every provider pool.
+
+    Args:
+        pool_size: Max connections (defaults to HTTP_POOL_SIZE)
+    """
+    pool_size = pool_size or config.HTTP_POOL_SIZE
+    return httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=min(config.HTTP_MAX_KEEPALIVE, pool_size),
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _tls_verify(name: str, verify: bool) -> bool:
+    """Warn loudly when a pool is built without certificate checks."""
+    if not verify:
+        logger.warning(
+            f"⚠️ TLS certificate verification is DISABLED for '{name}' - "
+            "traffic can be intercepted. Only use this for local development."
+        )
+    return verify
+
+
+def _metrics_for(name: str, pool_size: int) -> PoolMetrics:
+    metrics = PoolMetrics(name, pool_size)
+    _pools[name] = metrics
+    return metrics
+
+
+def build_sync_client(
+    name: str,
+    timeout: float,
+    pool_size: Optional[int] = None,
+    verify: Optional[bool] = None
+) -> httpx.Client:
+    """Build a pooled, metered httpx.Client for a provider SDK.
+
+    Args:
+        name: Provider name (used in metrics)
+        timeout: Request timeout in seconds
+        pool_size: Max connections (defaults to HTTP_POOL_SIZE)
+        verify: Verify TLS certificates (defaults to HTTP_VERIFY_SSL)
+    """
+    pool_size = pool_size or config.HTTP_POOL_SIZE
+    verify = _tls_verify(name, config.HTTP_VERIFY_SSL if verify is None else verify)
+    transport = httpx.HTTPTransport(
+        limits=build_limits(pool_size),
+        http2=http2_enabled(),
+        verify=verify,
+    )
+    return httpx.Client(
+        transport=_MeteredTransport(transport, _metrics_for(name, pool_size)),
+        timeout=httpx.Timeout(timeout, connect=config.HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def build_async_client(
+    name: str,
+    timeout: float,
+    pool_size: Optional[int] = None,
+    verify: Optional[bool] = None
+) -> httpx.AsyncClient:
+    """Build a pooled, metered httpx.AsyncClient.
+
+    Args:
+        name: Provider name (used in metrics)
+        timeout: Request timeout in seconds
+        pool_size: Max connections (defaults to HTTP_POOL_SIZE)
+        verify: Verify TLS certificates (defaults to HTTP_VERIFY_SSL)
+    """
+    pool_size = pool_size or config.HTTP_POOL_SIZE
+    return httpx.AsyncClient(
+        transport=_build_async_transport(name, pool_size, verify),
+        timeout=httpx.Timeout(timeout, connect=config.HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def _build_async_transport(name: str, pool_size: int, verify: Optional[bool]) -> httpx.AsyncBaseTransport:
+    """Pooled async transport with config limits, HTTP/2 and TLS setting, metered."""
+    verify = _tls_verify(name, config.HTTP_VERIFY_SSL if verify is None else verify)
+    transport = httpx.AsyncHTTPTransport(
+        limits=build_limits(pool_size),
+        http2=http2_enabled(),
+        verify=verify,
+    )
+    return _AsyncMeteredTransport(transport, _metrics_for(name, pool_size))
+
+
+def build_telegram_request(
+    name: str = "telegram",
+    pool_size: Optional[int] = None,
+    read_timeout: Optional[float] = None
+):
+    """Build a python-telegram-bot request object backed by a metered pool.
+
+    Args:
+        name: Pool name (e.g. "telegram" or "telegram_updates")
+        pool_size: Max connections (defaults to TELEGRAM_POOL_SIZE)
+        read_timeout: Read timeout (defaults to TELEGRAM_TIMEOUT)
+
+    Returns:
+        HTTPXRequest instance
+    """
+    from telegram.request import HTTPXRequest
+
+    pool_size = pool_size or config.TELEGRAM_POOL_SIZE
+    read_timeout = read_timeout or config.TELEGRAM_TIMEOUT
+
+    request = HTTPXRequest(
+        connection_pool_size=pool_size,
+        connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+        read_timeout=read_timeout,
+        # Writes cover audio/photo uploads, so use the (longer) media timeout
+        write_timeout=config.TELEGRAM_MEDIA_TIMEOUT,
+        pool_timeout=config.HTTP_POOL_TIMEOUT,
+        http_version="2" if http2_enabled() else "1.1",
+        # Our metered transport (same limits, plus TLS setting from config)
+        httpx_kwargs={
+            "transport": _build_async_transport(name, pool_size, config.TELEGRAM_VERIFY_SSL),
+        },
+    )
+    return request
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Get saturation metrics for every pool built so far.
+
+    Returns:
+        Dictionary mapping pool name to its statistics
+    """
+    return {name: metrics.snapshot() for name, metrics in _pools.items()}
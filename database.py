@@ -11,14 +11,30 @@ Database Schema:
     - health_reports: Lab reports with structured JSONB data
     - caregivers: Family caregiver connections
     - video_summaries: Generated media content
+    - health_profiles: Per-user counters and summary, updated on every report
 
 All tables use Row Level Security (RLS) for data protection.
 """
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any, List, Optional
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 import config
 
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Analysis text stored while Groq is still working on a report
+PENDING_ANALYSIS = "Processing..."
+
+# Reports kept (in compact form) on the health profile for summaries/history
+PROFILE_RECENT_REPORTS = 5
+
+# Profile updates are read-modify-write; lock stripes serialize them per user
+_PROFILE_LOCK_STRIPES = 64
+# Seconds before retrying a client that failed to build
+_CLIENT_RETRY_SECONDS = 30.0
+
 
 class HealthDatabase:
     """Manages health data storage in Supabase PostgreSQL.
@@ -36,15 +52,55 @@ class HealthDatabase:
     """
     
     def __init__(self):
-        """Initialize Supabase client."""
+        """Set up a lazy Supabase client (created on first use)."""
+        self._client: Optional["Client"] = None
+        self._client_initialized = False
+        self._client_retry_at = 0.0
+        self._client_lock = threading.Lock()
+        self._profile_locks = [threading.Lock() for _ in range(_PROFILE_LOCK_STRIPES)]
+    
+    @property
+    def client(self) -> Optional["Client"]:
+        """Supabase client, or None if it could not be created (yet)."""
+        # A failed build is not cached: it is retried after a short pause
+        if not self._client_initialized and time.monotonic() >= self._client_retry_at:
+            with self._client_lock:
+                if not self._client_initialized and time.monotonic() >= self._client_retry_at:
+                    self._client = self._create_client()
+                    if self._client is None:
+                        self._client_retry_at = time.monotonic() + _CLIENT_RETRY_SECONDS
+                    else:
+                        self._client_initialized = True
+        return self._client
+    
+    @client.setter
+    def client(self, client: Optional["Client"]) -> None:
+        self._client = client
+        self._client_initialized = True
+    
+    @staticmethod
+    def _create_client() -> Optional["Client"]:
+        """Import supabase and build the client with the configured timeout."""
         try:
-            self.client: Client = create_client(
+            from supabase import create_client, ClientOptions
+            return create_client(
                 config.SUPABASE_URL, 
-                config.SUPABASE_KEY
+                config.SUPABASE_KEY,
+                options=ClientOptions(postgrest_client_timeout=config.SUPABASE_TIMEOUT)
             )
         except Exception as e:
             print(f"Error initializing Supabase: {e}")
-            self.client = None
+            return None
+    
+    def ping(self) -> None:
+        """Cheap authenticated query (one users row) to open/keep a connection.
+        
+        Raises:
+            RuntimeError: If the Supabase client could not be created
+        """
+        if not self.client:
+            raise RuntimeError("Supabase client not available")
+        self.client.table("users").select("telegram_id").limit(1).execute()
     
     def create_tables(self):
         """Create necessary database tables if they don't exist.
@@ -126,18 +182,35 @@ class HealthDatabase:
             return None
         
         try:
+            tests = lab_data.get("tests", [])
             data = {
                 "telegram_id": telegram_id,
                 "test_date": lab_data.get("test_date"),
                 "lab_data": lab_data,
                 "analysis": analysis,
-                "response_time": response_time
+                "response_time": response_time,
+                # Denormalized so /history never has to read lab_data
+                "test_count": len(tests),
+                "abnormal_count": sum(1 for t in tests if t.get("status") != "normal")
             }
             
-            result = self.client.table("health_reports").insert(data).execute()
+            try:
+                result = self.client.table("health_reports").insert(data).execute()
+            except Exception as e:
+                # Database not migrated yet: save without the count columns
+                if "test_count" not in str(e) and "abnormal_count" not in str(e):
+                    raise
+                print("⚠️  health_reports is missing test_count/abnormal_count - run setup_database.sql")
+                data.pop("test_count")
+                data.pop("abnormal_count")
+                result = self.client.table("health_reports").insert(data).execute()
             
             if result.data:
-                return result.data[0].get("id")
+                report_id = result.data[0].get("id")
+                # Pending reports join the profile once their analysis is saved
+                if analysis != PENDING_ANALYSIS:
+                    self.record_report_in_profile(telegram_id, report_id, lab_data, response_time)
+                return report_id
             return None
             
         except Exception as e:
@@ -169,16 +242,81 @@ class HealthDatabase:
                 print(f"Error saving health report: {e}")
             return None
     
+    def create_health_report(
+        self,
+        telegram_id: int,
+        lab_data: Dict[str, Any]
+    ) -> Optional[int]:
+        """Insert a health report before analysis is ready.
+        
+        The row is saved with a placeholder analysis so video generation can
+        read the lab data straight away. Call update_health_report() with the
+        report ID once the analysis is done - no second row is written.
+        
+        Args:
+            telegram_id: Telegram user ID
+            lab_data: Extracted lab data
+            
+        Returns:
+            Report ID if successful, None otherwise
+        """
+        return self.save_health_report(telegram_id, lab_data, PENDING_ANALYSIS, 0.0)
+    
+    def update_health_report(
+        self,
+        report_id: int,
+        analysis: str,
+        response_time: float,
+        telegram_id: Optional[int] = None,
+        lab_data: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Fill in the analysis for a report created by create_health_report().
+        
+        Only now does the report count toward the user's profile, so a
+        report whose analysis never finishes stays out of the totals (as it
+        does in /history).
+        
+        Args:
+            report_id: ID returned by create_health_report()
+            analysis: Dr. Aunty's analysis
+            response_time: Analysis response time
+            telegram_id: Report owner (adds the report to their profile)
+            lab_data: The report's lab data (defaults to the saved row's)
+            
+        Returns:
+            True if successful
+        """
+        if not self.client or report_id is None:
+            return False
+        
+        try:
+            result = self.client.table("health_reports")\
+                .update({"analysis": analysis, "response_time": response_time})\
+                .eq("id", report_id)\
+                .execute()
+            
+            if telegram_id is not None:
+                if lab_data is None and result.data:
+                    lab_data = result.data[0].get("lab_data")
+                self.record_report_in_profile(telegram_id, report_id, lab_data or {}, response_time)
+            return True
+            
+        except Exception as e:
+            print(f"Error updating health report {report_id}: {e}")
+            return False
+    
     def get_user_reports(
         self, 
         telegram_id: int, 
-        limit: int = 10
+        limit: int = 10,
+        include_pending: bool = False
     ) -> List[Dict[str, Any]]:
         """Get user's health reports.
         
         Args:
             telegram_id: Telegram user ID
             limit: Maximum number of reports to retrieve
+            include_pending: Also return reports still waiting for analysis
             
         Returns:
             List of health reports
@@ -187,9 +325,14 @@ class HealthDatabase:
             return []
         
         try:
-            result = self.client.table("health_reports")\
+            query = self.client.table("health_reports")\
                 .select("*")\
-                .eq("telegram_id", telegram_id)\
+                .eq("telegram_id", telegram_id)
+            
+            if not include_pending:
+                query = query.neq("analysis", PENDING_ANALYSIS)
+            
+            result = query\
                 .order("created_at", desc=True)\
                 .limit(limit)\
                 .execute()
@@ -200,6 +343,72 @@ class HealthDatabase:
             print(f"Error getting user reports: {e}")
             return []
     
+    def get_report_page(
+        self,
+        telegram_id: int,
+        page_size: int = 5,
+        before: Optional[Tuple[str, int]] = None,
+        after: Optional[Tuple[str, int]] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Get one page of a user's report history, newest first.
+        
+        Keyset pagination on (telegram_id, created_at, id): each page is an
+        index range scan, so paging stays fast no matter how many reports a
+        user has. Only the columns /history shows are fetched.
+        
+        Args:
+            telegram_id: Telegram user ID
+            page_size: Reports per page
+            before: (created_at, id) cursor - return reports older than this
+            after: (created_at, id) cursor - return reports newer than this
+            
+        Returns:
+            Tuple of (reports newest first, whether more reports exist
+            further in the paging direction)
+        """
+        if not self.client:
+            return [], False
+        
+        try:
+            query = self.client.table("health_reports")\
+                .select("id, test_date, test_count, abnormal_count, created_at")\
+                .eq("telegram_id", telegram_id)\
+                .neq("analysis", PENDING_ANALYSIS)
+            
+            if after:
+                created_at, report_id = after
+                query = query.or_(
+                    f'created_at.gt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",id.gt.{int(report_id)})'
+                )
+                newest_first = False
+            else:
+                if before:
+                    created_at, report_id = before
+                    query = query.or_(
+                        f'created_at.lt."{created_at}",'
+                        f'and(created_at.eq."{created_at}",id.lt.{int(report_id)})'
+                    )
+                newest_first = True
+            
+            # One extra row tells us whether there is another page
+            result = query\
+                .order("created_at", desc=newest_first)\
+                .order("id", desc=newest_first)\
+                .limit(page_size + 1)\
+                .execute()
+            
+            rows = result.data or []
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            if not newest_first:
+                rows.reverse()
+            return rows, has_more
+            
+        except Exception as e:
+            print(f"Error getting report page: {e}")
+            return [], False
+    
     def save_video_summary(
         self,
         telegram_id: int,
@@ -243,34 +452,241 @@ class HealthDatabase:
                 print(f"Error saving video summary: {e}")
             return None
     
-    def get_health_summary(self, telegram_id: int) -> str:
+    def get_health_summary(self, telegram_id: int, include_pending: bool = False) -> str:
         """Generate a summary of user's health data.
         
         Args:
             telegram_id: Telegram user ID
+            include_pending: Include reports still waiting for analysis (the
+                profile only has analyzed reports, so this reads the reports)
             
         Returns:
             Formatted health summary
         """
-        reports = self.get_user_reports(telegram_id, limit=5)
+        # One small row, already formatted when the last report was analyzed
+        if not include_pending:
+            profile = self.get_health_profile(telegram_id)
+            if profile and profile.get("summary_text"):
+                return profile["summary_text"]
+        
+        reports = self.get_user_reports(telegram_id, limit=PROFILE_RECENT_REPORTS, include_pending=include_pending)
         
         if not reports:
             return "No health reports available yet."
         
-        summary = f"Health Summary (Last {len(reports)} reports):\n\n"
+        return _format_summary([
+            _compact_report(report.get("id"), report.get("lab_data") or {}) for report in reports
+        ])
+    
+    # ========== HEALTH PROFILE METHODS ==========
+    
+    def get_health_profile(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Get the user's materialized health profile.
         
-        for report in reports:
-            lab_data = report.get("lab_data", {})
-            test_date = lab_data.get("test_date", "Unknown date")
-            summary += f"📋 Report from {test_date}:\n"
+        Args:
+            telegram_id: Telegram user ID
             
-            tests = lab_data.get("tests", [])
-            for test in tests[:5]:  # Show first 5 tests
-                summary += f"  • {test.get('name')}: {test.get('value')} {test.get('unit')} ({test.get('status')})\n"
+        Returns:
+            Profile row or None if the user has none yet (or it can't be read)
+        """
+        if not self.client:
+            return None
+        
+        try:
+            return self._fetch_profile(telegram_id)
+        except Exception as e:
+            error_msg = str(e)
+            if "PGRST205" in error_msg or "Could not find the table" in error_msg:
+                print("\n⚠️  Supabase table 'health_profiles' not found. Run setup_database.sql in your dashboard.\n")
+            else:
+                print(f"Error getting health profile: {e}")
+            return None
+    
+    def _fetch_profile(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        """Read the profile row; None only when there is no row (read errors raise)."""
+        result = self.client.table("health_profiles")\
+            .select("*")\
+            .eq("telegram_id", telegram_id)\
+            .limit(1)\
+            .execute()
+        return result.data[0] if result.data else None
+    
+    def record_report_in_profile(
+        self,
+        telegram_id: int,
+        report_id: Optional[int],
+        lab_data: Dict[str, Any],
+        response_time: Optional[float] = None
+    ) -> bool:
+        """Add a newly saved report to the user's profile.
+        
+        Args:
+            telegram_id: Telegram user ID
+            report_id: ID of the saved report
+            lab_data: Extracted lab data
+            response_time: Analysis time, if the analysis is already done
+            
+        Returns:
+            True if successful
+        """
+        def apply(profile: Dict[str, Any]) -> None:
+            report = _compact_report(report_id, lab_data)
+            profile["report_count"] += 1
+            profile["test_count"] += report["test_count"]
+            profile["abnormal_count"] += report["abnormal_count"]
+            profile["latest_report_id"] = report_id
+            profile["latest_test_date"] = report["test_date"]
+            profile["recent_reports"] = ([report] + profile["recent_reports"])[:PROFILE_RECENT_REPORTS]
+            profile["summary_text"] = _format_summary(profile["recent_reports"])
+            if response_time is not None:
+                _add_response_time(profile, response_time)
+        
+        # The report row is saved (and analyzed) first, so a backfilled profile already has it
+        return self._update_profile(telegram_id, apply, in_reports=True)
+    
+    def record_memory_in_profile(self, telegram_id: int, count: int = 1) -> bool:
+        """Count memories written to Mem0 for this user.
+        
+        Users without a profile row are skipped: their first profile is
+        built by rebuild_health_profile(), which counts Mem0 directly.
+        
+        Args:
+            telegram_id: Telegram user ID
+            count: Number of memory writes
+            
+        Returns:
+            True if successful
+        """
+        def apply(profile: Dict[str, Any]) -> None:
+            profile["memory_count"] += count
+        
+        return self._update_profile(telegram_id, apply, create=False)
+    
+    def rebuild_health_profile(self, telegram_id: int, memory_count: int = 0) -> Optional[Dict[str, Any]]:
+        """Build a profile from existing reports (users from before profiles existed).
+        
+        Args:
+            telegram_id: Telegram user ID
+            memory_count: Current number of Mem0 memories
             
-            summary += "\n"
+        Returns:
+            The new profile, or None if the user has no analyzed reports
+        """
+        if not self.client:
+            return None
         
-        return summary
+        try:
+            profile = self._build_profile(telegram_id, memory_count)
+        except Exception as e:
+            print(f"Error rebuilding health profile: {e}")
+            return None
+        
+        if profile is None:
+            return None
+        
+        with self._profile_locks[telegram_id % _PROFILE_LOCK_STRIPES]:
+            try:
+                existing = self._fetch_profile(telegram_id)
+            except Exception as e:
+                print(f"Error rebuilding health profile: {e}")
+                return None
+            if existing is not None:
+                # Another write created the profile meanwhile - keep it
+                return existing
+            if not self._save_profile(profile):
+                return None
+        return profile
+    
+    def _build_profile(self, telegram_id: int, memory_count: int = 0) -> Optional[Dict[str, Any]]:
+        """Compute a profile from the user's analyzed reports (read errors raise).
+        
+        Returns:
+            The profile, or None if the user has no analyzed reports
+        """
+        result = self.client.table("health_reports")\
+            .select("id, lab_data, analysis, response_time")\
+            .eq("telegram_id", telegram_id)\
+            .neq("analysis", PENDING_ANALYSIS)\
+            .order("created_at", desc=True)\
+            .execute()
+        reports = result.data or []
+        if not reports:
+            return None
+        
+        profile = _empty_profile(telegram_id)
+        profile["memory_count"] = memory_count
+        for report in reversed(reports):
+            compact = _compact_report(report.get("id"), report.get("lab_data") or {})
+            profile["report_count"] += 1
+            profile["test_count"] += compact["test_count"]
+            profile["abnormal_count"] += compact["abnormal_count"]
+            profile["latest_report_id"] = compact["id"]
+            profile["latest_test_date"] = compact["test_date"]
+            profile["recent_reports"] = ([compact] + profile["recent_reports"])[:PROFILE_RECENT_REPORTS]
+            if report.get("response_time"):
+                _add_response_time(profile, report["response_time"])
+        profile["summary_text"] = _format_summary(profile["recent_reports"])
+        return profile
+    
+    def _update_profile(self, telegram_id: int, apply, in_reports: bool = False, create: bool = True) -> bool:
+        """Read-modify-write the profile row under the user's lock stripe.
+        
+        A user without a row (e.g. from before profiles existed) gets one
+        built from their reports first. If the row can't be read, nothing is
+        written - an empty profile must never replace a real one.
+        
+        The lock stripes only serialize writers in this process; several
+        bot processes writing the same user's profile can still lose an
+        update.
+        
+        Args:
+            telegram_id: Telegram user ID
+            apply: Function that updates the profile dict in place
+            in_reports: The change is already in the reports table, so a
+                profile backfilled from it must not apply it again
+            create: Create the row if the user has none
+            
+        Returns:
+            True if the profile was saved
+        """
+        if not self.client:
+            return False
+        
+        with self._profile_locks[telegram_id % _PROFILE_LOCK_STRIPES]:
+            try:
+                profile = self._fetch_profile(telegram_id)
+                backfilled = False
+                if profile is None:
+                    if not create:
+                        return False
+                    profile = self._build_profile(telegram_id)
+                    backfilled = profile is not None
+            except Exception as e:
+                print(f"Error reading health profile, not updating it: {e}")
+                return False
+            
+            profile = profile or _empty_profile(telegram_id)
+            profile["recent_reports"] = profile.get("recent_reports") or []
+            if not (backfilled and in_reports):
+                apply(profile)
+            return self._save_profile(profile)
+    
+    def _save_profile(self, profile: Dict[str, Any]) -> bool:
+        """Upsert a profile row."""
+        try:
+            profile["updated_at"] = datetime.utcnow().isoformat()
+            self.client.table("health_profiles").upsert(profile).execute()
+            return True
+        except Exception as e:
+            error_msg = str(e)
+            if "PGRST205" in error_msg or "Could not find the table" in error_msg:
+                print("\n⚠️  Supabase table 'health_profiles' not found. Run setup_database.sql in your dashboard.\n")
+            elif "42501" in error_msg or "row-level security policy" in error_msg:
+                print("\n⚠️  SUPABASE RLS POLICY ERROR: Row Level Security is blocking access.")
+                print("📝 Run: setup_database.sql in your Supabase SQL Editor\n")
+            else:
+                print(f"Error saving health profile: {e}")
+            return False
     
     # ========== FAMILY CONNECT METHODS ==========
     
@@ -364,3 +780,66 @@ class HealthDatabase:
             print(f"Error removing caregiver: {e}")
             return False
 
+
+def _empty_profile(telegram_id: int) -> Dict[str, Any]:
+    """A profile for a user with no reports yet."""
+    return {
+        "telegram_id": telegram_id,
+        "report_count": 0,
+        "test_count": 0,
+        "abnormal_count": 0,
+        "latest_report_id": None,
+        "latest_test_date": None,
+        "analyzed_count": 0,
+        "avg_response_time": 0.0,
+        "memory_count": 0,
+        "recent_reports": [],
+        "summary_text": None,
+    }
+
+
+def _compact_report(report_id: Optional[int], lab_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The few fields of a report that summaries and history need."""
+    tests = lab_data.get("tests", [])
+    return {
+        "id": report_id,
+        "test_date": lab_data.get("test_date", "Unknown date"),
+        "test_count": len(tests),
+        "abnormal_count": sum(1 for t in tests if t.get("status") != "normal"),
+        # Summaries show the first 5 tests of each report
+        "tests": [
+            {
+                "name": t.get("name"),
+                "value": t.get("value"),
+                "unit": t.get("unit"),
+                "status": t.get("status"),
+            }
+            for t in tests[:5]
+        ],
+    }
+
+
+def _format_summary(reports: List[Dict[str, Any]]) -> str:
+    """Format compact reports (newest first) as the health summary text."""
+    if not reports:
+        return "No health reports available yet."
+    
+    summary = f"Health Summary (Last {len(reports)} reports):\n\n"
+    
+    for report in reports:
+        summary += f"📋 Report from {report.get('test_date') or 'Unknown date'}:\n"
+        
+        for test in report.get("tests", []):
+            summary += f"  • {test.get('name')}: {test.get('value')} {test.get('unit')} ({test.get('status')})\n"
+        
+        summary += "\n"
+    
+    return summary
+
+
+def _add_response_time(profile: Dict[str, Any], response_time: float) -> None:
+    """Update the running average analysis time."""
+    count = profile.get("analyzed_count") or 0
+    average = profile.get("avg_response_time") or 0.0
+    profile["analyzed_count"] = count + 1
+    profile["avg_response_time"] = (average * count + response_time) / (count + 1)
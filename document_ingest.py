@@ -0,0 +1,104 @@
+"""Lab reports sent as documents: PDFs and uncompressed images.
+
+Clinics often send results as PDFs (sometimes 30-page discharge
+summaries) or as full-resolution image files rather than photos.
+
+PDF handling uses PyMuPDF (optional dependency, `pip install pymupdf`):
+- Pages are rasterized lazily, one at a time, only when their extraction
+  starts - a 30-page PDF never has 30 rendered pages in memory
+- Digitally generated PDFs carry a text layer; when every page has enough
+  text, the text is returned instead so callers can skip vision entirely
+
+PyMuPDF is not thread-safe per document, so page access is serialized with
+a lock; the slow part (the extraction call) still runs concurrently.
+"""
+import importlib.util
+import logging
+import threading
+from typing import List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PDF_MIME_TYPE = "application/pdf"
+
+
+def pdf_available() -> bool:
+    """True if PyMuPDF is installed."""
+    return importlib.util.find_spec("fitz") is not None
+
+
+class PdfDocument:
+    """A PDF opened for lazy, page-by-page access."""
+
+    def __init__(self, source: Union[bytes, str], max_pages: int = 30):
+        """Open a PDF.
+
+        Args:
+            source: PDF bytes, or a path to the PDF file
+            max_pages: Only the first max_pages pages are used
+
+        Raises:
+            ImportError: If PyMuPDF is not installed
+        """
+        import fitz
+
+        self._fitz = fitz
+        if isinstance(source, (bytes, bytearray)):
+            self._doc = fitz.open(stream=bytes(source), filetype="pdf")
+        else:
+            self._doc = fitz.open(source)
+        self._lock = threading.Lock()
+
+        self.total_pages = self._doc.page_count
+        self.page_count = min(self.total_pages, max_pages)
+        if self.total_pages > max_pages:
+            logger.warning(f"📄 PDF has {self.total_pages} pages, only reading the first {max_pages}")
+
+    def text_chunks(self, min_chars_per_page: int = 200, max_chunk_chars: int = 12000) -> Optional[List[str]]:
+        """Get the text layer, grouped into chunks of whole pages.
+
+        Args:
+            min_chars_per_page: Pages with less text are treated as scans
+            max_chunk_chars: Pages are grouped into chunks up to this size
+
+        Returns:
+            List of text chunks, or None if any page lacks a usable text
+            layer (scanned pages need vision)
+        """
+        chunks: List[str] = []
+        current = ""
+        for index in range(self.page_count):
+            with self._lock:
+                text = self._doc.load_page(index).get_text("text").strip()
+            if len(text) < min_chars_per_page:
+                return None
+
+            page_text = f"--- Page {index + 1} ---\n{text}\n"
+            if current and len(current) + len(page_text) > max_chunk_chars:
+                chunks.append(current)
+                current = ""
+            current += page_text
+
+        if current:
+            chunks.append(current)
+        return chunks or None
+
+    def render_page(self, index: int, dpi: int = 150) -> bytes:
+        """Rasterize one page to a grayscale JPEG.
+
+        Args:
+            index: Zero-based page number
+            dpi: Render resolution (150 keeps lab text legible)
+
+        Returns:
+            JPEG bytes
+        """
+        with self._lock:
+            page = self._doc.load_page(index)
+            pixmap = page.get_pixmap(dpi=dpi, colorspace=self._fitz.csGRAY)
+            return pixmap.tobytes("jpeg")
+
+    def close(self) -> None:
+        """Close the document."""
+        with self._lock:
+            self._doc.close()
@@ -0,0 +1,219 @@
+"""Content-addressed cache for Gemini Vision lab report extraction.
+
+Users often resend the same report photo: a retry after an error, a
+forward from the family chat, or simply "did you get it?". Each resend
+used to cost another multi-second Gemini Vision call.
+
+ExtractionCache stores parsed lab_data under two keys:
+- Exact content hash (SHA-256 of the downloaded bytes) - identical files,
+  shared across users since identical bytes mean identical content
+- Perceptual hash (difference hash of the grayscale image) - catches
+  recompressed or resized forwards. Lab reports from the same clinic share
+  a template, so perceptual matches are only used within one user's own
+  uploads, and only within a small Hamming distance
+
+Bounded size with LRU eviction, optional JSON persistence across restarts,
+and hit/miss counters.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Optional, Union
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Difference-hash grid: 16x16 comparisons = 256-bit hash
+_HASH_SIZE = 16
+
+
+def content_hash(source: Union[bytes, str]) -> str:
+    """SHA-256 of image bytes (or of a file's contents).
+
+    Args:
+        source: Raw bytes or a file path
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray)):
+        digest.update(source)
+    else:
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def perceptual_hash(img: "Image.Image") -> int:
+    """Difference hash (dHash) of an image.
+
+    Robust to JPEG recompression and resizing, which is what happens when
+    a photo is forwarded between Telegram chats.
+
+    Args:
+        img: PIL image (any mode)
+
+    Returns:
+        256-bit hash as an int
+    """
+    from PIL import Image
+
+    small = img.convert("L").resize((_HASH_SIZE + 1, _HASH_SIZE), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(_HASH_SIZE):
+        offset = row * (_HASH_SIZE + 1)
+        for col in range(_HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+class ExtractionCache:
+    """Bounded LRU cache of extracted lab_data keyed by image hashes."""
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_distance: int = 6,
+        persist_path: Optional[str] = None
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum cached extractions (LRU eviction beyond this)
+            max_distance: Max perceptual-hash Hamming distance for a match
+                (out of 256 bits; 0 disables perceptual matching)
+            persist_path: Optional JSON file to load from and save to
+        """
+        self.max_entries = max(1, max_entries)
+        self.max_distance = max_distance
+        self.persist_path = persist_path
+
+        # content hash -> {"lab_data", "phash", "scope"}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+
+        if persist_path:
+            self.load()
+
+    def get(
+        self,
+        content_key: Optional[str] = None,
+        phash: Optional[int] = None,
+        scope: Optional[Hashable] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Look up cached lab data.
+
+        Args:
+            content_key: Exact content hash
+            phash: Perceptual hash (only matched within the same scope)
+            scope: Owner of the upload (usually the Telegram user ID)
+
+        Returns:
+            A copy of the cached lab_data (safe to modify), or None
+        """
+        with self._lock:
+            if content_key and content_key in self._entries:
+                self._entries.move_to_end(content_key)
+                self.exact_hits += 1
+                return copy.deepcopy(self._entries[content_key]["lab_data"])
+
+            if phash is not None and self.max_distance > 0:
+                scope_key = str(scope)
+                for key, entry in reversed(self._entries.items()):
+                    if entry["scope"] != scope_key or entry["phash"] is None:
+                        continue
+                    if bin(entry["phash"] ^ phash).count("1") <= self.max_distance:
+                        self._entries.move_to_end(key)
+                        self.perceptual_hits += 1
+                        return copy.deepcopy(entry["lab_data"])
+
+            # Only count a miss once the caller has tried every key
+            if phash is not None or content_key is None:
+                self.misses += 1
+            return None
+
+    def put(
+        self,
+        content_key: str,
+        lab_data: Dict[str, Any],
+        phash: Optional[int] = None,
+        scope: Optional[Hashable] = None
+    ) -> None:
+        """Store an extraction result (error results are not cached).
+
+        Args:
+            content_key: Exact content hash
+            lab_data: Extracted lab data
+            phash: Perceptual hash
+            scope: Owner of the upload (usually the Telegram user ID)
+        """
+        if "error" in lab_data:
+            return
+
+        with self._lock:
+            self._entries[content_key] = {
+                # Own copy, so callers can keep modifying theirs
+                "lab_data": copy.deepcopy(lab_data),
+                "phash": phash,
+                "scope": str(scope),
+            }
+            self._entries.move_to_end(content_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics.
+
+        Returns:
+            Dictionary with size and hit/miss counters
+        """
+        lookups = self.exact_hits + self.perceptual_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "exact_hits": self.exact_hits,
+            "perceptual_hits": self.perceptual_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.perceptual_hits) / lookups if lookups else 0.0,
+        }
+
+    def load(self) -> None:
+        """Load cached entries from persist_path, if it exists."""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r") as f:
+                entries = json.load(f)
+            with self._lock:
+                for key, entry in entries[-self.max_entries:]:
+                    self._entries[key] = entry
+            logger.info(f"📦 Loaded {len(self._entries)} cached extractions from {self.persist_path}")
+        except Exception as e:
+            logger.error(f"Error loading extraction cache: {e}")
+
+    def save(self) -> None:
+        """Write cached entries to persist_path (atomically)."""
+        if not self.persist_path:
+            return
+        try:
+            with self._lock:
+                entries = list(self._entries.items())
+            directory = os.path.dirname(os.path.abspath(self.persist_path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.persist_path)
+            logger.info(f"📦 Saved {len(entries)} cached extractions to {self.persist_path}")
+        except Exception as e:
+            logger.error(f"Error saving extraction cache: {e}")
@@ -0,0 +1,234 @@
+"""Bounded worker pool for Gemini Vision lab report extraction.
+
+A single Gemini Vision call takes several seconds, so extraction must never
+run on the event loop. This module provides a dedicated extraction stage:
+
+- A fixed number of async workers, each running one extraction at a time
+  in a worker thread
+- A bounded queue (configurable depth) so morning upload bursts get a
+  polite "busy" reply instead of unbounded memory growth
+- Per-user FIFO ordering: jobs from the same user start in the order they
+  were submitted, one at a time, while different users run in parallel.
+  A multi-page report may let its user run a few pages at once
+  (submit(..., parallel=N)); that user still takes turns with everyone else
+
+Jobs run in the submitting task's context, so their spans (and the
+time they spent queued) belong to the update that submitted them rather
+than to whichever update happened to start the worker.
+
+Observability:
+    stats() returns the current queue depth, jobs in flight and
+    average/max queue wait time, for sizing the pool.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional
+
+from tracing import set_attributes
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionQueueFull(Exception):
+    """Raised when the extraction queue is at its configured depth."""
+
+
+class _ExtractionJob:
+    """A single queued extraction call."""
+
+    __slots__ = ("func", "args", "future", "enqueued_at", "context")
+
+    def __init__(self, func: Callable[..., Any], args: tuple, future: asyncio.Future):
+        self.func = func
+        self.args = args
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        # The submitter's context (current trace span)
+        self.context = contextvars.copy_context()
+
+
+class ExtractionWorkerPool:
+    """Runs blocking extraction calls on a bounded pool of workers.
+
+    Jobs are grouped by key (usually the Telegram user ID). Each key has
+    its own FIFO; the shared ready-queue holds keys, not jobs, and a key is
+    only handed to as many workers at a time as its parallel allowance
+    (1 unless submit() asked for more). This keeps per-user ordering while
+    letting different users proceed in parallel.
+    """
+
+    def __init__(self, num_workers: int = 4, max_queue_size: int = 50):
+        """Initialize the pool.
+
+        Args:
+            num_workers: Number of extractions that may run concurrently
+            max_queue_size: Maximum number of jobs waiting to start
+        """
+        self.num_workers = max(1, num_workers)
+        self.max_queue_size = max(1, max_queue_size)
+
+        self._pending: Dict[Hashable, Deque[_ExtractionJob]] = {}
+        # Per key: allowed parallel jobs, jobs running, turns waiting in _ready
+        self._parallel: Dict[Hashable, int] = {}
+        self._running: Dict[Hashable, int] = {}
+        self._turns: Dict[Hashable, int] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._queued = 0
+        self._in_flight = 0
+
+        # Wait-time statistics
+        self._completed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._rejected = 0
+
+    def _ensure_started(self) -> None:
+        """Start worker tasks on first use (needs a running event loop)."""
+        if self._workers:
+            return
+        self._ready = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"extraction-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        logger.info(
+            f"🔬 Extraction pool started ({self.num_workers} workers, "
+            f"queue depth {self.max_queue_size})"
+        )
+
+    async def submit(self, key: Hashable, func: Callable[..., Any], *args: Any, parallel: int = 1) -> Any:
+        """Queue an extraction and wait for its result.
+
+        Args:
+            key: Ordering key - jobs with the same key start in FIFO order
+            func: Blocking callable to run in a worker thread
+            *args: Arguments for func
+            parallel: How many of this key's jobs may run at once
+                (e.g. the pages of one multi-page report)
+
+        Returns:
+            Whatever func returns
+
+        Raises:
+            ExtractionQueueFull: If the queue is already at max depth
+        """
+        self._ensure_started()
+
+        if self._queued >= self.max_queue_size:
+            self._rejected += 1
+            logger.warning(f"⚠️ Extraction queue full ({self._queued} waiting), rejecting job")
+            raise ExtractionQueueFull(f"Extraction queue full ({self._queued} waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        job = _ExtractionJob(func, args, future)
+        self._queued += 1
+
+        if key not in self._pending:
+            self._pending[key] = deque()
+            self._parallel[key] = 1
+            self._running[key] = 0
+            self._turns[key] = 0
+        self._pending[key].append(job)
+        # Keep the largest allowance while the key has work (a single photo
+        # must not slow down an album still extracting); reset when it's idle
+        self._parallel[key] = max(self._parallel[key], parallel)
+        # Idle key: ready for the next free worker; busy key: waits behind earlier jobs
+        self._give_turns(key)
+
+        return await future
+
+    def _give_turns(self, key: Hashable) -> None:
+        """Put a key on the ready-queue once per job it may start now."""
+        queue = self._pending[key]
+        while (
+            self._turns[key] < len(queue)
+            and self._turns[key] + self._running[key] < self._parallel[key]
+        ):
+            self._turns[key] += 1
+            self._ready.put_nowait(key)
+
+    async def _worker(self, worker_id: int) -> None:
+        """Take ready keys and run their next job."""
+        while True:
+            key = await self._ready.get()
+            self._turns[key] -= 1
+            job = self._pending[key].popleft()
+            self._running[key] += 1
+
+            wait = time.monotonic() - job.enqueued_at
+            self._queued -= 1
+            self._in_flight += 1
+            self._record_wait(wait)
+
+            try:
+                if not job.future.cancelled():
+                    job.context.run(set_attributes, queue_wait_seconds=round(wait, 3))
+                    result = await asyncio.to_thread(job.context.run, job.func, *job.args)
+                    if not job.future.done():
+                        job.future.set_result(result)
+            except Exception as e:
+                logger.error(f"❌ Extraction worker {worker_id} error: {e}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                if not job.future.done():
+                    # Worker cancelled mid-job (shutdown)
+                    job.future.cancel()
+                self._in_flight -= 1
+                self._running[key] -= 1
+                if self._pending[key] or self._running[key]:
+                    # More work for this key - back of the line so others get a turn
+                    self._give_turns(key)
+                else:
+                    for state in (self._pending, self._parallel, self._running, self._turns):
+                        del state[key]
+                self._ready.task_done()
+
+    def _record_wait(self, wait: float) -> None:
+        """Update queue wait statistics."""
+        self._completed += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        if wait > 5.0:
+            logger.warning(f"⏳ Extraction job waited {wait:.1f}s in queue")
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queued
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool statistics.
+
+        Returns:
+            Dictionary with queue depth, in-flight jobs and wait times
+        """
+        return {
+            "workers": self.num_workers,
+            "max_queue_size": self.max_queue_size,
+            "queue_depth": self._queued,
+            "in_flight": self._in_flight,
+            "users_waiting": len(self._pending),
+            "started": self._completed,
+            "rejected": self._rejected,
+            "avg_wait_seconds": self._total_wait / self._completed if self._completed else 0.0,
+            "max_wait_seconds": self._max_wait,
+        }
+
+    async def shutdown(self) -> None:
+        """Stop all workers. Jobs still queued are cancelled."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for queue in self._pending.values():
+            for job in queue:
+                if not job.future.done():
+                    job.future.cancel()
+        for state in (self._pending, self._parallel, self._running, self._turns):
+            state.clear()
+        self._queued = 0
@@ -12,13 +12,16 @@ Key Features:
 - Authentic Singlish personality
 """
 import json
+import threading
 import time
-from typing import Dict, Any, List
-import google.generativeai as genai
-from groq import Groq
-from PIL import Image
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Union
 import config
 import prompts
+from connection_pool import build_sync_client
+from tracing import span
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 
 class HealthAnalyzer:
@@ -29,47 +32,102 @@ class HealthAnalyzer:
     2. Groq Llama 3.3 70B - Provides instant health analysis
     
     All responses use the authentic Singaporean aunty personality.
+    
+    Both clients (and their SDKs) are created on first use, so importing
+    and constructing the analyzer costs nothing until a report arrives.
     """
     
     def __init__(self):
-        """Initialize Gemini and Groq API clients."""
-        # Configure Gemini Vision API
-        genai.configure(api_key=config.GEMINI_API_KEY)
-        self.gemini_model = genai.GenerativeModel(config.GEMINI_MODEL)
+        """Set up lazy Gemini and Groq API clients."""
+        self._gemini_model = None
+        self._groq_client = None
+        self._client_lock = threading.Lock()
+    
+    @property
+    def gemini_model(self):
+        """Gemini Vision model (google-generativeai is imported on first use)."""
+        if self._gemini_model is None:
+            with self._client_lock:
+                if self._gemini_model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=config.GEMINI_API_KEY)
+                    self._gemini_model = genai.GenerativeModel(config.GEMINI_MODEL)
+        return self._gemini_model
+    
+    @gemini_model.setter
+    def gemini_model(self, model) -> None:
+        self._gemini_model = model
+    
+    @property
+    def groq_client(self):
+        """Groq client (pooled connections, tuned timeout; groq is imported on first use)."""
+        if self._groq_client is None:
+            with self._client_lock:
+                if self._groq_client is None:
+                    from groq import Groq
+                    self._groq_client = Groq(
+                        api_key=config.GROQ_API_KEY,
+                        http_client=build_sync_client("groq", config.GROQ_TIMEOUT),
+                        timeout=config.GROQ_TIMEOUT
+                    )
+        return self._groq_client
+    
+    @groq_client.setter
+    def groq_client(self, client) -> None:
+        self._groq_client = client
+    
+    def ping_groq(self) -> None:
+        """Cheap authenticated Groq call (lists models) to open/keep a pooled connection.
+        
+        Raises:
+            Exception: Whatever the Groq SDK raises if the API is unreachable
+        """
+        self.groq_client.models.list()
+    
+    def ping_gemini(self) -> None:
+        """Cheap authenticated Gemini call (counts tokens, no generation).
         
-        # Configure Groq LLM API
-        self.groq_client = Groq(api_key=config.GROQ_API_KEY)
+        Raises:
+            Exception: Whatever the Gemini SDK raises if the API is unreachable
+        """
+        self.gemini_model.count_tokens("ping", request_options={"timeout": config.GEMINI_TIMEOUT})
     
-    def extract_lab_data(self, image_path: str) -> Dict[str, Any]:
+    def extract_lab_data(self, image: Union[str, bytes, "Image.Image"]) -> Dict[str, Any]:
         """Extract lab report data from image using Gemini Vision.
         
         Args:
-            image_path: Path to the lab report image
+            image: Preprocessed JPEG bytes, decoded PIL image, or path to the image
             
         Returns:
             Extracted lab data as dictionary
         """
         try:
-            # Load image
-            img = Image.open(image_path)
+            # Load image (already decoded/encoded when it came from memory)
+            if isinstance(image, (bytes, bytearray)):
+                img = {"mime_type": "image/jpeg", "data": bytes(image)}
+            elif isinstance(image, str):
+                from PIL import Image
+                img = Image.open(image)
+            else:
+                img = image
             
             # Generate extraction with Gemini Vision
-            response = self.gemini_model.generate_content([
-                prompts.LAB_EXTRACTION_PROMPT,
-                img
-            ])
-            
-            # Parse JSON response
-            text = response.text.strip()
-            
-            # Extract JSON from markdown code blocks if present
-            if "```json" in text:
-                text = text.split("```json")[1].split("```")[0].strip()
-            elif "```" in text:
-                text = text.split("```")[1].split("```")[0].strip()
-            
-            lab_data = json.loads(text)
-            return lab_data
+            with span(
+                "gemini.extract_lab_data",
+                bytes=len(img["data"]) if isinstance(img, dict) else None
+            ) as provider_span:
+                response = self.gemini_model.generate_content(
+                    [prompts.LAB_EXTRACTION_PROMPT, img],
+                    request_options={"timeout": config.GEMINI_TIMEOUT}
+                )
+                usage = getattr(response, "usage_metadata", None)
+                if usage is not None:
+                    provider_span.set(
+                        prompt_tokens=getattr(usage, "prompt_token_count", None),
+                        completion_tokens=getattr(usage, "candidates_token_count", None)
+                    )
+            
+            return self._parse_lab_json(response.text)
             
         except json.JSONDecodeError as e:
             print(f"JSON parsing error: {e}")
@@ -88,6 +146,90 @@ class HealthAnalyzer:
                 "error": str(e)
             }
     
+    def extract_lab_data_from_text(self, report_text: str) -> Dict[str, Any]:
+        """Extract lab report data from a PDF's text layer using Groq.
+        
+        Digitally generated PDFs already contain the report as text, so
+        there is no need for a (much slower) vision call.
+        
+        Args:
+            report_text: Text extracted from the document
+            
+        Returns:
+            Extracted lab data as dictionary
+        """
+        try:
+            chat_completion = self._complete(
+                "extract_lab_data_from_text",
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompts.LAB_TEXT_EXTRACTION_PROMPT.format(
+                            report_text=report_text
+                        )
+                    }
+                ],
+                model=config.GROQ_MODEL,
+                temperature=0,
+                response_format={"type": "json_object"},
+            )
+            return self._parse_lab_json(chat_completion.choices[0].message.content)
+            
+        except json.JSONDecodeError as e:
+            print(f"JSON parsing error: {e}")
+            return {
+                "test_date": "Unknown",
+                "tests": [],
+                "error": "Could not parse lab report. Please ensure the document is readable."
+            }
+        except Exception as e:
+            print(f"Error extracting lab data from text: {e}")
+            return {
+                "test_date": "Unknown",
+                "tests": [],
+                "error": str(e)
+            }
+    
+    def _complete(self, operation: str, **kwargs: Any):
+        """Create a Groq chat completion inside a provider span.
+        
+        Args:
+            operation: What the completion is for (span name suffix)
+            **kwargs: Arguments for chat.completions.create
+            
+        Returns:
+            The chat completion
+        """
+        with span(f"groq.{operation}", model=kwargs.get("model")) as provider_span:
+            completion = self.groq_client.chat.completions.create(**kwargs)
+            usage = getattr(completion, "usage", None)
+            if usage is not None:
+                provider_span.set(
+                    prompt_tokens=usage.prompt_tokens,
+                    completion_tokens=usage.completion_tokens
+                )
+            return completion
+    
+    @staticmethod
+    def _parse_lab_json(text: str) -> Dict[str, Any]:
+        """Parse the JSON lab data returned by a model.
+        
+        Args:
+            text: Model response (may wrap the JSON in a markdown code block)
+            
+        Returns:
+            Parsed lab data
+        """
+        text = text.strip()
+        
+        # Extract JSON from markdown code blocks if present
+        if "```json" in text:
+            text = text.split("```json")[1].split("```")[0].strip()
+        elif "```" in text:
+            text = text.split("```")[1].split("```")[0].strip()
+        
+        return json.loads(text)
+    
     def analyze_with_aunty(
         self, 
         lab_data: Dict[str, Any], 
@@ -105,27 +247,10 @@ class HealthAnalyzer:
         try:
             start_time = time.time()
             
-            # Format lab data for prompt
-            lab_data_str = json.dumps(lab_data, indent=2)
-            
-            # Generate analysis prompt
-            user_prompt = prompts.HEALTH_ANALYSIS_PROMPT.format(
-                lab_data=lab_data_str,
-                health_history=health_history or "No previous records"
-            )
-            
             # Call Groq for ultra-fast response
-            chat_completion = self.groq_client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": prompts.SINGAPOREAN_AUNTY_SYSTEM_PROMPT
-                    },
-                    {
-                        "role": "user",
-                        "content": user_prompt
-                    }
-                ],
+            chat_completion = self._complete(
+                "analysis",
+                messages=self._analysis_messages(lab_data, health_history),
                 model=config.GROQ_MODEL,
                 temperature=0.8,
                 max_tokens=500,
@@ -157,29 +282,10 @@ class HealthAnalyzer:
         try:
             start_time = time.time()
             
-            # Build conversation
-            messages = [
-                {
-                    "role": "system",
-                    "content": prompts.SINGAPOREAN_AUNTY_SYSTEM_PROMPT
-                }
-            ]
-            
-            # Add context if available
-            if context:
-                messages.append({
-                    "role": "system",
-                    "content": f"Additional context from memory:\n{context}"
-                })
-            
-            messages.append({
-                "role": "user",
-                "content": user_message
-            })
-            
             # Call Groq
-            chat_completion = self.groq_client.chat.completions.create(
-                messages=messages,
+            chat_completion = self._complete(
+                "chat",
+                messages=self._chat_messages(user_message, context),
                 model=config.GROQ_MODEL,
                 temperature=0.8,
                 max_tokens=300,
@@ -194,6 +300,121 @@ class HealthAnalyzer:
             print(f"Error in chat: {e}")
             return f"Aiyo! Cannot process your message lah. Error: {e}", 0.0
     
+    def stream_analysis(
+        self, 
+        lab_data: Dict[str, Any], 
+        health_history: str = ""
+    ) -> Iterator[str]:
+        """Stream the health analysis from Groq as it is generated.
+        
+        Args:
+            lab_data: Extracted lab report data
+            health_history: Previous health information from memory
+            
+        Yields:
+            Text deltas, in order
+        """
+        try:
+            yield from self._stream_completion(
+                self._analysis_messages(lab_data, health_history), max_tokens=500
+            )
+        except Exception as e:
+            print(f"Error generating analysis: {e}")
+            yield f"\n\nAiyo! I got some technical problem lah. Error: {e}"
+    
+    def stream_chat(
+        self, 
+        user_message: str, 
+        context: str = ""
+    ) -> Iterator[str]:
+        """Stream a chat reply from Dr. Aunty as it is generated.
+        
+        Args:
+            user_message: User's question or message
+            context: Additional context from memory
+            
+        Yields:
+            Text deltas, in order
+        """
+        try:
+            yield from self._stream_completion(
+                self._chat_messages(user_message, context), max_tokens=300
+            )
+        except Exception as e:
+            print(f"Error in chat: {e}")
+            yield f"\n\nAiyo! Cannot process your message lah. Error: {e}"
+    
+    def _stream_completion(self, messages: List[Dict[str, str]], max_tokens: int) -> Iterator[str]:
+        """Yield content deltas from a streaming Groq completion."""
+        with span("groq.stream", model=config.GROQ_MODEL) as provider_span:
+            stream = self.groq_client.chat.completions.create(
+                messages=messages,
+                model=config.GROQ_MODEL,
+                temperature=0.8,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+            chunks = 0
+            for chunk in stream:
+                if chunks == 0:
+                    provider_span.set(first_chunk_seconds=round(provider_span.elapsed, 3))
+                chunks += 1
+                # Groq reports token usage on the final chunk
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if usage is not None:
+                    provider_span.set(
+                        prompt_tokens=usage.prompt_tokens,
+                        completion_tokens=usage.completion_tokens
+                    )
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            provider_span.set(chunks=chunks)
+    
+    @staticmethod
+    def _analysis_messages(lab_data: Dict[str, Any], health_history: str) -> List[Dict[str, str]]:
+        """Build the Groq messages for a lab report analysis."""
+        # Format lab data for prompt
+        lab_data_str = json.dumps(lab_data, indent=2)
+        
+        # Generate analysis prompt
+        user_prompt = prompts.HEALTH_ANALYSIS_PROMPT.format(
+            lab_data=lab_data_str,
+            health_history=health_history or "No previous records"
+        )
+        return [
+            {
+                "role": "system",
+                "content": prompts.SINGAPOREAN_AUNTY_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": user_prompt
+            }
+        ]
+    
+    @staticmethod
+    def _chat_messages(user_message: str, context: str) -> List[Dict[str, str]]:
+        """Build the Groq messages for a chat reply."""
+        messages = [
+            {
+                "role": "system",
+                "content": prompts.SINGAPOREAN_AUNTY_SYSTEM_PROMPT
+            }
+        ]
+        
+        # Add context if available
+        if context:
+            messages.append({
+                "role": "system",
+                "content": f"Additional context from memory:\n{context}"
+            })
+        
+        messages.append({
+            "role": "user",
+            "content": user_message
+        })
+        return messages
+    
     def generate_video_script_chunks(self, health_summary: str, user_name: str = "friend") -> list[str]:
         """Generate sassy video script in 8-second chunks.
         
@@ -209,7 +430,8 @@ class HealthAnalyzer:
                 health_summary=health_summary
             )
             
-            chat_completion = self.groq_client.chat.completions.create(
+            chat_completion = self._complete(
+                "video_script",
                 messages=[
                     {
                         "role": "system",
@@ -272,7 +494,8 @@ class HealthAnalyzer:
                 health_summary=health_summary
             )
             
-            chat_completion = self.groq_client.chat.completions.create(
+            chat_completion = self._complete(
+                "patient_script",
                 messages=[
                     {
                         "role": "system",
@@ -332,7 +555,8 @@ class HealthAnalyzer:
                 health_summary=health_summary
             )
             
-            chat_completion = self.groq_client.chat.completions.create(
+            chat_completion = self._complete(
+                "caregiver_script",
                 messages=[
                     {
                         "role": "system",
@@ -0,0 +1,248 @@
+"""Image preprocessing before Gemini Vision extraction.
+
+Sending the full-resolution colour photo to Gemini wastes upload time and
+slows the vision call down; lab reports are black text on white paper and
+stay perfectly legible at a fraction of the size.
+
+Pipeline (CPU work runs in a process pool, never on the event loop):
+1. Pick the smallest Telegram photo size whose long edge keeps text legible
+2. Auto-rotate using EXIF orientation
+3. Convert to grayscale
+4. Crop to the document (bright paper against a darker background)
+5. Downscale to a maximum long edge
+6. Re-encode as JPEG, searching for the best quality within a byte budget
+
+Each image reports its before/after bytes so the budget can be tuned.
+"""
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Tuple, Union
+
+from extraction_cache import perceptual_hash
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def choose_photo_size(photo_sizes: Sequence[Any], min_long_edge: int):
+    """Pick the smallest Telegram PhotoSize that is still legible.
+
+    Args:
+        photo_sizes: update.message.photo (sorted smallest to largest)
+        min_long_edge: Minimum long edge in pixels for legible text
+
+    Returns:
+        The chosen PhotoSize (the largest one if none is big enough)
+    """
+    for size in sorted(photo_sizes, key=lambda s: s.width * s.height):
+        if max(size.width, size.height) >= min_long_edge:
+            return size
+    return max(photo_sizes, key=lambda s: s.width * s.height)
+
+
+def _crop_to_document(img: "Image.Image") -> "Image.Image":
+    """Crop a grayscale image to the bright paper region, if one stands out."""
+    from PIL import ImageOps
+
+    # Work on a small copy - we only need the rough page outline
+    probe = img.copy()
+    probe.thumbnail((256, 256))
+    probe = ImageOps.autocontrast(probe, cutoff=2)
+
+    histogram = probe.histogram()
+    pixels = sum(histogram)
+    mean = sum(i * count for i, count in enumerate(histogram)) / max(pixels, 1)
+    threshold = max(mean, 128)
+
+    mask = probe.point(lambda p: 255 if p > threshold else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return img
+
+    left, top, right, bottom = bbox
+    area = (right - left) * (bottom - top)
+    total = probe.width * probe.height
+    # Ignore tiny regions (glare) and near-full frames (nothing to crop)
+    if area < 0.3 * total or area > 0.95 * total:
+        return img
+
+    # Scale back to full size with a small margin so edge text isn't clipped
+    scale_x = img.width / probe.width
+    scale_y = img.height / probe.height
+    margin = 0.02
+    return img.crop((
+        max(0, int((left - margin * probe.width) * scale_x)),
+        max(0, int((top - margin * probe.height) * scale_y)),
+        min(img.width, int((right + margin * probe.width) * scale_x)),
+        min(img.height, int((bottom + margin * probe.height) * scale_y)),
+    ))
+
+
+def _encode_within_budget(img: "Image.Image", target_bytes: int) -> Tuple[bytes, int]:
+    """Encode as JPEG at the highest quality that fits the byte budget.
+
+    Returns:
+        Tuple of (JPEG bytes, quality used)
+    """
+    def encode(quality: int) -> bytes:
+        out = BytesIO()
+        img.save(out, format="JPEG", quality=quality, optimize=True)
+        return out.getvalue()
+
+    low, high = 35, 90
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode(quality)
+        if len(data) <= target_bytes:
+            best = (data, quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+
+    return best if best else (encode(35), 35)
+
+
+def preprocess_image(
+    source: Union[bytes, str],
+    max_long_edge: int = 1600,
+    target_bytes: int = 250_000,
+    min_long_edge: int = 1280
+) -> Tuple[bytes, Dict[str, Any]]:
+    """Prepare a lab report image for Gemini (runs in a worker process).
+
+    Args:
+        source: Original image bytes, or a path to the image file
+        max_long_edge: Downscale so the long edge is at most this many pixels
+        target_bytes: JPEG byte budget
+        min_long_edge: Never shrink below this long edge to hit the budget
+            (the same legibility floor used to pick the Telegram photo size)
+
+    Returns:
+        Tuple of (JPEG bytes, stats dict with before/after bytes and sizes)
+    """
+    # PIL is imported here (in the worker process), not when the bot starts
+    from PIL import Image, ImageOps
+
+    if isinstance(source, (bytes, bytearray)):
+        bytes_in = len(source)
+        img = Image.open(BytesIO(source))
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+        bytes_in = len(data)
+        img = Image.open(BytesIO(data))
+
+    size_in = img.size
+    img = ImageOps.exif_transpose(img)
+    img = img.convert("L")
+    # Hash the whole (upright) photo, before cropping, for the extraction cache
+    phash = perceptual_hash(img)
+    img = _crop_to_document(img)
+
+    if max(img.size) > max_long_edge:
+        img.thumbnail((max_long_edge, max_long_edge), Image.Resampling.LANCZOS)
+
+    data, quality = _encode_within_budget(img, target_bytes)
+
+    # Still over budget at minimum quality: shrink (but keep text legible)
+    while len(data) > target_bytes and max(img.size) * 0.85 >= min_long_edge:
+        img = img.resize((int(img.width * 0.85), int(img.height * 0.85)), Image.Resampling.LANCZOS)
+        data, quality = _encode_within_budget(img, target_bytes)
+
+    stats = {
+        "bytes_in": bytes_in,
+        "bytes_out": len(data),
+        "size_in": size_in,
+        "size_out": img.size,
+        "quality": quality,
+        "phash": phash,
+    }
+    return data, stats
+
+
+class ImagePreprocessor:
+    """Runs preprocess_image() in a process pool."""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_long_edge: int = 1600,
+        target_bytes: int = 250_000,
+        min_long_edge: int = 1280
+    ):
+        """Initialize the preprocessor.
+
+        Args:
+            max_workers: Worker processes for image work
+            max_long_edge: Downscale so the long edge is at most this many pixels
+            target_bytes: JPEG byte budget per image
+            min_long_edge: Never shrink below this long edge to hit the budget
+        """
+        self.max_workers = max_workers
+        self.max_long_edge = max_long_edge
+        self.target_bytes = target_bytes
+        self.min_long_edge = min_long_edge
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self._images = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def preprocess(self, source: Union[bytes, str]) -> Tuple[bytes, Dict[str, Any]]:
+        """Preprocess an image without blocking the event loop.
+
+        Args:
+            source: Original image bytes, or a path to the image file
+
+        Returns:
+            Tuple of (JPEG bytes, stats dict)
+        """
+        loop = asyncio.get_running_loop()
+        data, stats = await loop.run_in_executor(
+            self._get_executor(),
+            preprocess_image,
+            source,
+            self.max_long_edge,
+            self.target_bytes,
+            self.min_long_edge
+        )
+
+        self._images += 1
+        self._bytes_in += stats["bytes_in"]
+        self._bytes_out += stats["bytes_out"]
+        logger.info(
+            f"🖼️ Preprocessed image: {stats['bytes_in'] / 1024:.0f} KB → "
+            f"{stats['bytes_out'] / 1024:.0f} KB "
+            f"({stats['size_in'][0]}x{stats['size_in'][1]} → "
+            f"{stats['size_out'][0]}x{stats['size_out'][1]}, q{stats['quality']})"
+        )
+        return data, stats
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cumulative byte savings.
+
+        Returns:
+            Dictionary with image count and total before/after bytes
+        """
+        return {
+            "images": self._images,
+            "bytes_in": self._bytes_in,
+            "bytes_out": self._bytes_out,
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
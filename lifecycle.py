@@ -0,0 +1,112 @@
+"""Process lifecycle: tracking in-flight work and draining it on shutdown.
+
+A lab report upload keeps working long after Telegram delivered the update:
+analysis, Mem0 writes, videos and caregiver audio all run in parallel. If
+the process simply stops (rolling deploy, SIGTERM), that work is lost and
+the user never hears back.
+
+LifecycleManager tracks every in-flight pipeline. On shutdown it:
+1. Stops accepting new work (callers check `accepting`)
+2. Waits for tracked tasks to finish, up to a deadline
+3. Cancels whatever is still running and reports what was abandoned
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class LifecycleManager:
+    """Tracks in-flight pipelines so shutdown can drain them."""
+
+    def __init__(self, drain_timeout: float = 30.0):
+        """Initialize the manager.
+
+        Args:
+            drain_timeout: Default seconds to wait for in-flight work on shutdown
+        """
+        self.drain_timeout = drain_timeout
+        self._accepting = True
+        self._tasks: Dict[asyncio.Future, tuple[str, float]] = {}
+
+    @property
+    def accepting(self) -> bool:
+        """False once shutdown has started."""
+        return self._accepting
+
+    def track(self, awaitable: Awaitable[Any], name: str) -> asyncio.Future:
+        """Start tracking a coroutine or future.
+
+        Args:
+            awaitable: Coroutine, task or future to track
+            name: Human-readable label used in shutdown reports
+
+        Returns:
+            The task/future being tracked
+        """
+        task = asyncio.ensure_future(awaitable)
+        self._tasks[task] = (name, time.monotonic())
+        task.add_done_callback(lambda t: self._tasks.pop(t, None))
+        return task
+
+    async def run(self, awaitable: Awaitable[Any], name: str) -> Any:
+        """Track an awaitable and wait for its result.
+
+        Args:
+            awaitable: Coroutine, task or future to run
+            name: Human-readable label used in shutdown reports
+
+        Returns:
+            The awaitable's result
+        """
+        return await self.track(awaitable, name)
+
+    def in_flight(self) -> List[str]:
+        """Labels of everything currently being tracked."""
+        return [name for name, _ in self._tasks.values()]
+
+    def begin_shutdown(self) -> None:
+        """Stop accepting new work."""
+        if self._accepting:
+            self._accepting = False
+            logger.info(f"🛑 Shutdown started - {len(self._tasks)} pipelines in flight")
+
+    async def drain(self, timeout: float = None) -> List[str]:
+        """Wait for in-flight work, then cancel anything left.
+
+        Args:
+            timeout: Seconds to wait (defaults to drain_timeout)
+
+        Returns:
+            Labels of the pipelines that were abandoned
+        """
+        self.begin_shutdown()
+        timeout = self.drain_timeout if timeout is None else timeout
+        start = time.monotonic()
+
+        # Keep waiting while tracked work spawns more tracked work
+        while self._tasks:
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            await asyncio.wait(list(self._tasks), timeout=remaining)
+
+        abandoned = []
+        now = time.monotonic()
+        for task, (name, started) in list(self._tasks.items()):
+            abandoned.append(name)
+            logger.warning(f"⚠️ Abandoning '{name}' after {now - started:.1f}s")
+            task.cancel()
+        if abandoned:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+        elapsed = time.monotonic() - start
+        if abandoned:
+            logger.warning(
+                f"🛑 Drain deadline ({timeout:.0f}s) hit: abandoned {len(abandoned)} pipelines"
+            )
+        else:
+            logger.info(f"✅ All in-flight pipelines finished in {elapsed:.1f}s")
+        return abandoned
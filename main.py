@@ -3,13 +3,18 @@ Dr. Aunty - Telegram Health Bot with Singaporean Personality
 A hackathon project featuring AI health analysis and talking avatar videos.
 """
 import os
+import importlib.util
 import logging
 import warnings
 import asyncio
+import signal
+import time
 from datetime import datetime
-from telegram import Update
+from typing import Awaitable, Callable
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import (
     Application,
+    CallbackQueryHandler,
     CommandHandler,
     MessageHandler,
     ContextTypes,
@@ -24,10 +29,31 @@ from health_analyzer import HealthAnalyzer
 from memory_manager import HealthMemoryManager
 from database import HealthDatabase
 from video_generator import VideoGenerator
+from extraction_pool import ExtractionWorkerPool, ExtractionQueueFull
+from ordered_delivery import ReorderBuffer
+from request_context import PhotoRequestContext
+from update_scheduler import PerUserUpdateProcessor
+from lifecycle import LifecycleManager
+from rate_limiter import TelegramRateLimiter, BULK_PRIORITY
+from connection_pool import build_telegram_request, pool_stats
+from photo_ingest import decode_image, spooled_download
+from image_preprocessor import ImagePreprocessor, choose_photo_size
+from extraction_cache import ExtractionCache, content_hash, perceptual_hash
+from media_group import MediaGroupAggregator, merge_lab_pages, split_report_metadata
+from document_ingest import PDF_MIME_TYPE, PdfDocument, pdf_available
+from streaming import ProgressiveMessage, stream_to_message
+from metrics import (
+    count_error, count_fallback, register_gauges, stage_timer, start_metrics_server, timed_to_thread
+)
+from tracing import (
+    configure_tracing, hash_user, install_log_correlation, shutdown_tracing, trace, traced
+)
+from warmup import ConnectionWarmer
 
-# Enable logging
+# Enable logging (every line carries the trace ID of the update it belongs to)
+install_log_correlation()
 logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    format="%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s",
     level=logging.INFO
 )
 logger = logging.getLogger(__name__)
@@ -37,6 +63,43 @@ health_analyzer = HealthAnalyzer()
 memory_manager = HealthMemoryManager()
 database = HealthDatabase()
 video_generator = VideoGenerator()
+extraction_pool = ExtractionWorkerPool(
+    num_workers=config.EXTRACTION_WORKERS,
+    max_queue_size=config.EXTRACTION_QUEUE_SIZE
+)
+lifecycle = LifecycleManager(drain_timeout=config.SHUTDOWN_DRAIN_TIMEOUT)
+image_preprocessor = ImagePreprocessor(
+    max_workers=config.PREPROCESS_WORKERS,
+    max_long_edge=config.PREPROCESS_MAX_LONG_EDGE,
+    target_bytes=config.PREPROCESS_TARGET_BYTES,
+    min_long_edge=config.PREPROCESS_MIN_LONG_EDGE
+)
+extraction_cache = ExtractionCache(
+    max_entries=config.EXTRACTION_CACHE_SIZE,
+    max_distance=config.EXTRACTION_CACHE_MAX_DISTANCE,
+    persist_path=config.EXTRACTION_CACHE_PATH or None
+)
+update_processor = PerUserUpdateProcessor(
+    max_concurrent_updates=config.CONCURRENT_UPDATES,
+    max_queue_per_user=config.MAX_QUEUED_UPDATES_PER_USER,
+    lifecycle=lifecycle
+)
+# Component stats exported as gauges on the metrics endpoint
+register_gauges("extraction_pool", extraction_pool.stats)
+register_gauges("extraction_cache", extraction_cache.stats)
+register_gauges("image_preprocessor", image_preprocessor.stats)
+register_gauges("update_scheduler", update_processor.stats)
+register_gauges("http_pool", pool_stats, label="pool")
+register_gauges("lifecycle", lambda: {"in_flight": len(lifecycle.in_flight())})
+metrics_server = None
+# Provider warm-up and keepalive (created in on_startup when enabled)
+warmer = None
+# Album pages are collected here and processed as one multi-page report
+media_groups = MediaGroupAggregator(
+    on_flush=lambda updates: process_album(updates),
+    flush_delay=config.MEDIA_GROUP_WAIT_SECONDS,
+    lifecycle=lifecycle
+)
 
 
 def format_health_report_for_caregiver(lab_data: dict, patient_name: str) -> str:
@@ -125,7 +188,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     telegram_id = user.id
     
     # Save user to database
-    database.add_user(telegram_id, user.username, user.first_name)
+    await timed_to_thread("db_write", database.add_user, telegram_id, user.username, user.first_name)
     
     welcome_message = f"""
 Aiyo {user.first_name}! Welcome welcome!
@@ -182,7 +245,9 @@ async def setcaregiver(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         caregiver_name = " ".join(context.args[1:])
         
         # Save to database
-        success = database.add_caregiver(
+        success = await timed_to_thread(
+            "db_write",
+            database.add_caregiver,
             patient_telegram_id=telegram_id,
             caregiver_telegram_id=caregiver_id,
             caregiver_name=caregiver_name,
@@ -263,83 +328,457 @@ Any questions? Just ask! (But prepare for sass!)
     await update.message.reply_text(help_text, parse_mode="Markdown")
 
 
+async def extract_photo_lab_data(photo_sizes, telegram_id: int, parallel: int = 1) -> dict:
+    """Download a lab report photo and extract its lab data.
+
+    Args:
+        photo_sizes: update.message.photo
+        telegram_id: User's Telegram ID (extraction queue and cache scope)
+        parallel: How many of this user's extractions may run at once
+
+    Returns:
+        Extracted lab data (may contain an "error" key)
+
+    Raises:
+        ExtractionQueueFull: If the extraction queue is full
+    """
+    if config.PREPROCESS_IMAGES:
+        # Smallest legible size, then grayscale/crop/re-encode in a worker process
+        photo_file = await choose_photo_size(photo_sizes, config.PREPROCESS_MIN_LONG_EDGE).get_file()
+    else:
+        photo_file = await photo_sizes[-1].get_file()
+
+    return await extract_image_lab_data(photo_file, telegram_id, parallel)
+
+
+async def extract_image_lab_data(telegram_file, telegram_id: int, parallel: int = 1) -> dict:
+    """Download a lab report image and extract its lab data.
+
+    Repeat uploads are answered from the extraction cache: identical files
+    by content hash, recompressed forwards by perceptual hash.
+
+    Args:
+        telegram_file: telegram.File of the photo or image document
+        telegram_id: User's Telegram ID (extraction queue and cache scope)
+        parallel: How many of this user's extractions may run at once
+
+    Returns:
+        Extracted lab data (may contain an "error" key)
+
+    Raises:
+        ExtractionQueueFull: If the extraction queue is full
+    """
+    # Download into memory (no temp files unless the photo is huge)
+    async with spooled_download(telegram_file, config.PHOTO_MEMORY_LIMIT_BYTES) as source:
+        content_key = await timed_to_thread("hash", content_hash, source)
+        cached = extraction_cache.get(content_key=content_key)
+        if cached is not None:
+            logger.info(f"📦 Extraction cache hit (exact) for user {telegram_id}")
+            return cached
+
+        with stage_timer("preprocess") as timer:
+            if config.PREPROCESS_IMAGES:
+                photo_image, prep_stats = await image_preprocessor.preprocess(source)
+                phash = prep_stats["phash"]
+                timer.span.set(bytes_in=prep_stats["bytes_in"], bytes_out=prep_stats["bytes_out"])
+            else:
+                # Full-size photo, decoded once
+                photo_image = await timed_to_thread("decode", decode_image, source)
+                phash = await timed_to_thread("hash", perceptual_hash, photo_image)
+
+    cached = extraction_cache.get(phash=phash, scope=telegram_id)
+    if cached is not None:
+        logger.info(f"📦 Extraction cache hit (perceptual) for user {telegram_id}")
+        extraction_cache.put(content_key, cached, phash=phash, scope=telegram_id)
+        return cached
+
+    # Extract lab data with Gemini Vision (bounded worker pool, per-user FIFO)
+    with stage_timer(
+        "extraction",
+        bytes=len(photo_image) if isinstance(photo_image, (bytes, bytearray)) else None
+    ):
+        lab_data = await extraction_pool.submit(
+            telegram_id, health_analyzer.extract_lab_data, photo_image, parallel=parallel
+        )
+    if "error" in lab_data:
+        count_error("extraction")
+    extraction_cache.put(content_key, lab_data, phash=phash, scope=telegram_id)
+
+    pool_stats = extraction_pool.stats()
+    cache_stats = extraction_cache.stats()
+    logger.info(
+        f"🔬 Extraction done (queue depth {pool_stats['queue_depth']}, "
+        f"avg wait {pool_stats['avg_wait_seconds']:.2f}s, "
+        f"max wait {pool_stats['max_wait_seconds']:.2f}s, "
+        f"cache hit rate {cache_stats['hit_rate']:.0%})"
+    )
+    return lab_data
+
+
+def merge_page_results(results: list) -> dict:
+    """Merge per-page extraction results (from gather) into one lab_data.
+
+    Args:
+        results: lab_data or exception for each page, in page order
+
+    Returns:
+        Merged lab data (may contain an "error" key)
+
+    Raises:
+        ExtractionQueueFull: If any page was rejected by the extraction queue
+    """
+    pages = []
+    for i, result in enumerate(results):
+        if isinstance(result, ExtractionQueueFull):
+            raise result
+        if isinstance(result, Exception):
+            logger.error(f"Error extracting page {i + 1}: {result}")
+            result = {"test_date": "Unknown", "tests": [], "error": str(result)}
+        pages.append(result)
+    
+    lab_data = merge_lab_pages(pages)
+    logger.info(
+        f"📚 Merged {len(pages)} pages into {len(lab_data.get('tests', []))} tests"
+    )
+    return lab_data
+
+
+async def extract_report_pages(page_photos: list, telegram_id: int) -> dict:
+    """Extract every page of a lab report in parallel and merge the results.
+
+    Args:
+        page_photos: update.message.photo for each page, in page order
+        telegram_id: User's Telegram ID
+
+    Returns:
+        Merged lab data (may contain an "error" key)
+
+    Raises:
+        ExtractionQueueFull: If the extraction queue is full
+    """
+    if len(page_photos) == 1:
+        return await extract_photo_lab_data(page_photos[0], telegram_id)
+    
+    # A few pages download and extract at once; the extraction pool still
+    # takes this user's turns in line with everyone else's
+    concurrency = max(1, config.PAGE_EXTRACTION_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def extract_page(photos) -> dict:
+        async with semaphore:
+            return await extract_photo_lab_data(photos, telegram_id, parallel=concurrency)
+    
+    results = await asyncio.gather(
+        *(extract_page(photos) for photos in page_photos), return_exceptions=True
+    )
+    return merge_page_results(results)
+
+
+async def extract_pdf_lab_data(pdf: PdfDocument, telegram_id: int) -> dict:
+    """Extract lab data from every page of a PDF.
+
+    PDFs with a text layer are read as text (no vision call at all).
+    Scanned PDFs are rasterized page by page; at most
+    DOCUMENT_PAGE_CONCURRENCY pages are rendered or being extracted at
+    once, which keeps memory bounded for long documents.
+
+    Args:
+        pdf: Opened PDF document
+        telegram_id: User's Telegram ID
+
+    Returns:
+        Merged lab data (may contain an "error" key)
+
+    Raises:
+        ExtractionQueueFull: If the extraction queue is full
+    """
+    concurrency = max(1, config.DOCUMENT_PAGE_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    text_chunks = await timed_to_thread(
+        "pdf_text", pdf.text_chunks, config.PDF_MIN_TEXT_CHARS, config.PDF_TEXT_CHUNK_CHARS
+    )
+    if text_chunks:
+        logger.info(
+            f"📄 PDF has a text layer ({pdf.page_count} pages, {len(text_chunks)} chunks), skipping vision"
+        )
+        
+        async def extract_chunk(chunk: str) -> dict:
+            async with semaphore:
+                return await timed_to_thread("extraction_text", health_analyzer.extract_lab_data_from_text, chunk)
+        
+        results = await asyncio.gather(
+            *(extract_chunk(chunk) for chunk in text_chunks), return_exceptions=True
+        )
+        lab_data = merge_page_results(results)
+        # Chunks are groups of pages, so failures are counted as sections
+        failed_chunks = lab_data.pop("unreadable_pages", 0)
+        if failed_chunks:
+            lab_data["unreadable_sections"] = failed_chunks
+        return _with_page_counts(lab_data, pdf)
+    
+    logger.info(f"📄 Scanned PDF ({pdf.page_count} pages), extracting pages with vision")
+    
+    async def extract_page(index: int) -> dict:
+        async with semaphore:
+            # Rendered lazily, released as soon as this page is extracted
+            page_image = await timed_to_thread("pdf_render", pdf.render_page, index, config.PDF_RENDER_DPI)
+            with stage_timer("extraction", page=index + 1, bytes=len(page_image)):
+                return await extraction_pool.submit(
+                    telegram_id, health_analyzer.extract_lab_data, page_image, parallel=concurrency
+                )
+    
+    results = await asyncio.gather(
+        *(extract_page(index) for index in range(pdf.page_count)), return_exceptions=True
+    )
+    return _with_page_counts(merge_page_results(results), pdf)
+
+
+def _with_page_counts(lab_data: dict, pdf: PdfDocument) -> dict:
+    """Record how many PDF pages were read, and how many were over the limit."""
+    lab_data["pages"] = pdf.page_count
+    if pdf.total_pages > pdf.page_count:
+        lab_data["skipped_pages"] = pdf.total_pages - pdf.page_count
+    return lab_data
+
+
+async def extract_document_lab_data(document, telegram_id: int) -> dict:
+    """Download a lab report document (PDF or image file) and extract it.
+
+    Args:
+        document: update.message.document
+        telegram_id: User's Telegram ID
+
+    Returns:
+        Extracted lab data (may contain an "error" key)
+
+    Raises:
+        ExtractionQueueFull: If the extraction queue is full
+    """
+    telegram_file = await document.get_file()
+    if document.mime_type != PDF_MIME_TYPE:
+        # Uncompressed image: preprocessing downsizes it like a photo
+        return await extract_image_lab_data(telegram_file, telegram_id)
+    
+    # Small PDFs stay in memory, large ones are spooled to a temp file
+    async with spooled_download(telegram_file, config.PHOTO_MEMORY_LIMIT_BYTES, suffix=".pdf") as source:
+        content_key = await timed_to_thread("hash", content_hash, source)
+        cached = extraction_cache.get(content_key=content_key)
+        if cached is not None:
+            logger.info(f"📦 Extraction cache hit (exact PDF) for user {telegram_id}")
+            return cached
+        
+        pdf = await timed_to_thread("pdf_open", PdfDocument, source, config.DOCUMENT_MAX_PAGES)
+        try:
+            lab_data = await extract_pdf_lab_data(pdf, telegram_id)
+        finally:
+            await timed_to_thread("pdf_close", pdf.close)
+    
+    # Partial reads are not cached, so a resend retries the failed pages
+    if not (lab_data.get("unreadable_pages") or lab_data.get("unreadable_sections")):
+        extraction_cache.put(content_key, lab_data, scope=telegram_id)
+    return lab_data
+
+
 async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle photo uploads (lab reports) with PARALLEL processing."""
+    """Handle photo uploads (lab reports).
+    
+    Album pages are collected by the media group aggregator and processed
+    together as one report once the album is complete.
+    """
+    if update.message.media_group_id:
+        media_groups.add(update.message.media_group_id, update)
+        return
+    
+    await process_lab_report(
+        update, lambda: extract_photo_lab_data(update.message.photo, update.effective_user.id)
+    )
+
+
+async def process_album(updates: list[Update]) -> None:
+    """Process a photo album as one multi-page lab report.
+    
+    Args:
+        updates: One update per page (replies go to the first page)
+    """
+    updates = sorted(updates, key=lambda u: u.message.message_id)
+    telegram_id = updates[0].effective_user.id
+    # Albums are flushed from a timer, outside any update's trace
+    with trace(
+        "album",
+        update_ids=[u.update_id for u in updates],
+        pages=len(updates),
+        user=hash_user(telegram_id)
+    ):
+        # One entry in the user's update queue, like any other report
+        await update_processor.run_for_user(
+            telegram_id,
+            process_lab_report(
+                updates[0],
+                lambda: extract_report_pages([u.message.photo for u in updates], telegram_id),
+                page_count=len(updates)
+            )
+        )
+
+
+async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle lab reports sent as files (PDFs or uncompressed images)."""
+    document = update.message.document
+    
+    if document.file_size and document.file_size > config.DOCUMENT_MAX_BYTES:
+        await update.message.reply_text(
+            f"Aiyo! This file too big for aunty lah "
+            f"(max {config.DOCUMENT_MAX_BYTES // (1024 * 1024)} MB).\n\n"
+            "Can send me photos of the pages instead?"
+        )
+        return
+    
+    if document.mime_type == PDF_MIME_TYPE and not pdf_available():
+        logger.error("pymupdf not installed. Install with: pip install pymupdf")
+        await update.message.reply_text(
+            "Sorry ah, aunty cannot open PDF right now.\n\n"
+            "Send me photos of the pages instead, okay?"
+        )
+        return
+    
+    await process_lab_report(
+        update, lambda: extract_document_lab_data(document, update.effective_user.id)
+    )
+
+
+async def process_lab_report(
+    update: Update,
+    extract_lab_data: Callable[[], Awaitable[dict]],
+    page_count: int = 1
+) -> None:
+    """Process one lab report with PARALLEL processing.
+    
+    Args:
+        update: The message to reply to
+        extract_lab_data: Coroutine function that downloads and extracts the report
+        page_count: Number of pages uploaded (for the acknowledgment)
+    """
     user = update.effective_user
     telegram_id = user.id
     
     # Send immediate acknowledgment
     processing_msg = await update.message.reply_text(
         "Wah! Got your lab report lah! Let me check check..."
+        if page_count == 1 else
+        f"Wah! Got your {page_count}-page lab report lah! Let me check check..."
     )
     
     try:
-        # Download the photo
-        photo_file = await update.message.photo[-1].get_file()
-        photo_path = f"temp_{telegram_id}.jpg"
-        await photo_file.download_to_drive(photo_path)
-        
-        # Extract lab data with Gemini Vision
+        # Download, preprocess and extract (cached uploads skip Gemini)
         await processing_msg.edit_text(
             "Reading your lab report..."
         )
-        lab_data = health_analyzer.extract_lab_data(photo_path)
+        try:
+            lab_data = await extract_lab_data()
+        except ExtractionQueueFull:
+            count_fallback("extraction_queue_full")
+            await processing_msg.edit_text(
+                "Aiyo! So many reports coming in now, aunty cannot keep up!\n\n"
+                "Send me your photo again in a few minutes, okay?"
+            )
+            return
         
         # Check for extraction errors
         if "error" in lab_data:
             await processing_msg.edit_text(
                 f"❌ Aiyo! {lab_data['error']}\n\nCan you send a clearer photo? Make sure all text is visible!"
             )
-            # Clean up
-            if os.path.exists(photo_path):
-                os.remove(photo_path)
             return
         
+        # Page counts are for this reply only, not part of the saved report
+        lab_data, page_info = split_report_metadata(lab_data)
+        if page_info.get("unreadable_pages"):
+            await update.message.reply_text(
+                f"Aiyo, {page_info['unreadable_pages']} of {page_info['pages']} pages too blur for aunty. "
+                "I check the rest first - send those pages again later, okay?"
+            )
+        if page_info.get("unreadable_sections"):
+            await update.message.reply_text(
+                f"Aiyo, aunty couldn't read part of your {page_info['pages']}-page PDF. "
+                "I check the rest first - try sending the file again later, okay?"
+            )
+        if page_info.get("skipped_pages"):
+            await update.message.reply_text(
+                f"Wah, your PDF got {page_info['pages'] + page_info['skipped_pages']} pages! "
+                f"Aunty only read the first {page_info['pages']} lah - "
+                "send the other pages as a separate file, okay?"
+            )
+        
+        # Everything the pipeline needs travels in one request context,
+        # so each lookup hits the database at most once per upload
+        request_ctx = PhotoRequestContext(
+            database, telegram_id, user.first_name or "friend", lab_data
+        )
+        request_ctx.prefetch_caregiver()
+        
         # Save lab data to database FIRST (so video generation can access it)
-        # We'll update with full analysis later
-        await asyncio.to_thread(
-            database.save_health_report, telegram_id, lab_data, "Processing...", 0.0
+        # The same row is updated in place with the full analysis later
+        report_id = await timed_to_thread(
+            "db_write", database.create_health_report, telegram_id, lab_data
         )
+        request_ctx.report_id = report_id
         
         await processing_msg.edit_text(
             "Analyzing now..."
         )
         
-        # Clean up temp file early
-        if os.path.exists(photo_path):
-            os.remove(photo_path)
-        
         # Define parallel tasks
         async def generate_text_analysis():
             """Task 1: Generate and send text analysis."""
             # Run synchronous operations in thread pool to avoid blocking
-            health_history = await asyncio.to_thread(
-                memory_manager.get_health_history, str(telegram_id)
+            health_history = await timed_to_thread(
+                "history_fetch", memory_manager.get_health_history, str(telegram_id)
             )
             
-            # Generate analysis with Groq (ultra-fast!)
-            analysis, response_time = await asyncio.to_thread(
-                health_analyzer.analyze_with_aunty,
-                lab_data, 
-                health_history
-            )
+            if config.STREAM_RESPONSES:
+                # Stream the analysis so the user sees it while Groq writes it
+                start_time = time.monotonic()
+                with stage_timer("analysis"):
+                    analysis = await stream_to_message(
+                        ProgressiveMessage(update.message, min_interval=config.STREAM_EDIT_INTERVAL),
+                        health_analyzer.stream_analysis,
+                        lab_data,
+                        health_history
+                    )
+                response_time = time.monotonic() - start_time
+            else:
+                # Generate analysis with Groq (ultra-fast!)
+                analysis, response_time = await timed_to_thread(
+                    "analysis", health_analyzer.analyze_with_aunty,
+                    lab_data, 
+                    health_history
+                )
             
-            # Update database with full analysis
-            await asyncio.to_thread(
-                database.save_health_report, telegram_id, lab_data, analysis, response_time
-            )
+            # Fill in the analysis on the row we already created
+            if report_id is not None:
+                await timed_to_thread(
+                    "db_write", database.update_health_report,
+                    report_id, analysis, response_time, telegram_id, lab_data
+                )
+            else:
+                count_fallback("report_insert_after_analysis")
+                await timed_to_thread(
+                    "db_write", database.save_health_report, telegram_id, lab_data, analysis, response_time
+                )
             
-            # Save to Mem0
-            await asyncio.to_thread(
-                memory_manager.add_health_record, str(telegram_id), lab_data, analysis
-            )
+            # Save to Mem0 (and count it on the profile for /stats)
+            if await timed_to_thread(
+                "mem0_write", memory_manager.add_health_record, str(telegram_id), lab_data, analysis
+            ):
+                await timed_to_thread("db_write", database.record_memory_in_profile, telegram_id)
             
-            # Send analysis with timing info
-            response_message = f"""
+            # Send analysis with timing info (already delivered when streamed)
+            if not config.STREAM_RESPONSES:
+                response_message = f"""
 {analysis}
             """
-            
-            await update.message.reply_text(response_message, parse_mode="Markdown")
+                
+                await update.message.reply_text(response_message, parse_mode="Markdown")
             logger.info(f"✅ Text analysis sent in {response_time:.2f}s")
             
             return response_time
@@ -354,12 +793,12 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         
         async def generate_videos_and_caregiver_audio():
             """Generate patient videos + caregiver audio (when videos enabled)."""
-            await auto_generate_video(update, telegram_id, user.first_name or "friend")
+            await auto_generate_video(update, request_ctx)
         
         async def send_caregiver_audio_only():
             """Send audio to caregiver only (when videos disabled)."""
             # Check if caregiver exists
-            caregiver_info = await asyncio.to_thread(database.get_caregiver, telegram_id)
+            caregiver_info = await request_ctx.get_caregiver()
             
             if not caregiver_info:
                 logger.info("No caregiver configured, skipping audio generation")
@@ -369,45 +808,38 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             
             try:
                 # Get health summary
-                health_summary = await asyncio.to_thread(
-                    database.get_health_summary, telegram_id
-                )
+                health_summary = await request_ctx.get_health_summary()
                 
                 if "No health reports" in health_summary:
                     logger.warning("No health reports found for caregiver audio")
                     return
                 
                 # Generate caregiver script
-                caregiver_script_chunks = await asyncio.to_thread(
-                    health_analyzer.generate_caregiver_video_script, health_summary, user.first_name or "friend"
+                caregiver_script_chunks = await timed_to_thread(
+                    "script", health_analyzer.generate_caregiver_video_script, health_summary, user.first_name or "friend"
                 )
                 
                 # Combine script chunks
                 full_caregiver_script = " ".join(caregiver_script_chunks)
                 
                 # Generate audio
-                caregiver_audio_path = await asyncio.to_thread(
-                    video_generator.generate_audio_summary, full_caregiver_script
+                caregiver_audio_path = await timed_to_thread(
+                    "tts", video_generator.generate_audio_summary, full_caregiver_script
                 )
                 
                 if caregiver_audio_path:
-                    # Get the latest lab data from database
-                    latest_reports = await asyncio.to_thread(
-                        database.get_user_reports, telegram_id, limit=1
-                    )
-                    
-                    # Send formatted text report first
-                    if latest_reports and len(latest_reports) > 0:
-                        lab_data = latest_reports[0].get('lab_data', {})
+                    # Send formatted text report first (lab data from this upload)
+                    if request_ctx.lab_data:
                         formatted_report = format_health_report_for_caregiver(
-                            lab_data,
+                            request_ctx.lab_data,
                             user.first_name or 'Patient'
                         )
                         
                         await update.get_bot().send_message(
                             chat_id=caregiver_info['caregiver_telegram_id'],
                             text=formatted_report,
-                            parse_mode="Markdown"
+                            parse_mode="Markdown",
+                            rate_limit_args=BULK_PRIORITY
                         )
                         logger.info("✅ Sent formatted text report to caregiver")
                     
@@ -424,7 +856,8 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
                             caption="*🎤 Detailed Audio Explanation*\n\n"
                                     "Listen for specific guidance, what to monitor, and action steps.",
                             parse_mode="Markdown",
-                            filename=filename
+                            filename=filename,
+                            rate_limit_args=BULK_PRIORITY
                         )
                     logger.info(f"✅ Sent audio to caregiver {caregiver_info['caregiver_name']} as {filename}")
                     
@@ -441,6 +874,7 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
                     logger.error("❌ Failed to generate caregiver audio")
                     
             except Exception as e:
+                count_error("caregiver_delivery")
                 logger.error(f"❌ Error sending audio to caregiver: {e}")
                 logger.error(f"   Error type: {type(e).__name__}")
                 
@@ -464,23 +898,26 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         # Choose video/audio strategy based on toggle
         if ENABLE_VIDEOS:
             # VIDEOS ENABLED: Generate videos for patient + audio for caregiver
-            results = await asyncio.gather(
-                generate_text_analysis(),
-                generate_videos_and_caregiver_audio(),
-                return_exceptions=True
-            )
+            tasks = {
+                "text_analysis": generate_text_analysis(),
+                "videos_and_caregiver_audio": generate_videos_and_caregiver_audio(),
+            }
         else:
             # VIDEOS DISABLED: Text analysis + caregiver audio only
-            results = await asyncio.gather(
-                generate_text_analysis(),
-                send_caregiver_audio_only(),
-                return_exceptions=True
-            )
+            tasks = {
+                "text_analysis": generate_text_analysis(),
+                "caregiver_audio": send_caregiver_audio_only(),
+            }
+        results = await asyncio.gather(
+            *(traced(name, task) for name, task in tasks.items()),
+            return_exceptions=True
+        )
         
         # Check for errors
-        for i, result in enumerate(results):
+        for name, result in zip(tasks, results):
             if isinstance(result, Exception):
-                logger.error(f"Task {i+1} error: {result}")
+                count_error("pipeline_task")
+                logger.error(f"Task {name} error: {type(result).__name__}: {result}")
         
         # Delete processing message
         await processing_msg.delete()
@@ -488,20 +925,105 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         logger.info("✅ Parallel processing complete!")
             
     except Exception as e:
+        count_error("photo_pipeline")
         logger.error(f"Error processing photo: {e}")
         await processing_msg.edit_text(
             f"❌ Aiyo! Something went wrong lah!\n\nError: {str(e)}\n\nTry again later or contact support."
         )
-        
-        # Clean up temp file
-        if os.path.exists(photo_path):
-            os.remove(photo_path)
 
 
-async def auto_generate_video(update: Update, telegram_id: int, user_name: str) -> None:
+async def generate_and_send_videos_in_order(update: Update, script_chunks: list[str]) -> list[str]:
+    """Generate video chunks concurrently and send them to the user in order.
+
+    Videos finish out of order, so results go through a ReorderBuffer and
+    the sender wakes only when the next part is ready.
+
+    Args:
+        update: Telegram update to reply to
+        script_chunks: Script text for each video part
+
+    Returns:
+        List of video URLs that were sent successfully
+    """
+    total = len(script_chunks)
+    buffer = ReorderBuffer(total)
+    sent_videos = []
+
+    # Create semaphore for batching (3 concurrent)
+    semaphore = asyncio.Semaphore(3)
+
+    async def generate_video_only(chunk: str, index: int):
+        """Generate video (no sending here)."""
+        async with semaphore:
+            try:
+                with stage_timer("video"):
+                    idx, chunk_text, video_url = await video_generator.generate_single_chunk_async(
+                        chunk, index, total
+                    )
+            except Exception as e:
+                logger.error(f"Error generating video {index + 1}: {e}")
+                idx, chunk_text, video_url = index, chunk, None
+            buffer.put(idx, (chunk_text, video_url))
+
+    async def send_videos_in_order():
+        """Send videos in order as they become available."""
+        async for idx, (chunk_text, video_url) in buffer:
+            if video_url:
+                caption = f"""
+*Part {idx + 1}/{total}*
+
+"{chunk_text}"
+                """
+
+                try:
+                    await update.message.reply_video(
+                        video=video_url,
+                        caption=caption,
+                        parse_mode="Markdown"
+                    )
+                    sent_videos.append(video_url)
+                    logger.info(f"✅ Sent video {idx + 1}/{total}")
+                except Exception as e:
+                    logger.error(f"Error sending video {idx + 1}: {e}")
+                    await update.message.reply_text(
+                        f"Video {idx + 1} couldn't be sent: {str(e)}"
+                    )
+            else:
+                await update.message.reply_text(
+                    f"Video {idx + 1} generation failed lah!"
+                )
+
+    generation_tasks = [
+        asyncio.create_task(generate_video_only(chunk, i))
+        for i, chunk in enumerate(script_chunks)
+    ]
+    sender_task = asyncio.create_task(send_videos_in_order())
+
+    try:
+        await asyncio.gather(*generation_tasks)
+        await sender_task
+    except BaseException:
+        # Cancelled or sender failed - stop generating, deliver nothing more
+        buffer.cancel()
+        for task in generation_tasks:
+            task.cancel()
+        sender_task.cancel()
+        logger.warning(
+            f"⚠️ Video delivery stopped early: sent {len(sent_videos)}/{total}, "
+            f"undelivered parts {[i + 1 for i in buffer.undelivered()]}"
+        )
+        raise
+
+    return sent_videos
+
+
+async def auto_generate_video(update: Update, request_ctx: PhotoRequestContext) -> None:
     """Automatically generate video after photo analysis - with Family Connect support."""
+    telegram_id = request_ctx.telegram_id
+    user_name = request_ctx.user_name
+    
     # Check if caregiver exists
-    caregiver_info = await asyncio.to_thread(database.get_caregiver, telegram_id)
+    caregiver_info = await request_ctx.get_caregiver()
     
     if caregiver_info:
         video_msg = await update.message.reply_text(
@@ -515,10 +1037,8 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
         )
     
     try:
-        # Get health summary from database (run in thread to not block)
-        health_summary = await asyncio.to_thread(
-            database.get_health_summary, telegram_id
-        )
+        # Get health summary (fetched once per upload via request context)
+        health_summary = await request_ctx.get_health_summary()
         
         if "No health reports" in health_summary:
             await video_msg.edit_text(
@@ -533,11 +1053,11 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
             )
             # Generate BOTH scripts
             patient_chunks, caregiver_chunks = await asyncio.gather(
-                asyncio.to_thread(
-                    health_analyzer.generate_patient_video_script, health_summary, user_name
+                timed_to_thread(
+                    "script", health_analyzer.generate_patient_video_script, health_summary, user_name
                 ),
-                asyncio.to_thread(
-                    health_analyzer.generate_caregiver_video_script, health_summary, user_name
+                timed_to_thread(
+                    "script", health_analyzer.generate_caregiver_video_script, health_summary, user_name
                 )
             )
             script_chunks = patient_chunks  # For patient videos
@@ -547,8 +1067,8 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
             await video_msg.edit_text(
                 "Writing your scripts now..."
             )
-            script_chunks = await asyncio.to_thread(
-                health_analyzer.generate_video_script_chunks, health_summary, user_name
+            script_chunks = await timed_to_thread(
+                "script", health_analyzer.generate_video_script_chunks, health_summary, user_name
             )
             caregiver_script_chunks = None
         
@@ -557,81 +1077,7 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
         )
         
         # Generate videos concurrently, send in order as ready
-        # Create semaphore for batching (3 concurrent)
-        semaphore = asyncio.Semaphore(3)
-        
-        # Dictionary to store completed videos
-        completed_videos = {}
-        next_to_send = 0
-        sent_videos = []
-        lock = asyncio.Lock()
-        
-        async def generate_video_only(chunk: str, index: int):
-            """Generate video (no sending here)."""
-            async with semaphore:
-                # Generate video
-                result = await video_generator.generate_single_chunk_async(
-                    chunk, index, len(script_chunks)
-                )
-                idx, chunk_text, video_url = result
-                
-                # Store result
-                async with lock:
-                    completed_videos[idx] = (chunk_text, video_url)
-                    
-                return (idx, chunk_text, video_url)
-        
-        async def send_videos_in_order():
-            """Send videos in order as they become available."""
-            nonlocal next_to_send
-            
-            while next_to_send < len(script_chunks):
-                # Wait for next video to be ready
-                while next_to_send not in completed_videos:
-                    await asyncio.sleep(0.1)
-                
-                # Get the video
-                chunk_text, video_url = completed_videos[next_to_send]
-                
-                if video_url:
-                    caption = f"""
-*Part {next_to_send + 1}/{len(script_chunks)}*
-
-"{chunk_text}"
-                    """
-                    
-                    try:
-                        await update.message.reply_video(
-                            video=video_url,
-                            caption=caption,
-                            parse_mode="Markdown"
-                        )
-                        sent_videos.append(video_url)
-                        logger.info(f"✅ Sent video {next_to_send + 1}/{len(script_chunks)}")
-                    except Exception as e:
-                        logger.error(f"Error sending video {next_to_send + 1}: {e}")
-                        await update.message.reply_text(
-                            f"Video {next_to_send + 1} couldn't be sent: {str(e)}"
-                        )
-                else:
-                    await update.message.reply_text(
-                        f"Video {next_to_send + 1} generation failed lah!"
-                    )
-                
-                next_to_send += 1
-        
-        # Create generation tasks
-        generation_tasks = [
-            generate_video_only(chunk, i)
-            for i, chunk in enumerate(script_chunks)
-        ]
-        
-        # Create sender task
-        sender_task = asyncio.create_task(send_videos_in_order())
-        
-        # Wait for both generation and sending to complete
-        await asyncio.gather(*generation_tasks)
-        await sender_task
+        sent_videos = await generate_and_send_videos_in_order(update, script_chunks)
         
         if len(sent_videos) == 0:
             # All videos failed - fall back to audio
@@ -646,8 +1092,8 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
             full_script = " ".join(script_chunks)
             
             # Generate audio for patient
-            patient_audio_path = await asyncio.to_thread(
-                video_generator.generate_audio_summary, full_script
+            patient_audio_path = await timed_to_thread(
+                "tts", video_generator.generate_audio_summary, full_script
             )
             
             if patient_audio_path:
@@ -675,29 +1121,24 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
                         logger.info(f"   Caregiver Telegram ID: {caregiver_info['caregiver_telegram_id']}")
                         
                         full_caregiver_script = " ".join(caregiver_script_chunks)
-                        caregiver_audio_path = await asyncio.to_thread(
-                            video_generator.generate_audio_summary, full_caregiver_script
+                        caregiver_audio_path = await timed_to_thread(
+                            "tts", video_generator.generate_audio_summary, full_caregiver_script
                         )
                         
                         if caregiver_audio_path:
                             try:
-                                # Get the latest lab data from database
-                                latest_reports = await asyncio.to_thread(
-                                    database.get_user_reports, telegram_id, limit=1
-                                )
-                                
-                                # Send formatted text report first
-                                if latest_reports and len(latest_reports) > 0:
-                                    lab_data = latest_reports[0].get('lab_data', {})
+                                # Send formatted text report first (lab data from this upload)
+                                if request_ctx.lab_data:
                                     formatted_report = format_health_report_for_caregiver(
-                                        lab_data,
+                                        request_ctx.lab_data,
                                         user_name
                                     )
                                     
                                     await update.get_bot().send_message(
                                         chat_id=caregiver_info['caregiver_telegram_id'],
                                         text=formatted_report,
-                                        parse_mode="Markdown"
+                                        parse_mode="Markdown",
+                                        rate_limit_args=BULK_PRIORITY
                                     )
                                     logger.info("✅ Sent formatted text report to caregiver")
                                 
@@ -715,7 +1156,8 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
                                         caption="*🎤 Detailed Audio Explanation*\n\n"
                                                 "Listen for specific guidance, what to monitor, and action steps.",
                                         parse_mode="Markdown",
-                                        filename=filename
+                                        filename=filename,
+                                        rate_limit_args=BULK_PRIORITY
                                     )
                                 logger.info(f"✅ Sent audio to caregiver {caregiver_info['caregiver_name']} as {filename}")
                                 
@@ -730,6 +1172,7 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
                                     os.remove(caregiver_audio_path)
                                     
                             except Exception as e:
+                                count_error("caregiver_delivery")
                                 logger.error(f"❌ Error sending audio to caregiver: {e}")
                                 logger.error(f"   Error type: {type(e).__name__}")
                                 logger.error(f"   Details: {str(e)}")
@@ -788,29 +1231,24 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
             
             # Generate audio from caregiver script chunks
             full_caregiver_script = " ".join(caregiver_script_chunks)
-            caregiver_audio_path = await asyncio.to_thread(
-                video_generator.generate_audio_summary, full_caregiver_script
+            caregiver_audio_path = await timed_to_thread(
+                "tts", video_generator.generate_audio_summary, full_caregiver_script
             )
             
             if caregiver_audio_path:
                 try:
-                    # Get the latest lab data from database
-                    latest_reports = await asyncio.to_thread(
-                        database.get_user_reports, telegram_id, limit=1
-                    )
-                    
-                    # Send formatted text report first
-                    if latest_reports and len(latest_reports) > 0:
-                        lab_data = latest_reports[0].get('lab_data', {})
+                    # Send formatted text report first (lab data from this upload)
+                    if request_ctx.lab_data:
                         formatted_report = format_health_report_for_caregiver(
-                            lab_data,
+                            request_ctx.lab_data,
                             user_name
                         )
                         
                         await update.get_bot().send_message(
                             chat_id=caregiver_info['caregiver_telegram_id'],
                             text=formatted_report,
-                            parse_mode="Markdown"
+                            parse_mode="Markdown",
+                            rate_limit_args=BULK_PRIORITY
                         )
                         logger.info(f"✅ Sent formatted text report to caregiver {caregiver_info['caregiver_name']}")
                     
@@ -827,7 +1265,8 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
                             caption="*🎤 Detailed Audio Explanation*\n\n"
                                     "Listen for specific guidance, what to monitor, and action steps.",
                             parse_mode="Markdown",
-                            filename=filename
+                            filename=filename,
+                            rate_limit_args=BULK_PRIORITY
                         )
                     logger.info(f"✅ Sent audio to caregiver {caregiver_info['caregiver_name']} as {filename}")
                     
@@ -870,8 +1309,8 @@ async def auto_generate_video(update: Update, telegram_id: int, user_name: str)
         # Save to database (save all chunks) - run in thread
         full_script = " | ".join(script_chunks)
         video_urls_str = " | ".join(sent_videos)
-        await asyncio.to_thread(
-            database.save_video_summary, telegram_id, full_script, video_urls_str
+        await timed_to_thread(
+            "db_write", database.save_video_summary, telegram_id, full_script, video_urls_str
         )
         
         # Delete processing message
@@ -911,7 +1350,7 @@ async def create_video(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     
     try:
         # Get health summary from database
-        health_summary = database.get_health_summary(telegram_id)
+        health_summary = await timed_to_thread("db_read", database.get_health_summary, telegram_id)
         
         if "No health reports" in health_summary:
             await processing_msg.edit_text(
@@ -923,88 +1362,16 @@ async def create_video(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         await processing_msg.edit_text(
             "Writing your scripts now..."
         )
-        script_chunks = health_analyzer.generate_video_script_chunks(health_summary, user_name)
+        script_chunks = await timed_to_thread(
+            "script", health_analyzer.generate_video_script_chunks, health_summary, user_name
+        )
         
         await processing_msg.edit_text(
             f"Creating {len(script_chunks)} videos for you now! They'll come one by one..."
         )
         
         # Generate videos concurrently, send in order as ready
-        # Create semaphore for batching (3 concurrent)
-        semaphore = asyncio.Semaphore(3)
-        
-        # Dictionary to store completed videos
-        completed_videos = {}
-        next_to_send = 0
-        sent_videos = []
-        lock = asyncio.Lock()
-        
-        async def generate_video_only(chunk: str, index: int):
-            """Generate video (no sending here)."""
-            async with semaphore:
-                # Generate video
-                result = await video_generator.generate_single_chunk_async(
-                    chunk, index, len(script_chunks)
-                )
-                idx, chunk_text, video_url = result
-                
-                # Store result
-                async with lock:
-                    completed_videos[idx] = (chunk_text, video_url)
-                    
-                return (idx, chunk_text, video_url)
-        
-        async def send_videos_in_order():
-            """Send videos in order as they become available."""
-            nonlocal next_to_send
-            
-            while next_to_send < len(script_chunks):
-                # Wait for next video to be ready
-                while next_to_send not in completed_videos:
-                    await asyncio.sleep(0.1)
-                
-                # Get the video
-                chunk_text, video_url = completed_videos[next_to_send]
-                
-                if video_url:
-                    caption = f"""
-*Part {next_to_send + 1}/{len(script_chunks)}*
-
-"{chunk_text}"
-                    """
-                    
-                    try:
-                        await update.message.reply_video(
-                            video=video_url,
-                            caption=caption,
-                            parse_mode="Markdown"
-                        )
-                        sent_videos.append(video_url)
-                        logger.info(f"✅ Sent video {next_to_send + 1}/{len(script_chunks)}")
-                    except Exception as e:
-                        logger.error(f"Error sending video {next_to_send + 1}: {e}")
-                        await update.message.reply_text(
-                            f"Video {next_to_send + 1} couldn't be sent: {str(e)}"
-                        )
-                else:
-                    await update.message.reply_text(
-                        f"Video {next_to_send + 1} generation failed lah!"
-                    )
-                
-                next_to_send += 1
-        
-        # Create generation tasks
-        generation_tasks = [
-            generate_video_only(chunk, i)
-            for i, chunk in enumerate(script_chunks)
-        ]
-        
-        # Create sender task
-        sender_task = asyncio.create_task(send_videos_in_order())
-        
-        # Wait for both generation and sending to complete
-        await asyncio.gather(*generation_tasks)
-        await sender_task
+        sent_videos = await generate_and_send_videos_in_order(update, script_chunks)
         
         if len(sent_videos) == 0:
             # All videos failed - fall back to audio
@@ -1019,8 +1386,8 @@ async def create_video(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             full_script = " ".join(script_chunks)
             
             # Generate audio
-            audio_path = await asyncio.to_thread(
-                video_generator.generate_audio_summary, full_script
+            audio_path = await timed_to_thread(
+                "tts", video_generator.generate_audio_summary, full_script
             )
             
             if audio_path:
@@ -1068,7 +1435,9 @@ async def create_video(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         # Save to database (save all chunks)
         full_script = " | ".join(script_chunks)
         video_urls_str = " | ".join(sent_videos)
-        database.save_video_summary(telegram_id, full_script, video_urls_str)
+        await timed_to_thread(
+            "db_write", database.save_video_summary, telegram_id, full_script, video_urls_str
+        )
         
         # Delete processing message
         await processing_msg.delete()
@@ -1080,12 +1449,78 @@ async def create_video(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         )
 
 
+async def get_or_build_profile(telegram_id: int):
+    """Get the user's health profile, building it for users from before profiles.
+    
+    Args:
+        telegram_id: User's Telegram ID
+        
+    Returns:
+        Profile dict, or None if the user has no reports
+    """
+    profile = await timed_to_thread("db_read", database.get_health_profile, telegram_id)
+    if profile:
+        return profile
+    
+    # One-off backfill from the reports table (and Mem0 for the memory count)
+    memories = await timed_to_thread("mem0_read", memory_manager.get_all_memories, str(telegram_id))
+    return await timed_to_thread(
+        "db_read", database.rebuild_health_profile, telegram_id, len(memories)
+    )
+
+
+def format_history_page(reports: list) -> str:
+    """Format one page of /history.
+    
+    Args:
+        reports: Report rows from get_report_page (newest first)
+        
+    Returns:
+        Markdown text for the page
+    """
+    history_text = "*Your Health Report History*\n\n"
+    
+    for report in reports:
+        uploaded = (report.get("created_at") or "")[:10]
+        history_text += f"*Report from {report.get('test_date') or 'Unknown'}*"
+        history_text += f" _(sent {uploaded})_\n" if uploaded else "\n"
+        history_text += f"   • {report.get('test_count') or 0} tests analyzed\n"
+        if report.get("abnormal_count"):
+            history_text += f"   • {report['abnormal_count']} values outside normal range\n"
+        history_text += "\n"
+    
+    history_text += "\nUse /video to create a summary video!"
+    return history_text
+
+
+def history_keyboard(reports: list, has_older: bool, has_newer: bool):
+    """Inline "older/newer" buttons carrying keyset cursors.
+    
+    Callback data is "history:<direction>:<created_at>:<id>" - the cursor
+    is the last (older) or first (newer) report on the current page.
+    """
+    buttons = []
+    if has_newer:
+        first = reports[0]
+        buttons.append(InlineKeyboardButton(
+            "⬅️ Newer", callback_data=f"history:newer:{first['created_at']}:{first['id']}"
+        ))
+    if has_older:
+        last = reports[-1]
+        buttons.append(InlineKeyboardButton(
+            "Older ➡️", callback_data=f"history:older:{last['created_at']}:{last['id']}"
+        ))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
 async def history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Show user's health report history."""
+    """Show user's health report history (newest page first)."""
     user = update.effective_user
     telegram_id = user.id
     
-    reports = database.get_user_reports(telegram_id, limit=5)
+    reports, has_older = await timed_to_thread(
+        "db_read", database.get_report_page, telegram_id, config.HISTORY_PAGE_SIZE
+    )
     
     if not reports:
         await update.message.reply_text(
@@ -1093,57 +1528,68 @@ async def history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         )
         return
     
-    history_text = "*Your Health Report History*\n\n"
+    await update.message.reply_text(
+        format_history_page(reports),
+        parse_mode="Markdown",
+        reply_markup=history_keyboard(reports, has_older, has_newer=False)
+    )
+
+
+async def history_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle the /history "older/newer" buttons."""
+    query = update.callback_query
     
-    for i, report in enumerate(reports, 1):
-        lab_data = report.get("lab_data", {})
-        test_date = lab_data.get("test_date", "Unknown")
-        
-        history_text += f"*{i}. Report from {test_date}*\n"
-        
-        # Show key tests
-        tests = lab_data.get("tests", [])
-        abnormal_count = sum(1 for t in tests if t.get("status") != "normal")
-        
-        history_text += f"   • {len(tests)} tests analyzed\n"
-        if abnormal_count > 0:
-            history_text += f"   • {abnormal_count} values outside normal range\n"
-        history_text += "\n"
+    # created_at contains ":" so split from both ends
+    _, direction, rest = query.data.split(":", 2)
+    created_at, report_id = rest.rsplit(":", 1)
+    cursor = (created_at, int(report_id))
     
-    history_text += "\nUse /video to create a summary video!"
+    # Always the pressing user's own reports - the cursor is only a position
+    telegram_id = query.from_user.id
+    if direction == "older":
+        reports, has_older = await timed_to_thread(
+            "db_read", database.get_report_page, telegram_id, config.HISTORY_PAGE_SIZE, cursor, None
+        )
+        has_newer = True
+    else:
+        reports, has_newer = await timed_to_thread(
+            "db_read", database.get_report_page, telegram_id, config.HISTORY_PAGE_SIZE, None, cursor
+        )
+        has_older = True
+    
+    if not reports:
+        await query.answer("No more reports lah!")
+        return
     
-    await update.message.reply_text(history_text, parse_mode="Markdown")
+    await query.answer()
+    await query.edit_message_text(
+        format_history_page(reports),
+        parse_mode="Markdown",
+        reply_markup=history_keyboard(reports, has_older, has_newer)
+    )
 
 
 async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Show user statistics."""
+    """Show user statistics (from the single-row health profile)."""
     user = update.effective_user
     telegram_id = user.id
     
-    reports = database.get_user_reports(telegram_id)
-    memories = memory_manager.get_all_memories(str(telegram_id))
+    profile = await get_or_build_profile(telegram_id)
     
-    if not reports:
+    if not profile or not profile.get("report_count"):
         await update.message.reply_text(
             "No statistics yet lah! Upload some lab reports first!"
         )
         return
     
-    total_tests = sum(
-        len(r.get("lab_data", {}).get("tests", [])) 
-        for r in reports
-    )
-    
-    avg_response_time = sum(
-        r.get("response_time", 0) for r in reports
-    ) / len(reports) if reports else 0
-    
     stats_text = f"""
 *Your Health Tracking Stats*
 
-Total reports: {len(reports)}
-Total tests analyzed: {total_tests}
-Memories stored: {len(memories)}
+Total reports: {profile['report_count']}
+Total tests analyzed: {profile['test_count']}
+Values outside normal range: {profile['abnormal_count']}
+Average analysis time: {profile.get('avg_response_time') or 0:.1f}s
+Memories stored: {profile.get('memory_count', 0)}
 
 You're doing great keeping track! Keep it up!
     """
@@ -1156,73 +1602,299 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user = update.effective_user
     telegram_id = user.id
     user_message = update.message.text
-    
-    # Get context from memory
-    health_history = memory_manager.get_health_history(str(telegram_id), limit=2)
-    
-    # Chat with Dr. Aunty using Groq
-    response, response_time = health_analyzer.chat_with_aunty(
-        user_message,
-        health_history
+
+    # Get context from memory (run in thread so other users aren't blocked)
+    health_history = await timed_to_thread(
+        "history_fetch", memory_manager.get_health_history, str(telegram_id), 2
     )
+
+    if config.STREAM_RESPONSES:
+        # Stream the reply into a message that grows as Groq generates it
+        with stage_timer("chat"):
+            response = await stream_to_message(
+                ProgressiveMessage(update.message, min_interval=config.STREAM_EDIT_INTERVAL),
+                health_analyzer.stream_chat,
+                user_message,
+                health_history
+            )
+    else:
+        # Chat with Dr. Aunty using Groq
+        response, response_time = await timed_to_thread(
+            "chat", health_analyzer.chat_with_aunty,
+            user_message,
+            health_history
+        )
+
+        # Send response
+        await update.message.reply_text(
+            response,
+            parse_mode="Markdown"
+        )
+        logger.info(f"✅ Chat reply sent in {response_time:.2f}s")
+
+    # Save conversation to memory AFTER replying - user doesn't wait for Mem0
+    async def save_conversation():
+        if await timed_to_thread(
+            "mem0_write", memory_manager.add_conversation, str(telegram_id), user_message, response
+        ):
+            await timed_to_thread("db_write", database.record_memory_in_profile, telegram_id)
     
-    # Save conversation to memory
-    memory_manager.add_conversation(str(telegram_id), user_message, response)
-    
-    # Send response
-    await update.message.reply_text(
-        response,
-        parse_mode="Markdown"
-    )
+    lifecycle.track(save_conversation(), name=f"chat memory write (user {telegram_id})")
 
 
 def main() -> None:
     """Start the bot."""
-    # Create the Application with SSL verification disabled (for local development)
-    from telegram.request import HTTPXRequest
-    
-    # Create custom request with SSL verification disabled
-    request = HTTPXRequest(
-        connection_pool_size=8,
-        connect_timeout=5.0,
-        read_timeout=5.0,
-        write_timeout=5.0,
-        pool_timeout=1.0,
+    config.validate()
+    
+    # Span trees per update, written to a rotating JSONL file
+    configure_tracing(
+        config.TRACE_FILE,
+        max_bytes=config.TRACE_MAX_BYTES,
+        backup_count=config.TRACE_BACKUP_COUNT,
+        user_salt=config.TRACE_USER_SALT
     )
     
-    # Disable SSL verification
-    import httpx
-    custom_client = httpx.AsyncClient(verify=False)
-    request._client = custom_client
+    # Pooled Telegram connections (size, keepalive, HTTP/2, timeouts from config)
+    request = build_telegram_request("telegram")
     
-    application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).request(request).build()
+    # Long-polling holds its connection open, so it gets its own small pool
+    get_updates_request = build_telegram_request(
+        "telegram_updates", pool_size=1, read_timeout=config.TELEGRAM_TIMEOUT + 30
+    )
+    
+    # Handle different users concurrently so one slow upload doesn't hold up
+    # everyone else; updates from the same user still run in order
+    rate_limiter = TelegramRateLimiter(
+        global_rate=config.TELEGRAM_GLOBAL_RATE,
+        chat_rate=config.TELEGRAM_CHAT_RATE,
+        chat_burst=config.TELEGRAM_CHAT_BURST,
+        bulk_share=config.TELEGRAM_BULK_SHARE,
+    )
+    register_gauges("telegram_rate_limiter", rate_limiter.stats)
     
-    # Register handlers
+    application = Application.builder()\
+        .token(config.TELEGRAM_BOT_TOKEN)\
+        .request(request)\
+        .get_updates_request(get_updates_request)\
+        .concurrent_updates(update_processor)\
+        .rate_limiter(rate_limiter)\
+        .post_init(on_startup)\
+        .post_shutdown(release_resources)\
+        .build()
+    
+    register_handlers(application)
+    
+    # Start the Bot
+    print("🚀 Dr. Aunty is starting...")
+    print("✅ Groq: Lightning-fast LLM")
+    print("✅ Gemini: Vision AI for lab reports")
+    print("✅ Mem0: Health memory system")
+    print("✅ fal.ai: Talking avatar videos (primary)")
+    print("✅ OpenAI Sora 2: Video fallback (secondary)")
+    print("✅ ElevenLabs: Audio fallback (final, always works!)")
+    print("✅ Supabase: Database storage")
+    print(f"✅ Processing up to {config.CONCURRENT_UPDATES} updates concurrently (in order per user)")
+    
+    # Signals are handled by install_shutdown_handlers so in-flight work can drain
+    if config.BOT_MODE == "webhook":
+        run_webhook(application)
+    else:
+        application.run_polling(allowed_updates=Update.ALL_TYPES, stop_signals=None)
+
+
+def register_handlers(application: Application) -> None:
+    """Register every command and message handler on the application."""
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("setcaregiver", setcaregiver))
     application.add_handler(CommandHandler("video", create_video))
     application.add_handler(CommandHandler("history", history))
+    application.add_handler(CallbackQueryHandler(history_page, pattern=r"^history:"))
     application.add_handler(CommandHandler("stats", stats))
     
     # Photo handler for lab reports
     application.add_handler(MessageHandler(filters.PHOTO, handle_photo))
     
+    # Document handler for PDF and uncompressed image lab reports
+    application.add_handler(MessageHandler(
+        filters.Document.PDF | filters.Document.IMAGE, handle_document
+    ))
+    
     # Text message handler for chatting
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+
+
+async def on_startup(application: Application) -> None:
+    """Install shutdown handlers, start the metrics endpoint and warm up providers.
     
-    # Start the Bot
-    print("🚀 Dr. Aunty is starting...")
-    print("✅ Groq: Lightning-fast LLM")
-    print("✅ Gemini: Vision AI for lab reports")
-    print("✅ Mem0: Health memory system")
-    print("✅ fal.ai: Talking avatar videos (primary)")
-    print("✅ OpenAI Sora 2: Video fallback (secondary)")
-    print("✅ ElevenLabs: Audio fallback (final, always works!)")
-    print("✅ Supabase: Database storage")
+    Updates are only fetched once this returns, so with warm-up enabled the
+    bot starts serving when critical providers answer (or the timeout passes).
+    """
+    global metrics_server, warmer
+    await install_shutdown_handlers(application)
+    
+    if config.METRICS_PORT:
+        try:
+            metrics_server = await start_metrics_server(config.METRICS_HOST, config.METRICS_PORT)
+        except OSError as e:
+            logger.error(f"❌ Could not start metrics endpoint on port {config.METRICS_PORT}: {e}")
+    
+    if not config.WARMUP_ENABLED:
+        announce_ready()
+        return
+    
+    warmer = build_warmer(application)
+    register_gauges("provider", warmer.stats, label="provider")
+    register_gauges("warmup", lambda: {"ready": warmer.ready, "seconds": warmer.warmup_seconds})
+    await warmer.warm_up(config.WARMUP_READY_TIMEOUT)
+    warmer.start_keepalive(on_ready=announce_ready)
+
+
+def build_warmer(application: Application) -> ConnectionWarmer:
+    """Warm-up probes for every configured provider.
+    
+    Each probe is a cheap authenticated call on the client the handlers use,
+    so the pooled connection it opens is the one the first user gets.
+    """
+    probes = {"telegram": application.bot.get_me}
+    if config.GROQ_API_KEY:
+        probes["groq"] = lambda: asyncio.to_thread(health_analyzer.ping_groq)
+    if config.GEMINI_API_KEY:
+        probes["gemini"] = lambda: asyncio.to_thread(health_analyzer.ping_gemini)
+    if config.SUPABASE_URL and config.SUPABASE_KEY:
+        probes["supabase"] = lambda: asyncio.to_thread(database.ping)
+    if config.MEM0_API_KEY:
+        probes["mem0"] = lambda: asyncio.to_thread(memory_manager.ping)
+    
+    return ConnectionWarmer(
+        probes,
+        critical=config.WARMUP_CRITICAL,
+        timeout=config.WARMUP_TIMEOUT,
+        keepalive_interval=config.KEEPALIVE_INTERVAL
+    )
+
+
+def announce_ready() -> None:
+    """Tell whoever is watching the console that the bot is serving."""
     print("\n👵 Dr. Aunty is ready lah! Send /start to begin!\n")
+
+
+async def install_shutdown_handlers(application: Application) -> None:
+    """Drain in-flight pipelines on SIGTERM/SIGINT before stopping the bot."""
+    loop = asyncio.get_running_loop()
+    
+    def on_signal(sig: signal.Signals) -> None:
+        logger.info(f"🛑 Received {sig.name}, draining in-flight work...")
+        if lifecycle.accepting:
+            asyncio.create_task(graceful_shutdown(application))
+    
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, on_signal, sig)
+        except (NotImplementedError, RuntimeError):
+            # Windows / non-main thread: fall back to immediate stop on Ctrl+C
+            logger.warning(f"⚠️ Cannot install {sig.name} handler, shutdown will not drain")
+
+
+async def graceful_shutdown(application: Application) -> None:
+    """Stop taking updates, let in-flight pipelines finish, then stop the bot.
+    
+    Args:
+        application: The running bot application
+    """
+    # Albums still waiting for pages are processed with what has arrived
+    flushed = media_groups.flush_all()
+    if flushed:
+        logger.info(f"📚 Flushed {flushed} incomplete albums before shutdown")
     
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    lifecycle.begin_shutdown()
+    
+    # Stop fetching new updates (polling) or accepting webhook requests
+    if application.updater and application.updater.running:
+        await application.updater.stop()
+    
+    abandoned = await lifecycle.drain()
+    if abandoned:
+        logger.warning(f"🛑 Abandoned {len(abandoned)} pipelines: {', '.join(abandoned)}")
+    
+    application.stop_running()
+
+
+async def release_resources(application: Application) -> None:
+    """Stop background workers once the bot has shut down."""
+    if warmer is not None:
+        await warmer.stop()
+    if metrics_server is not None:
+        metrics_server.close()
+    
+    await extraction_pool.shutdown()
+    image_preprocessor.shutdown()
+    extraction_cache.save()
+    
+    cache_stats = extraction_cache.stats()
+    logger.info(
+        f"📦 Extraction cache: {cache_stats['entries']} entries, "
+        f"{cache_stats['exact_hits']} exact + {cache_stats['perceptual_hits']} perceptual hits, "
+        f"{cache_stats['misses']} misses"
+    )
+    
+    preprocess_stats = image_preprocessor.stats()
+    if preprocess_stats["images"]:
+        logger.info(
+            f"🖼️ Preprocessed {preprocess_stats['images']} images: "
+            f"{preprocess_stats['bytes_in'] / 1024:.0f} KB → "
+            f"{preprocess_stats['bytes_out'] / 1024:.0f} KB sent to Gemini"
+        )
+    
+    # Final connection pool report (peak usage tells us if pools are sized right)
+    for name, stats in pool_stats().items():
+        logger.info(
+            f"🔌 Pool {name}: peak {stats['peak_in_flight']}/{stats['max_connections']}, "
+            f"{stats['saturated_requests']}/{stats['requests']} requests waited for a connection"
+        )
+    
+    # Last, so spans from the drain above are written out
+    shutdown_tracing()
+
+
+def run_webhook(application: Application) -> None:
+    """Serve updates over a webhook instead of long-polling.
+    
+    Telegram POSTs each update to WEBHOOK_URL/WEBHOOK_PATH. Requests must carry
+    the WEBHOOK_SECRET_TOKEN header or they are rejected. If WEBHOOK_CERT and
+    WEBHOOK_KEY are not set, the server speaks plain HTTP and expects a
+    TLS-terminating proxy in front of it.
+    
+    Args:
+        application: Fully configured bot application
+    """
+    if not config.WEBHOOK_URL:
+        raise RuntimeError("BOT_MODE=webhook requires WEBHOOK_URL (your public HTTPS URL)")
+    if importlib.util.find_spec("tornado") is None:
+        raise RuntimeError(
+            "BOT_MODE=webhook needs the webhook server. Install with: pip install -e \".[webhooks]\""
+        )
+    
+    url_path = config.WEBHOOK_PATH.strip("/")
+    webhook_url = f"{config.WEBHOOK_URL.rstrip('/')}/{url_path}"
+    terminate_tls = bool(config.WEBHOOK_CERT and config.WEBHOOK_KEY)
+    
+    print(f"🌐 Webhook mode: listening on {config.WEBHOOK_LISTEN}:{config.WEBHOOK_PORT}/{url_path}")
+    print(f"   Public URL: {webhook_url}")
+    print(f"   TLS: {'terminated by bot' if terminate_tls else 'terminated by proxy'}")
+    
+    application.run_webhook(
+        listen=config.WEBHOOK_LISTEN,
+        port=config.WEBHOOK_PORT,
+        url_path=url_path,
+        webhook_url=webhook_url,
+        secret_token=config.WEBHOOK_SECRET_TOKEN,
+        cert=config.WEBHOOK_CERT if terminate_tls else None,
+        key=config.WEBHOOK_KEY if terminate_tls else None,
+        allowed_updates=Update.ALL_TYPES,
+        drop_pending_updates=False,
+        stop_signals=None,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,178 @@
+"""Collecting multi-page lab reports sent as a Telegram album.
+
+Telegram delivers an album as separate messages that share a
+media_group_id, with no marker for the last page. Handled one by one,
+every page became its own report: its own analysis, database row, Mem0
+write and caregiver delivery.
+
+MediaGroupAggregator buffers album messages until no new page has arrived
+for a short quiet period (or the album hits Telegram's 10-item limit),
+then hands all pages to one callback. The update handler returns
+immediately, so the per-user update lock is not held while waiting; the
+flushed album then runs in the user's queue like any other report.
+
+merge_lab_pages() combines per-page extraction results into one lab_data.
+The page counts it adds are for the reply only; split_report_metadata()
+takes them out before the report is saved.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Telegram albums hold at most 10 items
+MAX_ALBUM_ITEMS = 10
+
+# Page counts added to lab_data for the reply, never saved with the report:
+# pages read, pages that failed (photos / scanned PDFs), text sections that
+# failed (PDF text layer) and pages past the document page limit
+REPORT_METADATA_KEYS = ("pages", "unreadable_pages", "unreadable_sections", "skipped_pages")
+
+
+class _PendingGroup:
+    """Pages collected so far for one album."""
+
+    __slots__ = ("items", "timer")
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MediaGroupAggregator:
+    """Buffers album messages and flushes each album once."""
+
+    def __init__(
+        self,
+        on_flush: Callable[[List[Any]], Awaitable[None]],
+        flush_delay: float = 1.5,
+        max_items: int = MAX_ALBUM_ITEMS,
+        lifecycle=None
+    ):
+        """Initialize the aggregator.
+
+        Args:
+            on_flush: Coroutine function called with the album's items (in arrival order)
+            flush_delay: Seconds without a new page before the album is complete
+            max_items: Flush immediately once this many items arrived
+            lifecycle: Optional LifecycleManager tracking flush callbacks
+        """
+        self.on_flush = on_flush
+        self.flush_delay = flush_delay
+        self.max_items = max_items
+        self.lifecycle = lifecycle
+        self._groups: Dict[Hashable, _PendingGroup] = {}
+
+    def add(self, group_id: Hashable, item: Any) -> int:
+        """Add one album item.
+
+        Args:
+            group_id: The message's media_group_id
+            item: Anything the flush callback needs (usually the Update)
+
+        Returns:
+            Number of items collected for this album so far
+        """
+        group = self._groups.get(group_id)
+        if group is None:
+            group = self._groups[group_id] = _PendingGroup()
+        group.items.append(item)
+
+        if group.timer is not None:
+            group.timer.cancel()
+
+        if len(group.items) >= self.max_items:
+            self._flush(group_id)
+        else:
+            loop = asyncio.get_running_loop()
+            group.timer = loop.call_later(self.flush_delay, self._flush, group_id)
+        return len(group.items)
+
+    def _flush(self, group_id: Hashable) -> None:
+        """Hand a completed album to the callback."""
+        group = self._groups.pop(group_id, None)
+        if group is None:
+            return
+        if group.timer is not None:
+            group.timer.cancel()
+
+        logger.info(f"📚 Album {group_id} complete with {len(group.items)} pages")
+        name = f"album {group_id} ({len(group.items)} pages)"
+        if self.lifecycle is not None:
+            self.lifecycle.track(self._run(group.items, name), name=name)
+        else:
+            asyncio.ensure_future(self._run(group.items, name))
+
+    async def _run(self, items: List[Any], name: str) -> None:
+        try:
+            await self.on_flush(items)
+        except Exception as e:
+            logger.error(f"Error processing {name}: {e}")
+
+    def flush_all(self) -> int:
+        """Flush every album still waiting (e.g. on shutdown).
+
+        Returns:
+            Number of albums flushed
+        """
+        group_ids = list(self._groups)
+        for group_id in group_ids:
+            self._flush(group_id)
+        return len(group_ids)
+
+    @property
+    def pending(self) -> int:
+        """Albums still collecting pages."""
+        return len(self._groups)
+
+
+def merge_lab_pages(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge per-page extraction results into one lab_data.
+
+    Tests are concatenated in page order; a test repeated on a later page
+    (e.g. a summary table) is kept once. Pages that failed to extract are
+    skipped as long as at least one page succeeded.
+
+    Args:
+        pages: lab_data dict for each page, in page order
+
+    Returns:
+        Merged lab_data (with an "error" key if no page could be read)
+    """
+    readable = [page for page in pages if "error" not in page]
+    if not readable:
+        return pages[0] if pages else {"error": "No pages to read"}
+
+    merged: Dict[str, Any] = {"test_date": "Unknown", "tests": []}
+    seen = set()
+    for page in readable:
+        if merged["test_date"] == "Unknown" and page.get("test_date") not in (None, "", "Unknown"):
+            merged["test_date"] = page["test_date"]
+        for test in page.get("tests", []):
+            key = (str(test.get("name", "")).strip().lower(), str(test.get("value", "")).strip())
+            if key in seen:
+                continue
+            seen.add(key)
+            merged["tests"].append(test)
+
+    if len(pages) > 1:
+        merged["pages"] = len(pages)
+    failed = len(pages) - len(readable)
+    if failed:
+        merged["unreadable_pages"] = failed
+    return merged
+
+
+def split_report_metadata(lab_data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Separate the reply-only page counts from the lab data to save.
+
+    Args:
+        lab_data: Extracted (possibly merged) lab data; not modified
+
+    Returns:
+        (lab_data without page counts, page counts)
+    """
+    metadata = {key: lab_data[key] for key in REPORT_METADATA_KEYS if key in lab_data}
+    report = {key: value for key, value in lab_data.items() if key not in REPORT_METADATA_KEYS}
+    return report, metadata
@@ -15,9 +15,17 @@ Example:
     "Your cholesterol went from 5.8 to 6.2 - that's 7% higher!"
     (Mem0 automatically retrieves and compares past reports)
 """
-from typing import List, Dict, Any
-from mem0 import MemoryClient
+import threading
+import time
+from typing import List, Dict, Any, Optional
 import config
+from connection_pool import build_sync_client
+from tracing import span
+
+# Never a real Telegram ID; used by ping() for an empty memory lookup
+_PING_USER_ID = "dr-aunty-ping"
+# Seconds before retrying a client that failed to build
+_CLIENT_RETRY_SECONDS = 30.0
 
 
 class HealthMemoryManager:
@@ -34,12 +42,57 @@ class HealthMemoryManager:
     """
     
     def __init__(self):
-        """Initialize Mem0 client."""
+        """Set up a lazy Mem0 client (created on first use)."""
+        self._client = None
+        self._client_initialized = False
+        self._client_retry_at = 0.0
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """Mem0 client, or None if it could not be created (yet)."""
+        # A failed build is not cached: it is retried after a short pause
+        if not self._client_initialized and time.monotonic() >= self._client_retry_at:
+            with self._client_lock:
+                if not self._client_initialized and time.monotonic() >= self._client_retry_at:
+                    self._client = self._create_client()
+                    if self._client is None:
+                        self._client_retry_at = time.monotonic() + _CLIENT_RETRY_SECONDS
+                    else:
+                        self._client_initialized = True
+        return self._client
+    
+    @client.setter
+    def client(self, client) -> None:
+        self._client = client
+        self._client_initialized = True
+    
+    @staticmethod
+    def _create_client() -> Optional[Any]:
+        """Import mem0 and build the client (pooled connections, tuned timeout)."""
         try:
-            self.client = MemoryClient(api_key=config.MEM0_API_KEY)
+            from mem0 import MemoryClient
+            try:
+                return MemoryClient(
+                    api_key=config.MEM0_API_KEY,
+                    client=build_sync_client("mem0", config.MEM0_TIMEOUT)
+                )
+            except TypeError:
+                # Older mem0ai versions don't accept a custom httpx client
+                return MemoryClient(api_key=config.MEM0_API_KEY)
         except Exception as e:
             print(f"Error initializing Mem0: {e}")
-            self.client = None
+            return None
+    
+    def ping(self) -> None:
+        """Cheap authenticated Mem0 call (empty lookup) to open/keep a connection.
+        
+        Raises:
+            RuntimeError: If the Mem0 client could not be created
+        """
+        if not self.client:
+            raise RuntimeError("Mem0 client not available")
+        self.client.get_all(user_id=_PING_USER_ID)
     
     def add_health_record(
         self, 
@@ -75,10 +128,11 @@ class HealthMemoryManager:
             memory_text += f"\n\nDr. Aunty's Analysis: {analysis}"
             
             # Store in Mem0
-            self.client.add(
-                messages=[{"role": "user", "content": memory_text}],
-                user_id=user_id
-            )
+            with span("mem0.add", chars=len(memory_text)):
+                self.client.add(
+                    messages=[{"role": "user", "content": memory_text}],
+                    user_id=user_id
+                )
             
             return True
             
@@ -101,12 +155,13 @@ class HealthMemoryManager:
         
         try:
             # Search for user's health memories with required filters
-            memories = self.client.search(
-                query="health reports and lab test results",
-                user_id=user_id,
-                limit=limit,
-                filters={"user_id": user_id}  # Required filters parameter for v2 API
-            )
+            with span("mem0.search", limit=limit):
+                memories = self.client.search(
+                    query="health reports and lab test results",
+                    user_id=user_id,
+                    limit=limit,
+                    filters={"user_id": user_id}  # Required filters parameter for v2 API
+                )
             
             if not memories:
                 return "No previous health records found."
@@ -144,7 +199,9 @@ class HealthMemoryManager:
             return []
         
         try:
-            memories = self.client.get_all(user_id=user_id)
+            with span("mem0.get_all") as provider_span:
+                memories = self.client.get_all(user_id=user_id)
+                provider_span.set(count=len(memories) if isinstance(memories, list) else None)
             return memories if memories else []
         except Exception as e:
             print(f"Error getting all memories: {e}")
@@ -170,13 +227,14 @@ class HealthMemoryManager:
             return False
         
         try:
-            self.client.add(
-                messages=[
-                    {"role": "user", "content": user_message},
-                    {"role": "assistant", "content": bot_response}
-                ],
-                user_id=user_id
-            )
+            with span("mem0.add", chars=len(user_message) + len(bot_response)):
+                self.client.add(
+                    messages=[
+                        {"role": "user", "content": user_message},
+                        {"role": "assistant", "content": bot_response}
+                    ],
+                    user_id=user_id
+                )
             return True
         except Exception as e:
             print(f"Error adding conversation: {e}")
@@ -0,0 +1,313 @@
+"""Stage-level latency metrics with a Prometheus text endpoint.
+
+The only timing we had was response_time around the Groq call. To know
+where the seconds of a lab report upload go, every stage of the pipeline
+is timed:
+
+    download, preprocess, extraction, history_fetch, analysis, db_write,
+    mem0_write, tts, video, and every Telegram API call (telegram_<method>)
+
+Exposed on a local HTTP endpoint (GET /metrics) in Prometheus text format:
+- dr_aunty_stage_seconds            histogram per stage (for Prometheus)
+- dr_aunty_stage_quantile_seconds   p50/p95/p99 over the last samples
+                                    (readable without a Prometheus server)
+- dr_aunty_errors_total             errors per stage
+- dr_aunty_fallbacks_total          fallbacks taken (plain-text Markdown,
+                                    queue rejections, ...)
+- Gauges from component stats (pools, queues, caches) read at scrape time
+
+Usage:
+    with stage_timer("analysis"):
+        analysis = await ...
+
+Like connection_pool, metrics live in module-level state so any module can
+record without threading a registry through constructors.
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from tracing import Span, span
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "dr_aunty"
+
+# Seconds - covers a 20ms Telegram call up to a multi-minute video render
+_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+_QUANTILES = (0.5, 0.95, 0.99)
+# Samples kept per stage for the quantile series
+_WINDOW = 1024
+
+
+class _StageHistogram:
+    """Cumulative histogram plus a sliding window of recent samples."""
+
+    __slots__ = ("counts", "total", "count", "window")
+
+    def __init__(self):
+        self.counts = [0] * len(_BUCKETS)
+        self.total = 0.0
+        self.count = 0
+        self.window: Deque[float] = deque(maxlen=_WINDOW)
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(_BUCKETS, seconds)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+        self.window.append(seconds)
+
+    def quantiles(self) -> Dict[float, float]:
+        samples = sorted(self.window)
+        if not samples:
+            return {}
+        return {
+            q: samples[min(len(samples) - 1, int(q * len(samples)))]
+            for q in _QUANTILES
+        }
+
+
+_lock = threading.Lock()
+_histograms: Dict[str, _StageHistogram] = defaultdict(_StageHistogram)
+_errors: Dict[str, int] = defaultdict(int)
+_fallbacks: Dict[str, int] = defaultdict(int)
+_gauge_sources: List[Tuple[str, Callable[[], Dict[str, Any]], Optional[str]]] = []
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Record how long one stage took.
+
+    Args:
+        stage: Stage name (e.g. "extraction")
+        seconds: Duration in seconds
+    """
+    with _lock:
+        _histograms[stage].observe(seconds)
+
+
+def count_error(stage: str) -> None:
+    """Count an error in a stage."""
+    with _lock:
+        _errors[stage] += 1
+
+
+def count_fallback(kind: str) -> None:
+    """Count a fallback path being taken (e.g. "markdown_plain_text")."""
+    with _lock:
+        _fallbacks[kind] += 1
+
+
+class stage_timer:
+    """Context manager timing a stage; exceptions are counted as errors.
+
+    Works around awaits too, since it only reads the clock on entry/exit.
+    Each timed stage is also a tracing span (timer.span), so attributes
+    such as byte sizes can be attached to it.
+    """
+
+    __slots__ = ("stage", "span", "_start")
+
+    def __init__(self, stage: str, **attributes: Any):
+        self.stage = stage
+        self.span: Span = span(stage, **attributes)
+        self._start = 0.0
+
+    def __enter__(self) -> "stage_timer":
+        self.span.__enter__()
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        observe(self.stage, time.monotonic() - self._start)
+        if exc_type is not None and not issubclass(exc_type, asyncio.CancelledError):
+            count_error(self.stage)
+        self.span.__exit__(exc_type, exc, tb)
+        return False
+
+
+def register_gauges(name: str, source: Callable[[], Dict[str, Any]], label: Optional[str] = None) -> None:
+    """Export a component's stats() as gauges, read at scrape time.
+
+    Args:
+        name: Metric name part (e.g. "extraction_pool")
+        source: Returns {key: number}, or {label_value: {key: number}} if label is set
+        label: Label name for nested stats (e.g. "pool")
+    """
+    _gauge_sources.append((name, source, label))
+
+
+def stage_summary() -> Dict[str, Dict[str, float]]:
+    """Per-stage count, mean and p50/p95/p99 (for logs and benchmarks).
+
+    Returns:
+        Dictionary mapping stage name to its summary
+    """
+    with _lock:
+        summary = {}
+        for stage, h in _histograms.items():
+            quantiles = h.quantiles()
+            summary[stage] = {
+                "count": h.count,
+                "mean": h.total / h.count if h.count else 0.0,
+                "p50": quantiles.get(0.5, 0.0),
+                "p95": quantiles.get(0.95, 0.0),
+                "p99": quantiles.get(0.99, 0.0),
+                "errors": _errors.get(stage, 0),
+            }
+        return summary
+
+
+def reset() -> None:
+    """Clear all recorded samples and counters (gauge sources stay registered)."""
+    with _lock:
+        _histograms.clear()
+        _errors.clear()
+        _fallbacks.clear()
+
+
+def _labels(**labels: Any) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def render() -> str:
+    """Render all metrics in Prometheus text exposition format."""
+    lines: List[str] = []
+
+    with _lock:
+        histograms = {
+            stage: (list(h.counts), h.total, h.count, h.quantiles())
+            for stage, h in _histograms.items()
+        }
+        errors = dict(_errors)
+        fallbacks = dict(_fallbacks)
+
+    name = f"{_PREFIX}_stage_seconds"
+    lines.append(f"# HELP {name} Time spent in each pipeline stage")
+    lines.append(f"# TYPE {name} histogram")
+    for stage, (counts, total, count, _) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, bucket_count in zip(_BUCKETS, counts):
+            cumulative += bucket_count
+            lines.append(f"{name}_bucket{_labels(stage=stage, le=bound)} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(stage=stage, le='+Inf')} {count}")
+        lines.append(f"{name}_sum{_labels(stage=stage)} {total:.6f}")
+        lines.append(f"{name}_count{_labels(stage=stage)} {count}")
+
+    name = f"{_PREFIX}_stage_quantile_seconds"
+    lines.append(f"# HELP {name} Stage latency quantiles over the last {_WINDOW} samples")
+    lines.append(f"# TYPE {name} gauge")
+    for stage, (_, _, _, quantiles) in sorted(histograms.items()):
+        for q, value in quantiles.items():
+            lines.append(f"{name}{_labels(stage=stage, quantile=q)} {value:.6f}")
+
+    for metric, values, label, help_text in (
+        ("errors_total", errors, "stage", "Errors per pipeline stage"),
+        ("fallbacks_total", fallbacks, "kind", "Fallback paths taken"),
+    ):
+        name = f"{_PREFIX}_{metric}"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for key, value in sorted(values.items()):
+            lines.append(f"{name}{_labels(**{label: key})} {value}")
+
+    for source_name, source, label in _gauge_sources:
+        try:
+            stats = source()
+        except Exception as e:
+            logger.warning(f"Metrics source {source_name} failed: {e}")
+            continue
+        rows = stats.items() if label else [(None, stats)]
+        emitted = set()
+        for label_value, values in rows:
+            for key, value in values.items():
+                value = _number(value)
+                if value is None:
+                    continue
+                name = f"{_PREFIX}_{source_name}_{key}"
+                if name not in emitted:
+                    lines.append(f"# TYPE {name} gauge")
+                    emitted.add(name)
+                labels = _labels(**{label: label_value}) if label else ""
+                lines.append(f"{name}{labels} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Serve one HTTP request (GET /metrics)."""
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain headers
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render().encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            status, body, content_type = "404 Not Found", b"Not found\n", "text/plain"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.debug(f"Metrics request failed: {e}")
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str = "127.0.0.1", port: int = 9464) -> asyncio.AbstractServer:
+    """Start the /metrics HTTP endpoint on the running event loop.
+
+    Args:
+        host: Interface to bind (keep it local unless scraped remotely)
+        port: TCP port
+
+    Returns:
+        The asyncio server (close() it on shutdown)
+    """
+    server = await asyncio.start_server(_handle_connection, host, port)
+    logger.info(f"📈 Metrics endpoint on http://{host}:{port}/metrics")
+    return server
+
+
+async def timed_to_thread(stage: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """asyncio.to_thread() that records the call under a stage.
+
+    The call's span carries the function name, and spans opened inside
+    func (provider calls) become its children.
+
+    Args:
+        stage: Stage name
+        func: Blocking callable
+        *args: Arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Whatever func returns
+    """
+    with stage_timer(stage, call=getattr(func, "__qualname__", None)):
+        return await asyncio.to_thread(func, *args, **kwargs)
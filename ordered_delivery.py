@@ -0,0 +1,104 @@
+"""Ordered delivery of results that complete out of order.
+
+Video chunks are generated concurrently but must reach the user as
+Part 1, Part 2, Part 3... This module provides a reorder buffer: producers
+put() results by sequence number as they finish, and a single consumer
+iterates over them strictly in order. The consumer is woken only when the
+next sequence number lands - no polling.
+
+Example:
+    buffer = ReorderBuffer(total=3)
+    buffer.put(1, "b")          # held back, 0 not ready yet
+    buffer.put(0, "a")          # wakes the consumer
+    async for seq, item in buffer:
+        ...                     # (0, "a"), (1, "b"), then waits for 2
+
+Early stop:
+    close()  - partial delivery: the consumer drains whatever is already
+               contiguous from the next sequence number, then stops
+    cancel() - stop immediately, nothing further is delivered
+"""
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+
+class ReorderBuffer:
+    """Reorders (sequence, item) pairs for in-order async consumption."""
+
+    def __init__(self, total: int):
+        """Initialize the buffer.
+
+        Args:
+            total: Number of items expected (sequence numbers 0..total-1)
+        """
+        self.total = total
+        self._items: Dict[int, Any] = {}
+        self._next = 0
+        self._closed = False
+        self._cancelled = False
+        self._wakeup = asyncio.Event()
+
+    def put(self, seq: int, item: Any) -> None:
+        """Store a completed item.
+
+        Args:
+            seq: Sequence number (0-based)
+            item: Result for this sequence number
+
+        Raises:
+            ValueError: If seq is out of range or was already delivered/stored
+        """
+        if not 0 <= seq < self.total:
+            raise ValueError(f"Sequence {seq} out of range (total {self.total})")
+        if seq < self._next or seq in self._items:
+            raise ValueError(f"Sequence {seq} already received")
+        if self._cancelled:
+            return
+
+        self._items[seq] = item
+        if seq == self._next:
+            self._wakeup.set()
+
+    def close(self) -> None:
+        """Stop early, delivering only what is already contiguous (partial delivery)."""
+        self._closed = True
+        self._wakeup.set()
+
+    def cancel(self) -> None:
+        """Stop immediately; items not yet consumed are dropped."""
+        self._cancelled = True
+        self._closed = True
+        self._items.clear()
+        self._wakeup.set()
+
+    @property
+    def delivered(self) -> int:
+        """Number of items handed to the consumer so far."""
+        return self._next
+
+    @property
+    def done(self) -> bool:
+        """True once every item has been delivered or the buffer was stopped."""
+        return self._next >= self.total or (self._closed and self._next not in self._items)
+
+    def undelivered(self) -> List[int]:
+        """Sequence numbers that have not been delivered."""
+        return list(range(self._next, self.total))
+
+    def __aiter__(self) -> "ReorderBuffer":
+        return self
+
+    async def __anext__(self) -> Tuple[int, Any]:
+        while True:
+            if self._next in self._items:
+                seq = self._next
+                item = self._items.pop(seq)
+                self._next += 1
+                return seq, item
+
+            if self._next >= self.total or self._closed:
+                raise StopAsyncIteration
+
+            # Sleep until the next sequence number arrives (or we're stopped)
+            self._wakeup.clear()
+            await self._wakeup.wait()
@@ -0,0 +1,105 @@
+"""In-memory ingestion of lab report photos from Telegram.
+
+Photos used to be downloaded to temp_{telegram_id}.jpg in the working
+directory, reopened by PIL and then deleted. That was wasted file I/O, two
+uploads from the same user collided on the filename, and a crash left
+files behind.
+
+This module downloads straight into memory and decodes the image exactly
+once (in a worker thread, so decoding never blocks the event loop). Only
+files larger than PHOTO_MEMORY_LIMIT_BYTES spill to a uniquely named
+temporary file, which is always removed.
+"""
+import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from io import BytesIO
+from typing import TYPE_CHECKING, AsyncIterator, Optional, Union
+
+from metrics import stage_timer
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def decode_image(source) -> "Image.Image":
+    """Decode an image fully so the source buffer/file can be released.
+
+    Args:
+        source: Bytes, file-like object or file path
+
+    Returns:
+        Decoded PIL image
+    """
+    from PIL import Image
+
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    img = Image.open(source)
+    img.load()
+    return img
+
+
+async def download_bytes(telegram_file, max_memory_bytes: int) -> Optional[bytes]:
+    """Download a Telegram file into memory.
+
+    Args:
+        telegram_file: telegram.File from get_file()
+        max_memory_bytes: Largest file kept purely in memory
+
+    Returns:
+        File contents, or None if the file is larger than max_memory_bytes
+        (callers should fall back to a disk download)
+    """
+    size = telegram_file.file_size
+    if size and size > max_memory_bytes:
+        return None
+
+    buffer = BytesIO()
+    await telegram_file.download_to_memory(out=buffer)
+    return buffer.getvalue()
+
+
+@asynccontextmanager
+async def spooled_download(
+    telegram_file,
+    max_memory_bytes: int,
+    suffix: str = ""
+) -> AsyncIterator[Union[bytes, str]]:
+    """Download a Telegram file, in memory when small enough.
+
+    Yields the file contents as bytes, or - for files above max_memory_bytes -
+    the path of a uniquely named temp file that is removed on exit.
+
+    Args:
+        telegram_file: telegram.File from get_file()
+        max_memory_bytes: Largest file kept purely in memory
+        suffix: Temp file name suffix (e.g. ".pdf")
+    """
+    temp_path = None
+    try:
+        with stage_timer("download") as timer:
+            data = await download_bytes(telegram_file, max_memory_bytes)
+            if data is None:
+                # Large file: unique temp file (no collisions), always cleaned up
+                fd, temp_path = tempfile.mkstemp(suffix=suffix, prefix="dr_aunty_")
+                os.close(fd)
+                await telegram_file.download_to_drive(temp_path)
+            size = len(data) if data is not None else os.path.getsize(temp_path)
+            timer.span.set(bytes=size, spooled=data is None)
+
+        if data is not None:
+            logger.info(f"📥 Downloaded file into memory ({size / 1024:.0f} KB)")
+            yield data
+        else:
+            logger.info(
+                f"📥 File over {max_memory_bytes / 1024:.0f} KB, spooled to disk "
+                f"({size / 1024:.0f} KB)"
+            )
+            yield temp_path
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
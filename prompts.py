@@ -198,3 +198,32 @@ If you cannot extract certain information, use "Unknown" or "N/A".
 Be precise with numbers and units. Identify which values are outside normal ranges.
 """
 
+LAB_TEXT_EXTRACTION_PROMPT = """Below is the text of a lab report. Extract all test results in a structured format.
+
+Extract:
+1. Test name
+2. Result value with units
+3. Reference range
+4. Date of test (if present)
+
+Return only JSON in this format:
+{{
+  "test_date": "YYYY-MM-DD or Unknown",
+  "tests": [
+    {{
+      "name": "Test Name",
+      "value": "Result",
+      "unit": "Unit",
+      "reference_range": "Normal Range",
+      "status": "normal/high/low"
+    }}
+  ]
+}}
+
+If you cannot extract certain information, use "Unknown" or "N/A".
+Be precise with numbers and units. Identify which values are outside normal ranges.
+
+Lab report text:
+{report_text}
+"""
+
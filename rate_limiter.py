@@ -0,0 +1,247 @@
+"""Outbound Telegram rate limiting with per-chat and global token buckets.
+
+One lab report upload sends a burst of requests: status edits, the
+analysis, caregiver text, caregiver audio and a patient notification.
+Telegram's flood limits are roughly 30 messages/second per bot and about
+1 message/second per chat; going over them earns 429 "retry after" errors.
+
+TelegramRateLimiter plugs into python-telegram-bot under every bot call:
+- Global token bucket shared by all chats
+- Per-chat token buckets (small burst, then ~1 msg/s)
+- Bulk traffic (caregiver fan-out) gets a smaller share of the global
+  bucket and only takes global tokens that are free right now, above a
+  reserve kept for interactive replies. Interactive replies never queue
+  behind bulk reservations; bulk waits whenever they need the bucket
+- RetryAfter responses are honored and the request is retried
+
+Usage:
+    await bot.send_message(chat_id, text, rate_limit_args=BULK_PRIORITY)
+"""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from metrics import count_fallback, stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Pass as rate_limit_args to mark a send as low-priority bulk traffic
+BULK_PRIORITY = {"priority": "bulk"}
+INTERACTIVE_PRIORITY = {"priority": "interactive"}
+
+# Per-chat buckets idle longer than this are forgotten
+_IDLE_BUCKET_SECONDS = 300
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of polling.
+
+    reserve() always succeeds and returns how long the caller must wait
+    before its token becomes valid. Tokens may go negative, which queues
+    later callers behind earlier ones in FIFO order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take one token.
+
+        Returns:
+            Seconds to wait before using the token (0 if available now)
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens -= 1
+        wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        return max(wait, self._paused_until - now)
+
+    def try_take(self, keep: float = 0.0) -> float:
+        """Take one token only if it is free now and `keep` tokens remain.
+
+        Unlike reserve(), this never queues ahead of later callers.
+
+        Args:
+            keep: Tokens that must stay in the bucket after taking one
+
+        Returns:
+            0 if a token was taken, else roughly how long to wait before trying again
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._tokens - 1 >= keep:
+            self._tokens -= 1
+            return 0.0
+        return (keep + 1 - self._tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Block the bucket for a while (e.g. after a RetryAfter)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    @property
+    def idle(self) -> bool:
+        """True if the bucket is full and hasn't been used for a while."""
+        now = time.monotonic()
+        return (
+            now - self._updated > _IDLE_BUCKET_SECONDS
+            and now >= self._paused_until
+        )
+
+
+class TelegramRateLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """Rate limiter for all outgoing Telegram bot requests."""
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        bulk_share: float = 0.5,
+        max_retries: int = 3
+    ):
+        """Initialize the limiter.
+
+        Args:
+            global_rate: Messages per second across all chats
+            chat_rate: Messages per second per chat
+            chat_burst: Messages a chat can send back-to-back before throttling
+            bulk_share: Fraction of global_rate available to bulk sends
+            max_retries: Times to retry a request after RetryAfter
+        """
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        bulk_rate = max(global_rate * bulk_share, 0.1)
+        self.bulk_bucket = TokenBucket(bulk_rate, bulk_rate)
+        # Global tokens bulk sends must leave for interactive replies
+        # (below the bucket's capacity, so bulk always gets a turn eventually)
+        self.interactive_reserve = max(0.0, min(global_rate - bulk_rate, global_rate - 1))
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+
+        self._chat_buckets: Dict[Union[int, str], TokenBucket] = {}
+        self._throttled = 0
+        self._retries = 0
+
+    async def initialize(self) -> None:
+        """Nothing to set up."""
+
+    async def shutdown(self) -> None:
+        """Nothing to tear down."""
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        """Get (or create) the bucket for a chat."""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > 10000:
+                self._chat_buckets = {
+                    cid: b for cid, b in self._chat_buckets.items() if not b.idle
+                }
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _acquire(self, chat_id: Union[int, str], bulk: bool) -> None:
+        """Wait until this request may be sent."""
+        if bulk:
+            await self._acquire_bulk()
+            wait = self._chat_bucket(chat_id).reserve()
+        else:
+            wait = max(self._chat_bucket(chat_id).reserve(), self.global_bucket.reserve())
+        if wait > 0:
+            self._throttled += 1
+            await asyncio.sleep(wait)
+
+    async def _acquire_bulk(self) -> None:
+        """Wait for a bulk token, then for a spare global token.
+
+        Bulk sends never reserve global tokens ahead of time; they poll for
+        one that is free above the interactive reserve, so interactive
+        replies arriving later are still served first.
+        """
+        wait = self.bulk_bucket.reserve()
+        if wait > 0:
+            self._throttled += 1
+            await asyncio.sleep(wait)
+
+        throttled = False
+        while True:
+            wait = self.global_bucket.try_take(keep=self.interactive_reserve)
+            if wait <= 0:
+                return
+            if not throttled:
+                throttled = True
+                self._throttled += 1
+            await asyncio.sleep(wait)
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        """Throttle a bot request, retrying on RetryAfter."""
+        chat_id = data.get("chat_id")
+        bulk = bool(rate_limit_args and rate_limit_args.get("priority") == "bulk")
+
+        attempt = 0
+        while True:
+            # Only requests aimed at a chat count toward flood limits
+            if chat_id is not None:
+                await self._acquire(chat_id, bulk)
+
+            try:
+                # Every Telegram API call is timed under its own stage
+                with stage_timer(f"telegram_{endpoint}", attempt=attempt or None):
+                    return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                count_fallback("telegram_retry_after")
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                delay = e.retry_after
+                if isinstance(delay, timedelta):
+                    delay = delay.total_seconds()
+                self._retries += 1
+                logger.warning(
+                    f"⏳ Telegram flood limit on {endpoint} (chat {chat_id}), "
+                    f"retrying in {delay}s ({attempt}/{self.max_retries})"
+                )
+                if chat_id is not None:
+                    self._chat_bucket(chat_id).pause(delay)
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get limiter statistics.
+
+        Returns:
+            Dictionary with tracked chats, throttled requests and retries
+        """
+        return {
+            "tracked_chats": len(self._chat_buckets),
+            "throttled_requests": self._throttled,
+            "retry_after_retries": self._retries,
+        }
@@ -0,0 +1,95 @@
+"""Per-upload request context for the lab report pipeline.
+
+One lab report upload fans out into several parallel tasks (text analysis,
+patient videos, caregiver audio). Each of them used to re-fetch the same
+data from Supabase: the caregiver row, the health summary (5 full reports)
+and the latest report just to recover lab_data the handler already had.
+
+PhotoRequestContext carries that data through the pipeline. Lookups are
+memoized per request, so each one hits the database at most once no
+matter how many tasks ask for it - even when they ask at the same time.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import timed_to_thread
+
+
+class PhotoRequestContext:
+    """Data shared by every stage of one lab report upload.
+
+    Attributes:
+        telegram_id: Patient's Telegram ID
+        user_name: Patient's first name (for scripts and captions)
+        lab_data: Lab data extracted from this upload
+        report_id: ID of the health_reports row for this upload
+    """
+
+    def __init__(
+        self,
+        database,
+        telegram_id: int,
+        user_name: str,
+        lab_data: Dict[str, Any],
+        report_id: Optional[int] = None
+    ):
+        """Initialize the context.
+
+        Args:
+            database: HealthDatabase instance
+            telegram_id: Patient's Telegram ID
+            user_name: Patient's first name
+            lab_data: Lab data extracted from this upload
+            report_id: ID of the health_reports row for this upload
+        """
+        self.database = database
+        self.telegram_id = telegram_id
+        self.user_name = user_name
+        self.lab_data = lab_data
+        self.report_id = report_id
+
+        self._lookups: Dict[str, asyncio.Task] = {}
+
+    def _once(self, key: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Awaitable[Any]:
+        """Run a blocking lookup in a thread the first time it is requested.
+
+        Later (or concurrent) callers await the same task instead of
+        querying again. Each caller gets a shielded view, so cancelling one
+        caller does not cancel the lookup the others are waiting on.
+        """
+        return asyncio.shield(self._lookup_task(key, func, *args, **kwargs))
+
+    def _lookup_task(self, key: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> asyncio.Task:
+        """Get the shared task for a lookup, starting it on first use."""
+        task = self._lookups.get(key)
+        if task is None:
+            task = asyncio.ensure_future(timed_to_thread("db_read", func, *args, **kwargs))
+            self._lookups[key] = task
+        return task
+
+    def prefetch_caregiver(self) -> None:
+        """Start the caregiver lookup in the background."""
+        self._lookup_task("caregiver", self.database.get_caregiver, self.telegram_id)
+
+    async def get_caregiver(self) -> Optional[Dict[str, Any]]:
+        """Get the patient's caregiver (fetched at most once per upload).
+
+        Returns:
+            Caregiver info or None
+        """
+        return await self._once("caregiver", self.database.get_caregiver, self.telegram_id)
+
+    async def get_health_summary(self) -> str:
+        """Get the patient's health summary (built at most once per upload).
+
+        Includes this upload's report even while its analysis is pending.
+
+        Returns:
+            Formatted health summary
+        """
+        return await self._once(
+            "health_summary",
+            self.database.get_health_summary,
+            self.telegram_id,
+            include_pending=True
+        )
@@ -46,10 +46,44 @@ CREATE TABLE IF NOT EXISTS caregivers (
     UNIQUE(patient_telegram_id, caregiver_telegram_id)
 );
 
+-- Denormalized counts so /history reads a few small columns, not lab_data
+ALTER TABLE health_reports ADD COLUMN IF NOT EXISTS test_count INTEGER;
+ALTER TABLE health_reports ADD COLUMN IF NOT EXISTS abnormal_count INTEGER;
+
+-- Backfill counts for reports saved before these columns existed
+UPDATE health_reports
+SET test_count = jsonb_array_length(COALESCE(lab_data->'tests', '[]'::jsonb)),
+    abnormal_count = (
+        SELECT COUNT(*)
+        FROM jsonb_array_elements(COALESCE(lab_data->'tests', '[]'::jsonb)) AS t
+        WHERE t->>'status' IS DISTINCT FROM 'normal'
+    )
+WHERE test_count IS NULL;
+
+-- Per-user health profile: counters and summary kept up to date on every
+-- report, so /stats, /history and summaries read one small row
+CREATE TABLE IF NOT EXISTS health_profiles (
+    telegram_id BIGINT PRIMARY KEY,
+    report_count INTEGER NOT NULL DEFAULT 0,
+    test_count INTEGER NOT NULL DEFAULT 0,
+    abnormal_count INTEGER NOT NULL DEFAULT 0,
+    latest_report_id INTEGER,
+    latest_test_date TEXT,
+    analyzed_count INTEGER NOT NULL DEFAULT 0,
+    avg_response_time FLOAT NOT NULL DEFAULT 0,
+    memory_count INTEGER NOT NULL DEFAULT 0,
+    recent_reports JSONB NOT NULL DEFAULT '[]'::jsonb,
+    summary_text TEXT,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    FOREIGN KEY (telegram_id) REFERENCES users(telegram_id) ON DELETE CASCADE
+);
+
 -- 2. Create indexes (if they don't exist)
 CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id);
 CREATE INDEX IF NOT EXISTS idx_health_reports_telegram_id ON health_reports(telegram_id);
 CREATE INDEX IF NOT EXISTS idx_health_reports_created_at ON health_reports(created_at DESC);
+-- Keyset pagination for /history: (telegram_id, created_at, id) range scans
+CREATE INDEX IF NOT EXISTS idx_health_reports_user_created ON health_reports(telegram_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_video_summaries_telegram_id ON video_summaries(telegram_id);
 CREATE INDEX IF NOT EXISTS idx_caregivers_patient_id ON caregivers(patient_telegram_id);
 CREATE INDEX IF NOT EXISTS idx_caregivers_caregiver_id ON caregivers(caregiver_telegram_id);
@@ -59,6 +93,7 @@ ALTER TABLE users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE health_reports ENABLE ROW LEVEL SECURITY;
 ALTER TABLE video_summaries ENABLE ROW LEVEL SECURITY;
 ALTER TABLE caregivers ENABLE ROW LEVEL SECURITY;
+ALTER TABLE health_profiles ENABLE ROW LEVEL SECURITY;
 
 -- 4. Drop old policies (to avoid "already exists" errors)
 DROP POLICY IF EXISTS "Service role can do everything on users" ON users;
@@ -70,12 +105,17 @@ DROP POLICY IF EXISTS "Anon can update users" ON users;
 DROP POLICY IF EXISTS "Anon can select users" ON users;
 DROP POLICY IF EXISTS "Anon can insert health_reports" ON health_reports;
 DROP POLICY IF EXISTS "Anon can select health_reports" ON health_reports;
+DROP POLICY IF EXISTS "anon_update_health_reports" ON health_reports;
 DROP POLICY IF EXISTS "Anon can insert video_summaries" ON video_summaries;
 DROP POLICY IF EXISTS "Anon can select video_summaries" ON video_summaries;
 DROP POLICY IF EXISTS "Anon can insert caregivers" ON caregivers;
 DROP POLICY IF EXISTS "Anon can select caregivers" ON caregivers;
 DROP POLICY IF EXISTS "Anon can update caregivers" ON caregivers;
 DROP POLICY IF EXISTS "Anon can delete caregivers" ON caregivers;
+DROP POLICY IF EXISTS "service_role_all_health_profiles" ON health_profiles;
+DROP POLICY IF EXISTS "anon_insert_health_profiles" ON health_profiles;
+DROP POLICY IF EXISTS "anon_update_health_profiles" ON health_profiles;
+DROP POLICY IF EXISTS "anon_select_health_profiles" ON health_profiles;
 
 -- 5. Create policies for service role
 CREATE POLICY "service_role_all_users" 
@@ -102,6 +142,12 @@ CREATE POLICY "service_role_all_caregivers"
     USING (true) 
     WITH CHECK (true);
 
+CREATE POLICY "service_role_all_health_profiles" 
+    ON health_profiles FOR ALL 
+    TO service_role 
+    USING (true) 
+    WITH CHECK (true);
+
 -- 6. Create policies for anon/authenticated (your bot)
 CREATE POLICY "anon_insert_users" 
     ON users FOR INSERT 
@@ -129,6 +175,13 @@ CREATE POLICY "anon_select_health_reports"
     TO anon, authenticated
     USING (true);
 
+-- Reports are inserted once and updated in place when analysis finishes
+CREATE POLICY "anon_update_health_reports" 
+    ON health_reports FOR UPDATE 
+    TO anon, authenticated
+    USING (true) 
+    WITH CHECK (true);
+
 CREATE POLICY "anon_insert_video_summaries" 
     ON video_summaries FOR INSERT 
     TO anon, authenticated
@@ -160,12 +213,29 @@ CREATE POLICY "anon_delete_caregivers"
     TO anon, authenticated
     USING (true);
 
+-- Profiles are upserted (insert or update) whenever a report is saved
+CREATE POLICY "anon_insert_health_profiles" 
+    ON health_profiles FOR INSERT 
+    TO anon, authenticated
+    WITH CHECK (true);
+
+CREATE POLICY "anon_update_health_profiles" 
+    ON health_profiles FOR UPDATE 
+    TO anon, authenticated
+    USING (true) 
+    WITH CHECK (true);
+
+CREATE POLICY "anon_select_health_profiles" 
+    ON health_profiles FOR SELECT 
+    TO anon, authenticated
+    USING (true);
+
 -- ===============================================
 -- ✅ DONE! Verify everything:
 -- ===============================================
 SELECT 'Tables created:' as status;
-SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename IN ('users', 'health_reports', 'video_summaries', 'caregivers');
+SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename IN ('users', 'health_reports', 'video_summaries', 'caregivers', 'health_profiles');
 
 SELECT 'Policies created:' as status;
-SELECT tablename, policyname FROM pg_policies WHERE tablename IN ('users', 'health_reports', 'video_summaries', 'caregivers') ORDER BY tablename, policyname;
+SELECT tablename, policyname FROM pg_policies WHERE tablename IN ('users', 'health_reports', 'video_summaries', 'caregivers', 'health_profiles') ORDER BY tablename, policyname;
 
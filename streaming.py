@@ -0,0 +1,225 @@
+"""Streaming LLM replies into progressively edited Telegram messages.
+
+Groq is fast, but the user still saw nothing until the whole completion
+had arrived. Time-to-first-visible-text is the latency users notice.
+
+- iterate_in_thread() runs a blocking token generator (the Groq SDK
+  stream) in a worker thread and yields its items on the event loop
+- ProgressiveMessage shows the text as it grows, coalescing edits to at
+  most one per interval (Telegram allows ~1 message/second per chat), as
+  plain text with a typing cursor
+- The final edit applies Markdown; if the model's Markdown doesn't parse,
+  the message is sent as plain text instead of failing
+- Replies longer than Telegram's 4096-character limit continue in
+  follow-up messages
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional
+
+from telegram import Message
+from telegram.error import BadRequest
+
+from metrics import count_fallback, observe
+
+logger = logging.getLogger(__name__)
+
+# Telegram's maximum message length
+MAX_MESSAGE_LENGTH = 4096
+
+_CURSOR = " ▌"
+_DONE = object()
+
+
+class _Failure:
+    """Carries an exception from the producer thread to the event loop."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def iterate_in_thread(func: Callable[..., Iterable[Any]], *args: Any) -> AsyncIterator[Any]:
+    """Consume a blocking iterator in a worker thread.
+
+    Args:
+        func: Function returning a (blocking) iterable, e.g. a token stream
+        *args: Arguments for func
+
+    Yields:
+        The iterable's items, in order
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            for item in func(*args):
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except BaseException as e:
+            loop.call_soon_threadsafe(queue.put_nowait, _Failure(e))
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    producer = asyncio.ensure_future(asyncio.to_thread(produce))
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        # Consumer stopped early (error/cancel): let the thread wind down
+        stop.set()
+        if producer.done():
+            producer.result()
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Split text into Telegram-sized parts, preferring line breaks.
+
+    Args:
+        text: Full message text
+        limit: Maximum characters per part
+
+    Returns:
+        List of message parts
+    """
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= limit // 2:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    parts.append(text)
+    return parts
+
+
+class ProgressiveMessage:
+    """A Telegram message that grows as text is streamed in."""
+
+    def __init__(
+        self,
+        reply_to: Message,
+        message: Optional[Message] = None,
+        min_interval: float = 1.0,
+        parse_mode: Optional[str] = "Markdown"
+    ):
+        """Initialize the progressive message.
+
+        Args:
+            reply_to: Message to reply to (the first edit creates the reply)
+            message: Existing message to edit instead (e.g. a status message)
+            min_interval: Minimum seconds between edits
+            parse_mode: Parse mode for the final text
+        """
+        self.reply_to = reply_to
+        self.message = message
+        self.min_interval = min_interval
+        self.parse_mode = parse_mode
+
+        self.started_at = time.monotonic()
+        self.first_visible_at: Optional[float] = None
+        self.edits = 0
+        self._last_edit = 0.0
+        self._shown = ""
+
+    async def _show(self, text: str, parse_mode: Optional[str] = None) -> None:
+        """Send or edit the message (no rate decisions here)."""
+        if self.message is None:
+            self.message = await self.reply_to.reply_text(text, parse_mode=parse_mode)
+        else:
+            try:
+                await self.message.edit_text(text, parse_mode=parse_mode)
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    raise
+        self._shown = text
+        self._last_edit = time.monotonic()
+        self.edits += 1
+        if self.first_visible_at is None:
+            self.first_visible_at = self._last_edit
+
+    async def update(self, text: str) -> None:
+        """Show the text received so far, if an edit is due.
+
+        Args:
+            text: Full text so far (not just the new delta)
+        """
+        text = text.strip()
+        if not text:
+            return
+        # First text goes out immediately, later edits are coalesced
+        if self.first_visible_at is not None and time.monotonic() - self._last_edit < self.min_interval:
+            return
+
+        partial = text[:MAX_MESSAGE_LENGTH - len(_CURSOR)] + _CURSOR
+        if partial != self._shown:
+            # Partial Markdown is often unbalanced, so partial edits are plain text
+            await self._show(partial)
+
+    async def finish(self, text: str) -> None:
+        """Show the final text with formatting.
+
+        Args:
+            text: Complete text
+        """
+        parts = split_message(text.strip() or "...")
+        for index, part in enumerate(parts):
+            if index > 0:
+                # Overflow continues in new messages
+                self.message = None
+            try:
+                await self._show(part, parse_mode=self.parse_mode)
+            except BadRequest as e:
+                count_fallback("markdown_plain_text")
+                logger.warning(f"⚠️ Final Markdown rejected ({e}), sending as plain text")
+                await self._show(part)
+
+    @property
+    def time_to_first_text(self) -> Optional[float]:
+        """Seconds from start until the user first saw text."""
+        if self.first_visible_at is None:
+            return None
+        return self.first_visible_at - self.started_at
+
+
+async def stream_to_message(
+    progressive: ProgressiveMessage,
+    func: Callable[..., Iterable[str]],
+    *args: Any
+) -> str:
+    """Stream a blocking text generator into a progressive message.
+
+    Args:
+        progressive: Message to update
+        func: Function returning an iterable of text deltas
+        *args: Arguments for func
+
+    Returns:
+        The complete text
+    """
+    text = ""
+    async for delta in iterate_in_thread(func, *args):
+        text += delta
+        await progressive.update(text)
+
+    await progressive.finish(text)
+
+    if progressive.time_to_first_text is not None:
+        observe("first_text", progressive.time_to_first_text)
+        logger.info(
+            f"⚡ First text visible in {progressive.time_to_first_text:.2f}s, "
+            f"complete in {time.monotonic() - progressive.started_at:.2f}s "
+            f"({progressive.edits} edits)"
+        )
+    return text
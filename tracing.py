@@ -0,0 +1,343 @@
+"""Per-update tracing: span trees exported to a rotating JSONL file.
+
+One lab report upload fans out into parallel tasks, worker threads and
+provider calls. When something failed the log said "Task 1 error" with
+nothing tying it back to the update, and there was no way to tell why a
+particular upload took 40 seconds.
+
+Every Telegram update now starts a trace. Spans are opened for each
+pipeline stage (every metrics.stage_timer and timed_to_thread call), each
+provider call (Gemini, Groq, Mem0, Supabase via timed_to_thread) and each
+Telegram API call, forming a tree under the update's root span:
+
+    update (photo, 41.2s)
+    ├── download 0.4s  bytes=612034
+    ├── preprocess 0.3s
+    ├── extraction 36.8s  queue_wait_seconds=31.9
+    │   └── gemini.extract_lab_data 4.8s  prompt_tokens=1290
+    └── analysis 0.9s
+        └── groq.analysis 0.9s  completion_tokens=311
+
+The current span lives in a contextvar, so it follows asyncio tasks and
+asyncio.to_thread() calls automatically. Log records get the trace ID too
+(install_log_correlation), so error logs can be matched to a trace.
+
+Users are identified by a salted hash of their Telegram ID only. Without
+a configured salt, each process picks a random one, so hashes cannot be
+reversed by hashing every possible ID (nor matched across restarts).
+
+Finished spans are written as JSON lines (one span per line) by a
+background thread, never on the event loop. To read a trace back:
+
+    python tracing.py traces/spans.jsonl             # slowest recent traces
+    python tracing.py traces/spans.jsonl <trace_id>  # one trace as a tree
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import secrets
+import sys
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Awaitable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("dr_aunty_current_span", default=None)
+
+# Finished spans go through this logger (never propagated to the console)
+_span_logger = logging.getLogger("dr_aunty.spans")
+_span_logger.propagate = False
+_span_logger.setLevel(logging.INFO)
+_listener: Optional[QueueListener] = None
+# Random per process until configure_tracing() is given a salt
+_user_salt = secrets.token_hex(16)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "start", "started_at",
+        "duration", "attributes", "error", "_token"
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        """Create a span (it starts when entered).
+
+        Args:
+            name: Operation name (e.g. "extraction")
+            parent: Parent span; None starts a new trace
+            attributes: Initial attributes
+        """
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(8)
+        self.span_id = secrets.token_hex(4)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = {k: v for k, v in (attributes or {}).items() if v is not None}
+        self.start = 0.0
+        self.started_at = 0.0
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set(self, **attributes: Any) -> "Span":
+        """Add attributes (None values are skipped)."""
+        self.attributes.update((k, v) for k, v in attributes.items() if v is not None)
+        return self
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the span started."""
+        return time.monotonic() - self.started_at
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self.started_at = time.monotonic()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.duration = time.monotonic() - self.started_at
+        if exc_type is GeneratorExit:
+            # Consumer stopped reading a stream early - not a failure
+            self.attributes["closed_early"] = True
+        elif exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}" if str(exc) else exc_type.__name__
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Closed from another context (e.g. a generator abandoned mid-stream)
+            pass
+        _export(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Span as a JSON-serializable dict."""
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration": round(self.duration, 6) if self.duration is not None else None,
+            "attributes": self.attributes,
+        }
+        if self.error:
+            record["error"] = self.error
+        return record
+
+
+def span(name: str, **attributes: Any) -> Span:
+    """Start a child of the current span (or a new trace if there is none).
+
+    Usage:
+        with span("gemini.extract_lab_data", bytes=len(data)) as s:
+            ...
+            s.set(prompt_tokens=...)
+
+    Args:
+        name: Operation name
+        **attributes: Span attributes (None values are skipped)
+    """
+    return Span(name, parent=_current_span.get(), attributes=attributes)
+
+
+def trace(name: str, **attributes: Any) -> Span:
+    """Start a new trace, even if a span is already active.
+
+    Args:
+        name: Root operation name (e.g. "update")
+        **attributes: Span attributes (None values are skipped)
+    """
+    return Span(name, parent=None, attributes=attributes)
+
+
+async def traced(name: str, awaitable: Awaitable[Any], **attributes: Any) -> Any:
+    """Await something inside its own span (handy for asyncio.gather).
+
+    Args:
+        name: Span name
+        awaitable: Coroutine or future to await
+        **attributes: Span attributes
+
+    Returns:
+        The awaitable's result
+    """
+    with span(name, **attributes):
+        return await awaitable
+
+
+def current_span() -> Optional[Span]:
+    """The active span in this context, if any."""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Trace ID of the active span, if any."""
+    active = _current_span.get()
+    return active.trace_id if active else None
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Add attributes to the active span (no-op outside a trace)."""
+    active = _current_span.get()
+    if active is not None:
+        active.set(**attributes)
+
+
+def hash_user(telegram_id: Any) -> Optional[str]:
+    """Pseudonymous user ID for span attributes.
+
+    Args:
+        telegram_id: Telegram user ID
+
+    Returns:
+        Salted SHA-256 prefix, or None if there is no user
+    """
+    if telegram_id is None:
+        return None
+    return hashlib.sha256(f"{_user_salt}:{telegram_id}".encode()).hexdigest()[:16]
+
+
+def _export(finished: Span) -> None:
+    """Hand a finished span to the export thread (if tracing is configured)."""
+    if _listener is None:
+        return
+    try:
+        _span_logger.info(json.dumps(finished.to_dict(), default=str, separators=(",", ":")))
+    except Exception as e:
+        logger.debug(f"Could not export span {finished.name}: {e}")
+
+
+def configure_tracing(path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3, user_salt: str = "") -> None:
+    """Start exporting finished spans to a rotating JSONL file.
+
+    Spans are queued and written by a background thread, so the event
+    loop never waits on disk.
+
+    Args:
+        path: JSONL file path (rotated to path.1, path.2, ...)
+        max_bytes: Rotate once the file reaches this size
+        backup_count: Rotated files to keep
+        user_salt: Salt for hashed user IDs (empty = random per process)
+    """
+    global _listener, _user_salt
+    if user_salt:
+        _user_salt = user_salt
+    if _listener is not None or not path:
+        return
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    span_queue: queue.Queue = queue.Queue(-1)
+    _span_logger.handlers = [QueueHandler(span_queue)]
+    _listener = QueueListener(span_queue, file_handler)
+    _listener.start()
+    logger.info(f"🧵 Tracing spans to {path}")
+
+
+def shutdown_tracing() -> None:
+    """Write out queued spans and stop the export thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+def install_log_correlation() -> None:
+    """Add the active trace ID to every log record as %(trace_id)s."""
+    factory = logging.getLogRecordFactory()
+    if getattr(factory, "_adds_trace_id", False):
+        return
+
+    def record_factory(*args: Any, **kwargs: Any) -> logging.LogRecord:
+        record = factory(*args, **kwargs)
+        record.trace_id = current_trace_id() or "-"
+        return record
+
+    record_factory._adds_trace_id = True
+    logging.setLogRecordFactory(record_factory)
+
+
+def _load_spans(paths: List[str]) -> List[Dict[str, Any]]:
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        spans.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+    return spans
+
+
+def _format_tree(spans: List[Dict[str, Any]]) -> str:
+    """Render one trace's spans as an indented tree, children by start time."""
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        parent = s["parent_id"] if s["parent_id"] in ids else None
+        children.setdefault(parent, []).append(s)
+    for siblings in children.values():
+        siblings.sort(key=lambda s: s["start"])
+
+    t0 = min(s["start"] for s in spans)
+    lines = []
+
+    def walk(parent_id: Optional[str], depth: int) -> None:
+        for s in children.get(parent_id, []):
+            parts = [s["name"], f"+{s['start'] - t0:.3f}s", f"{(s['duration'] or 0):.3f}s"]
+            parts += [f"{k}={v}" for k, v in s["attributes"].items()]
+            if s.get("error"):
+                parts.append(f"ERROR {s['error']}")
+            lines.append("  " * depth + "  ".join(parts))
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def main(argv: List[str]) -> int:
+    """Print the slowest traces, or one trace as a tree."""
+    if not argv:
+        print("Usage: python tracing.py <spans.jsonl> [more.jsonl ...] [trace_id]")
+        return 2
+
+    paths = [arg for arg in argv if os.path.exists(arg)]
+    wanted = [arg for arg in argv if arg not in paths]
+    spans = _load_spans(paths)
+
+    if wanted:
+        selected = [s for s in spans if s["trace_id"] == wanted[0]]
+        if not selected:
+            print(f"Trace {wanted[0]} not found")
+            return 1
+        print(_format_tree(selected))
+        return 0
+
+    roots = sorted(
+        (s for s in spans if s["parent_id"] is None),
+        key=lambda s: s["duration"] or 0,
+        reverse=True
+    )
+    for root in roots[:20]:
+        attrs = " ".join(f"{k}={v}" for k, v in root["attributes"].items())
+        print(f"{root['trace_id']}  {(root['duration'] or 0):8.3f}s  {root['name']}  {attrs}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,233 @@
+"""Per-user update scheduler for concurrent Telegram update processing.
+
+With concurrent updates enabled, two photos from the same user would race:
+both download to the same temp file and both write reports to Supabase and
+Mem0 in unpredictable order. This scheduler sits in front of the handlers:
+
+- Updates from DIFFERENT users run in parallel (up to the global limit)
+- Updates from the SAME user run one at a time, in arrival order
+- Each user's queue is bounded; extra updates are dropped and logged
+
+Updates with no user (channel posts, polls...) only obey the global limit.
+
+Album pages (messages with a media_group_id) are only buffered by their
+handler, so they skip the per-user queue and its cap - otherwise a
+10-page album would overflow it. The assembled album then joins the
+user's queue as ONE entry through run_for_user().
+
+If a LifecycleManager is attached, every update is tracked as an in-flight
+pipeline, and updates arriving after shutdown started are turned away.
+
+Every update runs inside its own trace (root span "update"), which records
+how long it waited behind the user's earlier updates.
+
+Observability:
+    queue_lengths() returns {telegram_id: queued updates} for busy users.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from lifecycle import LifecycleManager
+from tracing import current_span, hash_user, trace
+
+logger = logging.getLogger(__name__)
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Serializes updates per user while processing different users in parallel."""
+
+    def __init__(
+        self,
+        max_concurrent_updates: int,
+        max_queue_per_user: int = 5,
+        lifecycle: Optional[LifecycleManager] = None
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            max_concurrent_updates: Global cap on updates processed at once
+            max_queue_per_user: Max updates (running + waiting) per user
+            lifecycle: Optional lifecycle manager that tracks in-flight updates
+        """
+        super().__init__(max_concurrent_updates)
+        self.max_queue_per_user = max(1, max_queue_per_user)
+        self.lifecycle = lifecycle
+
+        self._user_locks: Dict[int, asyncio.Lock] = {}
+        self._queued: Dict[int, int] = {}
+        self._dropped = 0
+
+    @staticmethod
+    def _user_key(update: object) -> Optional[int]:
+        """Get the user an update belongs to, if any."""
+        if isinstance(update, Update) and update.effective_user:
+            return update.effective_user.id
+        return None
+
+    @staticmethod
+    def _is_album_page(update: object) -> bool:
+        """True for a message that is one item of an album."""
+        return (
+            isinstance(update, Update)
+            and update.message is not None
+            and update.message.media_group_id is not None
+        )
+
+    @staticmethod
+    def _update_kind(update: object) -> str:
+        """Short label for what an update carries (for traces)."""
+        if not isinstance(update, Update):
+            return type(update).__name__
+        if update.callback_query:
+            return "callback"
+        message = update.effective_message
+        if message is None:
+            return "other"
+        if message.text and message.text.startswith("/"):
+            return message.text.split()[0].split("@")[0]
+        for kind in ("photo", "document", "voice", "video", "text"):
+            if getattr(message, kind, None):
+                return kind
+        return "other"
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Wait for this user's earlier updates, then process under the global limit.
+
+        The per-user lock is taken BEFORE the global semaphore, so a user
+        with a backlog never holds global slots while waiting on themselves.
+        """
+        user_id = self._user_key(update)
+        with trace(
+            "update",
+            update_id=getattr(update, "update_id", None),
+            kind=self._update_kind(update),
+            user=hash_user(user_id)
+        ):
+            await self._schedule(update, coroutine, user_id)
+
+    async def _schedule(self, update: object, coroutine: Awaitable[Any], user_id: Optional[int]) -> None:
+        """Apply shutdown, per-user and global limits to one update."""
+        if self.lifecycle and not self.lifecycle.accepting:
+            await self._reject_during_shutdown(update, coroutine)
+            return
+
+        if user_id is None or self._is_album_page(update):
+            await super().process_update(update, coroutine)
+            return
+
+        queued = self._queued.get(user_id, 0)
+        if queued >= self.max_queue_per_user:
+            self._dropped += 1
+            logger.warning(
+                f"⚠️ Dropping update for user {user_id}: {queued} updates already queued"
+            )
+            self._discard(coroutine)
+            return
+
+        lock = self._enqueue(user_id)
+        try:
+            async with lock:
+                if self.lifecycle and not self.lifecycle.accepting:
+                    # Shutdown started while this update waited behind the user's backlog
+                    await self._reject_during_shutdown(update, coroutine)
+                    return
+                await super().process_update(update, coroutine)
+        finally:
+            self._dequeue(user_id)
+
+    async def run_for_user(self, user_id: int, coroutine: Awaitable[Any]) -> Any:
+        """Run work that belongs to no single update in the user's queue.
+
+        Used for assembled albums: the work waits behind the user's earlier
+        updates, and the user's later updates wait for it. It always counts
+        as one queue entry and is never dropped by the per-user cap (its
+        pages were already accepted).
+
+        Args:
+            user_id: Telegram ID whose queue to join
+            coroutine: The work to run
+
+        Returns:
+            Whatever the coroutine returns
+        """
+        lock = self._enqueue(user_id)
+        try:
+            async with lock:
+                return await coroutine
+        finally:
+            self._dequeue(user_id)
+
+    def _enqueue(self, user_id: int) -> asyncio.Lock:
+        """Count one more queued entry for a user and get their lock."""
+        self._queued[user_id] = self._queued.get(user_id, 0) + 1
+        return self._user_locks.setdefault(user_id, asyncio.Lock())
+
+    def _dequeue(self, user_id: int) -> None:
+        """Release a queue entry; forget the user once their queue is empty."""
+        self._queued[user_id] -= 1
+        if self._queued[user_id] == 0:
+            del self._queued[user_id]
+            del self._user_locks[user_id]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Run the handler coroutine (tracked, if a lifecycle manager is attached)."""
+        root = current_span()
+        if root is not None:
+            # Time spent behind this user's earlier updates and the global limit
+            root.set(queue_wait_seconds=round(root.elapsed, 3))
+        if self.lifecycle:
+            name = f"update {getattr(update, 'update_id', '?')} (user {self._user_key(update)})"
+            await self.lifecycle.run(coroutine, name)
+        else:
+            await coroutine
+
+    @staticmethod
+    def _discard(coroutine: Awaitable[Any]) -> None:
+        """Close a never-started handler coroutine so it isn't left dangling."""
+        close = getattr(coroutine, "close", None)
+        if close:
+            close()
+
+    async def _reject_during_shutdown(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Turn away an update that arrived after shutdown started."""
+        self._discard(coroutine)
+        self._dropped += 1
+        logger.info(f"🛑 Shutting down - not processing update {getattr(update, 'update_id', '?')}")
+        if isinstance(update, Update) and update.effective_message:
+            try:
+                await update.effective_message.reply_text(
+                    "Aunty restarting for a moment lah! Send that again in a minute, okay?"
+                )
+            except Exception as e:
+                logger.error(f"Could not send restart notice: {e}")
+
+    async def initialize(self) -> None:
+        """Nothing to set up."""
+
+    async def shutdown(self) -> None:
+        """Nothing to tear down."""
+
+    def queue_lengths(self) -> Dict[int, int]:
+        """Get queued update counts per user (running update included).
+
+        Returns:
+            Dictionary mapping Telegram ID to number of queued updates
+        """
+        return dict(self._queued)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics.
+
+        Returns:
+            Dictionary with busy users, deepest queue and dropped updates
+        """
+        return {
+            "busy_users": len(self._queued),
+            "queued_updates": sum(self._queued.values()),
+            "max_user_queue": max(self._queued.values(), default=0),
+            "dropped_updates": self._dropped,
+        }
@@ -0,0 +1,207 @@
+"""Provider connection warm-up at startup, and keepalive pings afterwards.
+
+After a deploy or a quiet spell, the first user pays for DNS lookups, TLS
+handshakes and auth checks with Telegram, Groq, Gemini, Supabase and Mem0,
+one after another inside their request. The provider SDKs are also only
+imported on first use (see HealthAnalyzer), which adds more to that request.
+
+ConnectionWarmer moves that cost to startup:
+1. Pings every configured provider concurrently with a cheap authenticated
+   call on the same pooled client the bot uses, and reports each timing
+2. Retries critical providers that failed (with backoff) until they are
+   warm or the ready timeout passes - the bot only reports ready once
+   every critical provider is warm
+3. Keeps pinging on an interval shorter than the pool's keepalive expiry,
+   so idle connections are not closed between users
+
+Warm-up pings are timed as metrics stages (warmup_<provider>) and exported
+as gauges (warm, last ping seconds, failures) per provider.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from metrics import stage_timer
+from tracing import trace
+
+logger = logging.getLogger(__name__)
+
+# Seconds between warm-up retries of a failed critical provider (doubles up to the max)
+_RETRY_DELAY = 1.0
+_MAX_RETRY_DELAY = 10.0
+
+
+class _ProviderState:
+    """Ping history of one provider."""
+
+    __slots__ = ("warm", "pings", "failures", "last_seconds", "last_error", "warm_at")
+
+    def __init__(self):
+        self.warm = False
+        self.pings = 0
+        self.failures = 0
+        self.last_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.warm_at: Optional[float] = None
+
+
+class ConnectionWarmer:
+    """Warms provider connections concurrently and keeps them alive."""
+
+    def __init__(
+        self,
+        probes: Dict[str, Callable[[], Awaitable[Any]]],
+        critical: Iterable[str] = (),
+        timeout: float = 10.0,
+        keepalive_interval: float = 45.0
+    ):
+        """Initialize the warmer.
+
+        Args:
+            probes: Provider name -> coroutine function making a cheap
+                authenticated call (raises on failure)
+            critical: Providers that must be warm before the bot is ready
+                (names without a probe are ignored)
+            timeout: Seconds allowed per ping
+            keepalive_interval: Seconds between keepalive rounds (0 = no keepalive)
+        """
+        self.probes = probes
+        self.critical = [name for name in critical if name in probes]
+        self.timeout = timeout
+        self.keepalive_interval = keepalive_interval
+        self.warmup_seconds: Optional[float] = None
+        self._state = {name: _ProviderState() for name in probes}
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._reported_ready = False
+
+    @property
+    def ready(self) -> bool:
+        """True when every critical provider answered its last ping."""
+        return all(self._state[name].warm for name in self.critical)
+
+    async def _ping(self, name: str) -> bool:
+        """Ping one provider and record the outcome.
+
+        Returns:
+            True if the provider answered in time
+        """
+        state = self._state[name]
+        state.pings += 1
+        start = time.monotonic()
+        try:
+            with stage_timer(f"warmup_{name}"):
+                await asyncio.wait_for(self.probes[name](), timeout=self.timeout)
+        except Exception as e:
+            state.failures += 1
+            state.last_seconds = time.monotonic() - start
+            state.last_error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            if state.warm:
+                logger.warning(f"⚠️ {name} keepalive ping failed: {state.last_error}")
+            state.warm = False
+            return False
+
+        state.last_seconds = time.monotonic() - start
+        state.last_error = None
+        if not state.warm and state.warm_at is not None:
+            logger.info(f"✅ {name} reachable again ({state.last_seconds:.2f}s)")
+        state.warm = True
+        state.warm_at = state.warm_at or time.monotonic()
+        return True
+
+    async def _ping_all(self, names: Iterable[str]) -> None:
+        await asyncio.gather(*(self._ping(name) for name in names))
+
+    async def warm_up(self, ready_timeout: float = 60.0) -> bool:
+        """Ping every provider concurrently; retry critical failures until ready.
+
+        Args:
+            ready_timeout: Give up waiting for critical providers after this
+                many seconds (the keepalive loop keeps retrying them)
+
+        Returns:
+            True if every critical provider is warm
+        """
+        start = time.monotonic()
+        with trace("warmup", providers=len(self.probes)) as root:
+            await self._ping_all(self.probes)
+
+            delay = _RETRY_DELAY
+            while not self.ready:
+                remaining = ready_timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    break
+                cold = [name for name in self.critical if not self._state[name].warm]
+                logger.info(f"⏳ Waiting for {', '.join(cold)} (retrying in {min(delay, remaining):.0f}s)")
+                await asyncio.sleep(min(delay, remaining))
+                await self._ping_all(cold)
+                delay = min(delay * 2, _MAX_RETRY_DELAY)
+            root.set(ready=self.ready)
+
+        self.warmup_seconds = time.monotonic() - start
+        self._log_summary()
+        return self.ready
+
+    def _log_summary(self) -> None:
+        parts = []
+        for name, state in self._state.items():
+            seconds = f"{state.last_seconds:.2f}s" if state.last_seconds is not None else "-"
+            parts.append(f"{name} {seconds}" if state.warm else f"{name} ❌ {state.last_error}")
+        logger.info(f"🔥 Warm-up took {self.warmup_seconds:.2f}s: {', '.join(parts)}")
+
+        cold = [name for name in self.critical if not self._state[name].warm]
+        if cold:
+            logger.error(f"❌ Critical providers not reachable: {', '.join(cold)} - starting degraded")
+        optional_cold = [name for name, state in self._state.items() if not state.warm and name not in self.critical]
+        if optional_cold:
+            logger.warning(f"⚠️ Optional providers not reachable: {', '.join(optional_cold)}")
+
+    def start_keepalive(self, on_ready: Optional[Callable[[], None]] = None) -> None:
+        """Start pinging every provider in the background.
+
+        Args:
+            on_ready: Called once, the first time every critical provider is
+                warm (right away if it already is)
+        """
+        self._maybe_report_ready(on_ready)
+        if self.keepalive_interval > 0 and self._keepalive_task is None:
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop(on_ready))
+
+    def _maybe_report_ready(self, on_ready: Optional[Callable[[], None]]) -> None:
+        if self.ready and not self._reported_ready:
+            self._reported_ready = True
+            if on_ready is not None:
+                on_ready()
+
+    async def _keepalive_loop(self, on_ready: Optional[Callable[[], None]]) -> None:
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                with trace("keepalive"):
+                    await self._ping_all(self.probes)
+                self._maybe_report_ready(on_ready)
+            except Exception as e:
+                logger.error(f"Keepalive round failed: {e}")
+
+    async def stop(self) -> None:
+        """Stop the keepalive loop."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider warmth, last ping time and failure counts."""
+        return {
+            name: {
+                "warm": state.warm,
+                "critical": name in self.critical,
+                "last_ping_seconds": state.last_seconds,
+                "pings": state.pings,
+                "failures": state.failures,
+            }
+            for name, state in self._state.items()
+        }